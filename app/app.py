@@ -1,51 +1,417 @@
 import sys
 import os
+import threading
+import time
 import numpy as np
-from flask import Flask, render_template
+from flask import Flask, render_template, jsonify, request
 
 # 상위 폴더(src)를 모듈 경로에 추가
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.db_client import RDSClient
+from src.db_client import RDSClient, QueryCache
 from src.redis_client import RedisClient
+from src.recommender import (
+    CategoryIVFIndex, CatalogAttributes, WEIGHT_PROFILES, VECTOR_FIELDS, ANCHOR_RULES, build_fused_vectors,
+    build_anchor_queries, iter_vector_chunks, stream_top_k, stream_anchor_top_k, run_concurrently
+)
+from src.live_index import LiveIndex, CatalogSource
+from concurrent.futures import ThreadPoolExecutor
+from src.embedding_store import EmbeddingStore
 
 app = Flask(__name__)
 
 # DB 및 Redis 클라이언트 초기화
-db = RDSClient()
 redis_conn = RedisClient()
 
-def cosine_similarity(v1, v2):
-    """코사인 유사도 계산 함수"""
-    if v1 is None or v2 is None:
-        return 0.0
-    norm_v1 = np.linalg.norm(v1)
-    norm_v2 = np.linalg.norm(v2)
-    
-    if norm_v1 == 0 or norm_v2 == 0:
-        return 0.0
-        
-    return np.dot(v1, v2) / (norm_v1 * norm_v2)
+# 페르소나/후보 조회 결과 캐시 (크롤링이나 페르소나 수정 시 테이블 태그로 무효화)
+# QUERY_CACHE_SHARED=1이면 Redis 계층을 함께 사용하여 워커 간에 캐시와 무효화를 공유
+query_cache = QueryCache(
+    max_entries=int(os.getenv('QUERY_CACHE_SIZE', 1024)),
+    ttl=int(os.getenv('QUERY_CACHE_TTL', 300)),
+    redis_client=redis_conn.raw_client if os.getenv('QUERY_CACHE_SHARED', '1') == '1' else None
+)
+db = RDSClient(cache=query_cache)
+
+# 임베딩 저장소(memory-mapped)가 있으면 Redis 대신 벡터 소스로 사용
+EMBEDDING_STORE_DIR = os.getenv('EMBEDDING_STORE_DIR')
+if EMBEDDING_STORE_DIR and os.path.exists(os.path.join(EMBEDDING_STORE_DIR, 'meta.json')):
+    vector_source = EmbeddingStore(EMBEDDING_STORE_DIR)
+else:
+    vector_source = redis_conn
+
+# 가중치 프로필 (src/recommender.py의 WEIGHT_PROFILES 참고)
+WEIGHT_PROFILE = os.getenv('WEIGHT_PROFILE', 'default')
+WEIGHTS = WEIGHT_PROFILES[WEIGHT_PROFILE]
+
+# 오프라인으로 미리 계산된 이웃(product:{id}:neighbors) 우선 사용 여부
+# neighbors:meta의 프로필이 WEIGHT_PROFILE과 같고 k가 요청 개수 이상일 때만 사용 (NEIGHBORS_META_TTL초마다 다시 확인)
+USE_PRECOMPUTED_NEIGHBORS = os.getenv('USE_PRECOMPUTED_NEIGHBORS', '1') == '1'
+NEIGHBORS_META_TTL = float(os.getenv('NEIGHBORS_META_TTL', 60))
+neighbors_meta_state = {'meta': None, 'loaded_at': 0.0}
+
+# 전체 카탈로그 대상 IVF 근사 검색 사용 여부 (0이면 카테고리 전체를 청크 단위로 스캔)
+# USE_LIVE_INDEX=1이면 카탈로그 사본이 두 벌이 되지 않도록 IVF/양자화 인덱스는 만들지 않음
+USE_IVF_INDEX = os.getenv('USE_IVF_INDEX', '1') == '1'
+IVF_NPROBE = int(os.getenv('IVF_NPROBE', 8))
+# 양자화 1차 점수 + full precision re-ranking 사용 (저장소에 양자화 프로필이 있을 때만)
+# IVF 인덱스가 없을 때 스트리밍 스캔 대신 사용. int8은 float32 스캔과 비슷한 속도에 메모리 약 1/4,
+# f16은 float32로 복원해 점수를 매기므로 메모리 이득이 없음
+QUANTIZED_PRECISION = os.getenv('QUANTIZED_PRECISION')
+QUANTIZED_RERANK = int(os.getenv('QUANTIZED_RERANK', 300))
+# 전체 스캔 시 한 번에 읽어 점수 매길 후보 수
+SCAN_CHUNK_SIZE = int(os.getenv('SCAN_CHUNK_SIZE', 2000))
+
+# 페르소나 대표 아이템(anchor) 여러 개의 점수 결합 방식 (max / mean / centroid, '/?rule='로 변경 가능)
+PERSONA_ANCHOR_RULE = os.getenv('PERSONA_ANCHOR_RULE', 'max')
 
-def get_weighted_similarity(target_vecs, candidate_vecs):
+# 카테고리별 추천을 동시에 실행할 스레드 풀과 카테고리당 제한 시간(초)
+# 시간을 넘긴 카테고리는 빈 섹션으로 표시하여 페이지 전체가 멈추지 않도록 함
+category_executor = ThreadPoolExecutor(max_workers=int(os.getenv('CATEGORY_WORKERS', 8)))
+CATEGORY_TIMEOUT = float(os.getenv('CATEGORY_TIMEOUT', 3.0))
+
+# 인메모리 핫스왑 인덱스: 시작 시 백그라운드에서 로드하고, catalog:version 폴링으로 변경분만 반영
+# 워커마다 카탈로그 전체의 float32 fused 행렬을 들고 있고 IVF/양자화 경로를 대신하므로 기본값은 사용 안 함
+# (메모리가 충분하고 크롤링/임베딩 결과를 재시작 없이 바로 반영해야 할 때 USE_LIVE_INDEX=1)
+USE_LIVE_INDEX = os.getenv('USE_LIVE_INDEX', '0') == '1'
+live_index = None
+if USE_LIVE_INDEX:
+    is_store = isinstance(vector_source, EmbeddingStore)
+    live_index = LiveIndex(
+        CatalogSource(
+            db, redis_conn, vector_source,
+            fields=getattr(vector_source, 'fields', VECTOR_FIELDS), weights=WEIGHTS, normalized=is_store,
+            fused_profile=WEIGHT_PROFILE if is_store and WEIGHT_PROFILE in vector_source.fused else None,
+            chunk_size=SCAN_CHUNK_SIZE
+        ),
+        poll_interval=float(os.getenv('LIVE_INDEX_POLL_INTERVAL', 30))
+    ).start()
+
+def build_catalog_index():
     """
-    5가지 요소에 대해 각각 코사인 유사도를 구하고 0.2씩 가중 평균
+    upper_category별 IVF 인덱스를 생성합니다.
+    벡터가 없는 상품은 인덱스에서 제외됩니다.
     """
-    weights = 0.2
-    total_score = 0.0
-    
-    # 5가지 키: image_emb, brand_info_emb, lower_cat_emb, brand_cat_emb, name_emb
-    keys = target_vecs.keys()
+    catalog_query = """
+        SELECT p.product_id, c.upper_category
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+        WHERE c.upper_category IN ('상의', '하의', '신발', '아우터')
+    """
+    rows = db.execute(catalog_query)
+    if not rows:
+        return None
+
+    product_ids = [row['product_id'] for row in rows]
+    bulk = vector_source.get_many_product_vectors(product_ids)
+    if not bulk:
+        return None
+
+    field_matrices, missing = bulk
+    found = np.flatnonzero(~missing)
+
+    return CategoryIVFIndex(
+        fields=list(field_matrices.keys()), weights=WEIGHTS, nprobe=IVF_NPROBE
+    ).fit(
+        np.asarray(product_ids)[found],
+        np.asarray([row['upper_category'] for row in rows])[found],
+        {field: matrix[found] for field, matrix in field_matrices.items()},
+        normalized=isinstance(vector_source, EmbeddingStore)
+    )
+
+def build_quantized_index():
+    """
+    upper_category별 QuantizedScorer를 생성합니다.
+    저장소에 WEIGHT_PROFILE의 QUANTIZED_PRECISION 양자화 프로필이 없으면 None을 반환합니다.
+    """
+    if not isinstance(vector_source, EmbeddingStore) or \
+            (WEIGHT_PROFILE, QUANTIZED_PRECISION) not in vector_source.quantized:
+        return None
+
+    catalog_query = """
+        SELECT p.product_id, c.upper_category
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+        WHERE c.upper_category IN ('상의', '하의', '신발', '아우터')
+    """
+    ids_by_category = {}
+    for row in db.execute(catalog_query) or []:
+        ids_by_category.setdefault(row['upper_category'], []).append(row['product_id'])
+
+    return {
+        category: vector_source.quantized_scorer(
+            WEIGHT_PROFILE, QUANTIZED_PRECISION, product_ids, rerank=QUANTIZED_RERANK
+        )
+        for category, product_ids in ids_by_category.items()
+    } or None
+
+# IVF/양자화 인덱스는 시작 시 백그라운드 스레드에서 한 번만 만들고, 끝날 때까지 /ready는 503
+# 만들지 못했으면(None/예외) 그 결과도 그대로 두어 요청마다 다시 만들지 않고 스캔으로 처리
+catalog_index = None
+quantized_index = None
+index_state = {'ready': False, 'errors': {}}
+
+def warm_up_indexes():
+    global catalog_index, quantized_index
+    builders = {
+        'ivf': (USE_IVF_INDEX, build_catalog_index),
+        'quantized': (bool(QUANTIZED_PRECISION), build_quantized_index),
+    }
+    for name, (enabled, build) in builders.items():
+        if not enabled:
+            continue
+        start_time = time.time()
+        try:
+            index = build()
+        except Exception as e:
+            index_state['errors'][name] = f"{type(e).__name__}: {e}"
+            print(f"⚠️ {name} 인덱스 생성 실패, 스캔으로 대체합니다: {index_state['errors'][name]}")
+            continue
+        if name == 'ivf':
+            catalog_index = index
+        else:
+            quantized_index = index
+        print(f"✅ {name} 인덱스 준비 완료: {'생성' if index is not None else '대상 없음'} "
+              f"({time.time() - start_time:.1f}초)")
+    index_state['ready'] = True
+
+# 인메모리 인덱스를 쓰는 동안에는 카탈로그 사본(IVF/양자화)을 따로 만들지 않음
+if live_index is None and (USE_IVF_INDEX or QUANTIZED_PRECISION):
+    threading.Thread(target=warm_up_indexes, name='index-warmup', daemon=True).start()
+else:
+    index_state['ready'] = True
+
+# 추천 API 필터용 상품 속성 (가격/카테고리가 크롤링으로 바뀌므로 주기적으로 다시 로드)
+CATALOG_ATTRIBUTES_TTL = float(os.getenv('CATALOG_ATTRIBUTES_TTL', 600))
+catalog_attributes = None
+catalog_attributes_state = {'loaded_at': 0.0, 'version': None}
+catalog_attributes_lock = threading.Lock()
+
+def load_catalog_attributes():
+    attributes_query = """
+        SELECT
+            p.product_id, c.upper_category, p.category_id, p.brand_id,
+            p.gender, p.sale_price
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+    """
+    attributes = CatalogAttributes.from_chunks(
+        db.execute_stream(attributes_query, chunk_size=10000, output='numpy')
+    )
+    print(f"✅ 상품 속성 로드 완료: {len(attributes)}개 상품")
+    return attributes
+
+def get_catalog_attributes():
+    """
+    추천 API 필터용 상품 속성 컬럼 배열.
+    인메모리 인덱스 버전이 바뀌었거나 CATALOG_ATTRIBUTES_TTL초가 지나면 다시 로드합니다.
+    다시 로드하는 동안 다른 요청은 기존 배열을 그대로 사용합니다. (처음 로드할 때만 대기)
+    """
+    global catalog_attributes
+    snapshot = live_index.snapshot if live_index else None
+    version = snapshot.version if snapshot else None
+
+    attributes = catalog_attributes
+    stale = attributes is None or version != catalog_attributes_state['version'] or \
+        time.time() - catalog_attributes_state['loaded_at'] > CATALOG_ATTRIBUTES_TTL
+    if not stale:
+        return attributes
+
+    # 이미 다른 요청이 다시 로드 중이면 기존 배열 사용
+    if not catalog_attributes_lock.acquire(blocking=attributes is None):
+        return attributes
+    try:
+        if catalog_attributes is attributes:
+            catalog_attributes = load_catalog_attributes()
+            catalog_attributes_state.update(loaded_at=time.time(), version=version)
+        return catalog_attributes
+    finally:
+        catalog_attributes_lock.release()
+
+def precomputed_neighbors_usable(k):
+    """사전 계산된 이웃 목록이 현재 가중치 프로필로 k개 이상 계산되어 있는지 확인"""
+    if not USE_PRECOMPUTED_NEIGHBORS:
+        return False
+    if time.time() - neighbors_meta_state['loaded_at'] > NEIGHBORS_META_TTL:
+        neighbors_meta_state.update(meta=redis_conn.get_neighbors_meta(), loaded_at=time.time())
+    meta = neighbors_meta_state['meta']
+    return bool(meta) and meta.get('profile') == WEIGHT_PROFILE and meta.get('k', 0) >= k
+
+def fetch_products(product_ids):
+    """추천 결과로 뽑힌 상품들의 메타데이터만 조회하여 product_ids 순서대로 반환합니다."""
+    if len(product_ids) == 0:
+        return []
+
+    params = {f"id{i}": int(pid) for i, pid in enumerate(product_ids)}
+    product_query = f"""
+        SELECT 
+            p.product_id, p.product_name, p.img_url, 
+            p.sale_price, b.korea_name as brand_name
+        FROM products p
+        JOIN brands b ON p.brand_id = b.brand_id
+        WHERE p.product_id IN ({', '.join(':' + name for name in params)})
+    """
+    rows = db.execute(product_query, params, use_cache=True) or []
+    row_map = {row['product_id']: row for row in rows}
+    return [row_map[int(pid)] for pid in product_ids if int(pid) in row_map]
+
+def attach_scores(top_ids, top_scores):
+    """상위 상품들의 메타데이터를 조회하고 유사도 점수(%)를 붙여 반환"""
+    score_map = dict(zip(top_ids.tolist(), top_scores.tolist()))
+
+    top_items = fetch_products(top_ids)
+    for item in top_items:
+        item['similarity_score'] = round(score_map[item['product_id']] * 100, 2) # 퍼센트로 변환
+    return top_items
+
+def recommend_with_index(index, category, rep_id, target_vectors, k=5):
+    """IVF 인덱스로 카테고리 전체에서 근사 검색 후, 상위 k개 상품의 메타데이터만 조회"""
+    top_ids, top_scores = index.search(category, target_vectors, k=k, exclude_ids=[rep_id])
+    return attach_scores(top_ids, top_scores)
+
+def recommend_with_snapshot(snapshot, category, rep_id, target_vectors, k=5):
+    """인메모리 스냅샷의 카테고리 구간 전체와 내적 한 번으로 점수 계산"""
+    query = build_fused_vectors(target_vectors, getattr(vector_source, 'fields', VECTOR_FIELDS), WEIGHTS)
+    top_ids, top_scores = snapshot.search(category, query, k=k, exclude_ids=[rep_id])
+    return attach_scores(top_ids, top_scores)
+
+def recommend_with_quantized(scorer, rep_id, target_vectors, k=5):
+    """양자화 행렬로 1차 점수를 매기고 상위 후보만 full precision으로 다시 계산"""
+    top_idx, top_scores = scorer.top_k(target_vectors, k=k + 1)
+    keep = scorer.ids[top_idx] != rep_id
+    return attach_scores(scorer.ids[top_idx][keep][:k], top_scores[keep][:k])
+
+def recommend_with_scan(category, rep_id, target_vectors, k=5):
+    """
+    같은 카테고리 상품 전체를 청크 단위로 읽어 점수 매기며 상위 k개만 유지하고,
+    최종 상위 k개 상품의 메타데이터만 조회합니다.
+    """
+    # 같은 카테고리(upper_category)의 후보군 상품 ID 조회 (자기 자신 제외)
+    candidate_query = """
+        SELECT p.product_id
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+        WHERE c.upper_category = :category
+        AND p.product_id != :rep_id
+    """
+    params = {'category': category, 'rep_id': rep_id}
+
+    if db.cache:
+        # 캐시가 있으면 후보 ID 목록을 캐시에서 가져와 청크로 나눔
+        rows = db.execute(candidate_query, params, use_cache=True) or []
+        candidate_ids = [row['product_id'] for row in rows]
+        id_chunks = (
+            candidate_ids[start:start + SCAN_CHUNK_SIZE]
+            for start in range(0, len(candidate_ids), SCAN_CHUNK_SIZE)
+        )
+    else:
+        # 서버 사이드 커서로 ID도 청크 단위로 받아 바로 벡터 조회/점수 계산에 넘김
+        id_chunks = (
+            [row['product_id'] for row in chunk]
+            for chunk in db.execute_stream(candidate_query, params, chunk_size=SCAN_CHUNK_SIZE, output='chunks')
+        )
+
+    # 저장소에 프로필의 fused 벡터가 있으면 후보당 내적 한 번으로 점수 계산
+    is_store = isinstance(vector_source, EmbeddingStore)
+    fused_profile = WEIGHT_PROFILE if is_store and WEIGHT_PROFILE in vector_source.fused else None
+
+    chunks = iter_vector_chunks(vector_source, fused_profile=fused_profile, id_chunks=id_chunks)
+    top_ids, top_scores = stream_top_k(
+        target_vectors, chunks, k=k,
+        fields=getattr(vector_source, 'fields', VECTOR_FIELDS), weights=WEIGHTS, normalized=is_store
+    )
+    return attach_scores(top_ids, top_scores)
+
+def recommend_for_rep(rep_item, k=5):
+    """
+    대표 아이템 하나에 대한 같은 카테고리 유사 상품 Top k.
+    벡터가 없으면 None을 반환합니다.
+    """
+    category = rep_item['upper_category']
+    rep_id = rep_item['product_id']
+
+    # 1. 오프라인 배치(build_neighbors.py)로 계산된 이웃이 있으면 O(K)로 바로 조회
+    neighbors = redis_conn.get_product_neighbors(rep_id, k=k) if precomputed_neighbors_usable(k) else None
+    if neighbors:
+        return attach_scores(*neighbors)
+
+    target_vectors = vector_source.get_product_vectors(rep_id)
     
-    for key in keys:
-        sim = cosine_similarity(target_vecs[key], candidate_vecs[key])
-        total_score += (sim * weights)
-        
-    return total_score
+    if not target_vectors:
+        print(f"대표 아이템({rep_id})의 벡터가 없습니다.")
+        return None
+
+    # 2. 없으면 실시간 계산: 인메모리 인덱스가 준비되어 있으면 현재 스냅샷으로 계산
+    #    인메모리 인덱스를 쓰는 동안에는 카탈로그 사본(IVF/양자화)을 따로 만들지 않고, 로드 중(/ready 전)에는 스캔
+    if live_index is not None:
+        snapshot = live_index.snapshot
+        if snapshot is not None and category in snapshot:
+            return recommend_with_snapshot(snapshot, category, rep_id, target_vectors, k=k)
+        return recommend_with_scan(category, rep_id, target_vectors, k=k)
+
+    # 3. 카탈로그 전체 IVF 인덱스가 있으면 근사 검색 (시작 시 생성 중이거나 실패했으면 건너뜀)
+    index = catalog_index
+    if index is not None and category in index:
+        return recommend_with_index(index, category, rep_id, target_vectors, k=k)
+
+    # 4. 양자화 프로필이 있으면 메모리의 int8 행렬로 전체 스캔 + re-ranking, 없으면 카테고리 전체 스트리밍 스캔
+    quantized = quantized_index
+    if quantized and category in quantized:
+        return recommend_with_quantized(quantized[category], rep_id, target_vectors, k=k)
+    return recommend_with_scan(category, rep_id, target_vectors, k=k)
+
+def recommend_for_persona(category, anchors, k=5, rule='max'):
+    """
+    페르소나의 한 카테고리 대표 아이템(anchor) 전체에 대한 유사 상품 Top k.
+    anchor 벡터는 한 번에 조회하고, 후보 행렬과 (a, D) 쿼리 행렬의 곱 한 번으로 모든 anchor를 점수 매긴 뒤
+    rule(max / mean / centroid)로 합칩니다. anchor 벡터가 하나도 없으면 None을 반환합니다.
+    """
+    anchor_ids = [item['product_id'] for item in anchors]
+    bulk = vector_source.get_many_product_vectors(anchor_ids)
+    if not bulk:
+        return None
+
+    anchor_vectors, missing = bulk
+    if missing.all():
+        print(f"{category} 대표 아이템({anchor_ids})의 벡터가 없습니다.")
+        return None
+
+    # anchor가 하나뿐이면 단일 대표 아이템 경로 (사전 계산 이웃 / 양자화 / IVF 사용 가능)
+    if (~missing).sum() == 1:
+        return recommend_for_rep(anchors[int(np.flatnonzero(~missing)[0])], k=k)
+
+    fields = getattr(vector_source, 'fields', VECTOR_FIELDS)
+    queries = build_anchor_queries(
+        {f: np.asarray(v[~missing]) for f, v in anchor_vectors.items()}, fields, WEIGHTS, rule
+    )
+
+    # 1. 인메모리 인덱스가 준비되어 있으면 카테고리 구간 전체에 대해 바로 계산
+    snapshot = live_index.snapshot if live_index else None
+    if snapshot is not None and category in snapshot:
+        top_ids, top_scores = snapshot.search(category, queries, k=k, exclude_ids=anchor_ids, rule=rule)
+        return attach_scores(top_ids, top_scores)
+
+    # 2. 없으면 카테고리 전체를 청크 단위로 스캔 (청크마다 행렬 곱 한 번)
+    candidate_query = """
+        SELECT p.product_id
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+        WHERE c.upper_category = :category
+    """
+    rows = db.execute(candidate_query, {'category': category}, use_cache=True) or []
+    candidate_ids = [row['product_id'] for row in rows]
+
+    is_store = isinstance(vector_source, EmbeddingStore)
+    fused_profile = WEIGHT_PROFILE if is_store and WEIGHT_PROFILE in vector_source.fused else None
+    chunks = iter_vector_chunks(vector_source, candidate_ids, SCAN_CHUNK_SIZE, fused_profile=fused_profile)
+    top_ids, top_scores = stream_anchor_top_k(
+        queries, chunks, k=k, fields=fields, weights=WEIGHTS, normalized=is_store,
+        rule=rule, exclude_ids=anchor_ids
+    )
+    return attach_scores(top_ids, top_scores)
 
 @app.route('/')
 def index():
-    # 1. '올드머니' 페르소나의 카테고리별 대표 아이템 선정
+    # 1. '올드머니' 페르소나의 카테고리별 대표 아이템(anchor) 전체 조회
     # 3NF 스키마 활용: products + categories + brands + persona_items 조인
     persona_query = """
         SELECT 
@@ -58,62 +424,144 @@ def index():
         JOIN brands b ON p.brand_id = b.brand_id
         WHERE pi.persona = '올드머니'
         AND c.upper_category IN ('상의', '하의', '신발', '아우터')
-        GROUP BY c.upper_category
+        ORDER BY c.upper_category, p.product_id
     """
     
-    rep_items = db.execute(persona_query)
+    rep_items = db.execute(persona_query, use_cache=True) or []
+
+    rule = request.args.get('rule', PERSONA_ANCHOR_RULE)
+    if rule not in ANCHOR_RULES:
+        rule = PERSONA_ANCHOR_RULE
+
+    anchors_by_category = {}
+    for rep_item in rep_items:
+        anchors_by_category.setdefault(rep_item['upper_category'], []).append(rep_item)
     
     final_recommendations = {} # 카테고리별 결과 저장용
 
-    # 2. 각 대표 아이템에 대해 유사 상품 추천 로직 수행
-    for rep_item in rep_items:
-        category = rep_item['upper_category']
-        rep_id = rep_item['product_id']
-        target_vectors = redis_conn.get_product_vectors(rep_id)
-        
-        if not target_vectors:
-            print(f"대표 아이템({rep_id})의 벡터가 Redis에 없습니다.")
-            continue
+    # 2. 카테고리별 페르소나 추천을 동시에 실행 (시간 초과 시 빈 추천 목록)
+    results = run_concurrently(
+        {
+            category: (lambda category=category, anchors=anchors: recommend_for_persona(category, anchors, rule=rule))
+            for category, anchors in anchors_by_category.items()
+        },
+        timeout=CATEGORY_TIMEOUT, executor=category_executor, default=[]
+    )
 
-        # 2-1. 같은 카테고리(upper_category)의 후보군 상품 조회 (자기 자신 제외)
-        candidate_query = """
-            SELECT 
-                p.product_id, p.product_name, p.img_url, 
-                p.sale_price, b.korea_name as brand_name
-            FROM products p
-            JOIN categories c ON p.category_id = c.category_id
-            JOIN brands b ON p.brand_id = b.brand_id
-            WHERE c.upper_category = :category
-            AND p.product_id != :rep_id
-            LIMIT 1000 
-        """ 
-        # 성능상 1000개만 가져온다고 가정 (실제로는 배치 처리 필요)
-        candidates = db.execute(candidate_query, {'category': category, 'rep_id': rep_id})
-        
-        scored_candidates = []
-
-        # 2-2. 후보군과의 유사도 계산
-        for cand in candidates:
-            cand_id = cand['product_id']
-            cand_vectors = redis_conn.get_product_vectors(cand_id)
-            
-            if cand_vectors:
-                # 5가지 요소 가중 평균 유사도 계산
-                score = get_weighted_similarity(target_vectors, cand_vectors)
-                cand['similarity_score'] = round(score * 100, 2) # 퍼센트로 변환
-                scored_candidates.append(cand)
-        
-        # 2-3. 점수 높은 순 정렬 및 Top 5 추출
-        scored_candidates.sort(key=lambda x: x['similarity_score'], reverse=True)
-        top_5 = scored_candidates[:5]
-        
-        # 결과 저장
+    for category, anchors in anchors_by_category.items():
+        top_5 = results.get(category)
+        # 대표 아이템 벡터가 없는 카테고리는 건너뜀
+        if top_5 is None:
+            continue
         final_recommendations[category] = {
-            'representative': rep_item,
+            'representatives': anchors,
             'recommendations': top_5
         }
 
-    return render_template('index.html', data=final_recommendations)
+    return render_template('index.html', data=final_recommendations, rule=rule)
+
+def parse_int_list(value):
+    """'1,2,3' 형태의 쿼리 파라미터를 정수 리스트로 변환 (없으면 None)"""
+    if not value:
+        return None
+    return [int(v) for v in value.split(',') if v.strip()]
+
+@app.route('/api/recommend/<int:product_id>')
+def api_recommend(product_id):
+    """
+    임의 상품에 대한 유사 상품 추천 JSON API
+
+    Query Params:
+        k (int): 추천 개수 (기본 10, 최대 100)
+        category (str): 상위 카테고리 (기본값: 대상 상품의 upper_category)
+        category_id (str): 허용할 category_id 목록 (쉼표 구분)
+        gender (str): 허용할 gender 목록 (쉼표 구분, 0: 공용, 1: 남성, 2: 여성)
+        brand_id (str): 허용할 brand_id 목록 (쉼표 구분)
+        min_price, max_price (int): 판매가 범위
+    """
+    try:
+        k = min(int(request.args.get('k', 10)), 100)
+        genders = parse_int_list(request.args.get('gender'))
+        brand_ids = parse_int_list(request.args.get('brand_id'))
+        category_ids = parse_int_list(request.args.get('category_id'))
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+    except ValueError:
+        return jsonify({'error': '잘못된 파라미터 형식입니다.'}), 400
+
+    attributes = get_catalog_attributes()
+    rows, found = attributes.lookup([product_id])
+    if not found[0]:
+        return jsonify({'error': f'상품({product_id})을 찾을 수 없습니다.'}), 404
+
+    # 인메모리 스냅샷에 대상 상품이 있으면 그 fused 행을 쿼리로 사용
+    snapshot = live_index.snapshot if live_index else None
+    snapshot_rows, in_snapshot = snapshot.lookup([product_id]) if snapshot is not None else (None, [False])
+    target_vectors = None
+    if not in_snapshot[0]:
+        target_vectors = vector_source.get_product_vectors(product_id)
+        if not target_vectors:
+            return jsonify({'error': f'상품({product_id})의 벡터가 없습니다.'}), 404
+
+    category = request.args.get('category') or str(attributes['upper_category'][rows[0]])
+    filters = {
+        'upper_category': category, 'category_ids': category_ids, 'brand_ids': brand_ids,
+        'genders': genders, 'min_price': min_price, 'max_price': max_price,
+    }
+
+    # 1. 컬럼 배열 마스크로 필터링 (대상 상품 자신은 제외)
+    mask = attributes.filter_mask(**filters)
+    mask[rows[0]] = False
+    candidate_ids = attributes.ids[mask]
+
+    # 2. 필터를 통과한 상품만 점수 계산: 스냅샷이 있으면 그 행렬에서 바로, 없으면 청크 단위로 벡터를 읽어 계산
+    if snapshot is not None:
+        if target_vectors is None:
+            query = snapshot.matrix[snapshot_rows[0]]
+        else:
+            query = build_fused_vectors(target_vectors, getattr(vector_source, 'fields', VECTOR_FIELDS), WEIGHTS)
+        top_ids, top_scores = snapshot.search_ids(candidate_ids, query, k=k)
+    else:
+        is_store = isinstance(vector_source, EmbeddingStore)
+        fused_profile = WEIGHT_PROFILE if is_store and WEIGHT_PROFILE in vector_source.fused else None
+        chunks = iter_vector_chunks(vector_source, candidate_ids, SCAN_CHUNK_SIZE, fused_profile)
+        top_ids, top_scores = stream_top_k(
+            target_vectors, chunks, k=k,
+            fields=getattr(vector_source, 'fields', VECTOR_FIELDS), weights=WEIGHTS, normalized=is_store
+        )
+
+    return jsonify({
+        'product_id': product_id,
+        'k': k,
+        'filters': filters,
+        'candidate_count': int(mask.sum()),
+        'recommendations': attach_scores(top_ids, top_scores),
+    })
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    """쿼리 캐시 hit/miss 카운터"""
+    return jsonify(db.cache.stats() if db.cache else {})
+
+@app.route('/healthz')
+def healthz():
+    """프로세스 생존 확인 (인덱스 로드 여부와 무관하게 200)"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready')
+def ready():
+    """인메모리 인덱스 로드와 IVF/양자화 인덱스 생성이 끝나야 200 (진행 중이면 503)"""
+    status = {
+        'indexes': {
+            'ready': index_state['ready'],
+            'ivf': catalog_index is not None,
+            'quantized': quantized_index is not None,
+            'errors': index_state['errors'],
+        },
+        'live_index': live_index.status() if live_index else False,
+    }
+    status['ready'] = index_state['ready'] and (live_index is None or status['live_index']['ready'])
+    return jsonify(status), 200 if status['ready'] else 503
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
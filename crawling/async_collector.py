@@ -0,0 +1,261 @@
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from curl_cffi.requests import AsyncSession
+
+from collector import parse_page, is_bot_page, find_product_info, extract_tags, build_params, BatchWriter
+
+HEADERS = {
+    "Referer": "https://www.musinsa.com/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7"
+}
+
+# ==========================================
+# 1. 속도 제한 / 동시성 제어
+# ==========================================
+class TokenBucket:
+    """
+    전역 토큰 버킷 속도 제한기.
+    초당 rate개씩 토큰이 차고(최대 capacity개), 요청 하나당 토큰 하나를 소비합니다.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # 토큰 하나가 찰 때까지 대기 (약간의 지터로 기계적인 패턴 회피)
+                await asyncio.sleep((1 - self.tokens) / self.rate + random.uniform(0, 0.05))
+
+
+class AdaptiveLimiter:
+    """
+    차단 신호(429/403, 봇 차단 페이지)에 따라 동시 요청 수를 조절하는 제한기 (AIMD).
+    - 차단 신호: 동시성 절반으로 감소 + 전체 요청을 cooldown초 동안 멈춤 (연속 차단 시 cooldown 2배)
+      동시에 돌아온 차단 응답 여러 개는 한 번의 이벤트로 처리
+    - 성공이 success_window번 이어지면 동시성 1 증가 (최대 max_limit)
+    기존의 일괄 time.sleep(180) 대신, 필요한 만큼만 속도를 늦췄다가 서서히 회복합니다.
+    """
+
+    def __init__(self, max_limit, min_limit=1, base_cooldown=5.0, max_cooldown=180.0, success_window=20):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = base_cooldown
+        self.paused_until = 0.0
+        self.last_block = 0.0
+        self.success_window = success_window
+        self.success_streak = 0
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.condition:
+            while self.in_flight >= self.limit:
+                await self.condition.wait()
+            self.in_flight += 1
+
+        # 차단 대응으로 일시 정지 중이면 풀릴 때까지 대기
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def on_success(self):
+        async with self.condition:
+            self.success_streak += 1
+            if self.success_streak >= self.success_window:
+                self.success_streak = 0
+                self.cooldown = self.base_cooldown
+                if self.limit < self.max_limit:
+                    self.limit += 1
+                    self.condition.notify_all()
+
+    async def on_block(self, reason, started_at=None):
+        """
+        차단 신호 한 번에 대한 대응. 동시에 보낸 요청들이 한꺼번에 차단되는 경우를 하나의 혼잡 이벤트로 보고,
+        일시 정지 중이거나 직전 대응 이전에 보낸 요청(started_at)의 차단은 무시합니다.
+        """
+        async with self.condition:
+            self.success_streak = 0
+            now = time.monotonic()
+            if now < self.paused_until or (started_at is not None and started_at < self.last_block):
+                return
+            self.last_block = now
+            self.limit = max(self.min_limit, self.limit // 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + self.cooldown)
+            print(f"\n🚨 [{reason}] 동시성 {self.limit}로 축소, {self.cooldown:.0f}초 일시 정지")
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+
+# ==========================================
+# 2. 수집 파이프라인
+# ==========================================
+async def fetch_product(session, gid, bucket, limiter):
+    """
+    상세 페이지와 태그 API를 가져옵니다. (파싱은 하지 않음)
+
+    Returns:
+        tuple: (상태, html, tag_json) 상태는 'ok' | 'blocked' | 'http_error'
+    """
+    async with limiter:
+        await bucket.acquire()
+        started_at = time.monotonic()
+        response = await session.get(f"https://www.musinsa.com/products/{gid}", timeout=10)
+
+        if response.status_code in (429, 403):
+            await limiter.on_block(f"HTTP {response.status_code}", started_at)
+            return 'blocked', None, None
+        if response.status_code != 200:
+            return 'http_error', None, None
+
+        tag_json = None
+        try:
+            await bucket.acquire()
+            tag_response = await session.get(
+                f"https://goods-detail.musinsa.com/api2/goods/{gid}/tags", timeout=5
+            )
+            if tag_response.status_code == 200:
+                tag_json = tag_response.json()
+        except Exception:
+            pass
+
+        return 'ok', response.content, tag_json
+
+
+def parse_product(gid, html, tag_json):
+    """
+    [스레드 풀에서 실행] HTML 파싱 + 파라미터 매핑
+
+    Returns:
+        tuple: (상태, params 또는 에러 메시지) 상태는 'ok' | 'blocked' | 'skip'
+    """
+    page_title, raw_json, error = parse_page(html)
+    if is_bot_page(page_title):
+        return 'blocked', page_title
+    if error:
+        return 'skip', error
+
+    product_info = find_product_info(raw_json, gid)
+    if not product_info:
+        return 'skip', "정보 매칭 실패"
+
+    return 'ok', build_params(gid, product_info, extract_tags(tag_json))
+
+
+async def crawl_async(rds, table_name, columns, goods_ids, crawl_log=None, concurrency=8, rate=4.0,
+                      max_retries=3, parse_workers=2, flush_rows=200, flush_interval=10.0):
+    """
+    비동기 동시 수집 모드.
+
+    Args:
+        table_name / columns: 저장할 테이블과 컬럼 (collector.load_table_columns)
+        goods_ids (list): 수집할 상품 ID
+        crawl_log (CrawlLog): 실패/스킵 ID를 기록할 로컬 로그 (collector.py)
+        concurrency (int): 최대 동시 요청 수 (차단 신호 시 자동 축소)
+        rate (float): 초당 최대 요청 수 (토큰 버킷, 상세 페이지 + 태그 API 합산)
+        max_retries (int): 차단/네트워크 오류 시 ID당 최대 재시도 횟수
+        parse_workers (int): HTML 파싱용 스레드 수
+        flush_rows / flush_interval: BatchWriter 저장 기준 (행 수 / 초)
+    """
+    bucket = TokenBucket(rate)
+    limiter = AdaptiveLimiter(concurrency)
+    parse_pool = ThreadPoolExecutor(max_workers=parse_workers)
+    loop = asyncio.get_running_loop()
+
+    id_queue = asyncio.Queue()
+    for gid in goods_ids:
+        id_queue.put_nowait((gid, 0))
+    # DB 저장은 별도 스레드에서 배치로 (큐가 가득 차면 put이 대기 -> 수집 속도 자동 조절)
+    writer = BatchWriter(rds, table_name, columns, crawl_log, flush_rows, flush_interval)
+
+    stats = {'parsed': 0, 'skipped': 0, 'failed': 0}
+    start_time = time.time()
+    total = len(goods_ids)
+
+    async def worker(session):
+        while True:
+            try:
+                gid, attempt = id_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                status, html, tag_json = await fetch_product(session, gid, bucket, limiter)
+                if status == 'ok':
+                    # 파싱은 스레드 풀에서 (이벤트 루프/수집 경로를 막지 않도록)
+                    status, result = await loop.run_in_executor(parse_pool, parse_product, gid, html, tag_json)
+                    if status == 'blocked':
+                        await limiter.on_block("봇 차단 화면")
+                    elif status == 'ok':
+                        await limiter.on_success()
+                        await asyncio.to_thread(writer.put, result)
+                        stats['parsed'] += 1
+                    else:
+                        stats['skipped'] += 1
+                        if crawl_log:
+                            crawl_log.mark_skipped(gid, result)
+                elif status == 'http_error':
+                    stats['skipped'] += 1
+                    if crawl_log:
+                        crawl_log.mark_skipped(gid, "HTTP 에러")
+
+                if status == 'blocked':
+                    if attempt < max_retries:
+                        id_queue.put_nowait((gid, attempt + 1))
+                    else:
+                        stats['failed'] += 1
+                        if crawl_log:
+                            crawl_log.mark_failed(gid, "차단")
+
+            except Exception as e:
+                print(f"\n❌ [{gid}] 에러 발생: {e}")
+                if attempt < max_retries:
+                    id_queue.put_nowait((gid, attempt + 1))
+                else:
+                    stats['failed'] += 1
+                    if crawl_log:
+                        crawl_log.mark_failed(gid, type(e).__name__)
+
+            done = stats['parsed'] + stats['skipped'] + stats['failed']
+            if done and done % 50 == 0:
+                elapsed = time.time() - start_time
+                print(f"[{done}/{total}] 저장 {writer.saved} (대기 {writer.queue.qsize()}) / "
+                      f"스킵 {stats['skipped']} / 실패 {stats['failed']} "
+                      f"(동시성 {limiter.limit}, {done / elapsed:.1f}개/초)", flush=True)
+
+    print(f"🚀 비동기 수집 시작: {total}개 (동시성 {concurrency}, 초당 {rate}건)")
+    try:
+        async with AsyncSession(impersonate="chrome", headers=HEADERS) as session:
+            await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    finally:
+        # 정상 종료/Ctrl-C(취소)/에러 모두 남은 행을 저장한 뒤 종료
+        writer.close()
+        parse_pool.shutdown()
+        stats['saved'] = writer.saved
+        stats['failed'] += writer.failed
+
+    elapsed = time.time() - start_time
+    print(f"\n🎉 비동기 수집 완료: 저장 {stats['saved']} / 스킵 {stats['skipped']} / 실패 {stats['failed']} "
+          f"({elapsed:.0f}초)")
+    return stats
@@ -0,0 +1,105 @@
+"""
+상세 페이지 파싱 마이크로 벤치마크
+
+저장해 둔 상세 페이지 HTML(fixtures)로 바이트 슬라이싱 추출(extract_page_data + json.loads)과
+BeautifulSoup 전체 파싱(parse_page_soup)의 처리량을 비교합니다.
+단일 프로세스에서 실행하므로 출력되는 pages/s가 곧 코어당 처리량입니다.
+
+crawling/fixtures에는 상세 페이지 구조만 본떠 만든 합성(synthetic) HTML 두 개(약 4.5KB,
+__NEXT_DATA__ 최신 구조 / dehydratedState 구 구조 각 1개)가 들어 있어 네트워크 없이 바로 실행할 수 있습니다.
+실제 페이지(수백 KB)보다 훨씬 작으므로 이 결과는 두 방식의 상대 비교용이며, 실제 처리량은
+--fetch로 저장한 실제 페이지로 측정해야 합니다.
+
+사용 예:
+    python bench_parse.py                                               # 합성 fixture로 벤치마크
+    python bench_parse.py --repeat 200
+    python bench_parse.py --fetch 3675233 4012345 --fixtures my_pages   # 실제 상세 페이지 저장
+    python bench_parse.py --fixtures my_pages --repeat 20
+"""
+import os
+import glob
+import json
+import time
+import argparse
+
+from collector import create_session, extract_page_data, parse_page_soup
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fetch_fixtures(goods_ids, fixture_dir):
+    """상품 상세 페이지 원본 바이트를 fixture_dir/{gid}.html로 저장합니다."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    session = create_session()
+    for gid in goods_ids:
+        response = session.get(f"https://www.musinsa.com/products/{gid}", timeout=10)
+        if response.status_code != 200:
+            print(f"⚠️ [{gid}] HTTP {response.status_code}")
+            continue
+        with open(os.path.join(fixture_dir, f"{gid}.html"), "wb") as f:
+            f.write(response.content)
+        print(f"✅ [{gid}] {len(response.content) / 1024:.0f}KB 저장")
+        time.sleep(1)
+
+
+def fast_parse(html):
+    page_title, payload = extract_page_data(html)
+    return page_title, json.loads(payload) if payload is not None else None
+
+
+def soup_parse(html):
+    page_title, raw_json, _ = parse_page_soup(html)
+    return page_title, raw_json
+
+
+def bench(name, parse, pages, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        for html in pages:
+            parse(html)
+    elapsed = time.process_time() - start
+    rate = len(pages) * repeat / elapsed if elapsed > 0 else float("inf")
+    print(f"{name:<12} {rate:>10.1f} pages/s/core  ({elapsed * 1000 / (len(pages) * repeat):.2f}ms/page)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="상세 페이지 파싱 벤치마크 (바이트 슬라이싱 vs BeautifulSoup)")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="상세 페이지 HTML 폴더 (기본값: crawling/fixtures)")
+    parser.add_argument("--fetch", nargs="*", default=[], help="저장할 상품 ID (지정 시 다운로드만 수행)")
+    parser.add_argument("--repeat", type=int, default=10, help="fixture 전체 반복 횟수")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_fixtures(args.fetch, args.fixtures)
+        return
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        print(f"❌ '{args.fixtures}'에 HTML 파일이 없습니다. --fetch로 먼저 저장하세요.")
+        return
+
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+
+    # 두 방식의 결과가 같은지 먼저 확인
+    mismatched = [
+        os.path.basename(path) for path, html in zip(paths, pages)
+        if fast_parse(html) != soup_parse(html)
+    ]
+    if mismatched:
+        print(f"⚠️ 결과 불일치 {len(mismatched)}건: {mismatched[:5]}")
+
+    print(f"📄 fixture {len(pages)}개 (평균 {sum(map(len, pages)) / len(pages) / 1024:.0f}KB), {args.repeat}회 반복")
+    if os.path.abspath(args.fixtures) == FIXTURE_DIR:
+        print("⚠️ 합성(synthetic) fixture 결과입니다. 실제 페이지보다 작아 pages/s가 높게 나오므로 "
+              "실제 처리량은 --fetch로 저장한 페이지로 측정하세요.")
+    fast = bench("bytes-slice", fast_parse, pages, args.repeat)
+    slow = bench("soup", soup_parse, pages, args.repeat)
+    print(f"🚀 {fast / slow:.1f}배 빠름")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,10 @@ import json
 import time
 import random
 import re
+import html as html_lib
+import argparse
+import queue
+import threading
 from curl_cffi import requests
 from bs4 import BeautifulSoup
 
@@ -15,53 +19,103 @@ from sqlalchemy.exc import SQLAlchemyError
 from db_client import RDSClient
 
 # ==========================================
-# 1. 환경 설정 및 DB 초기화
+# 1. 환경 설정
 # ==========================================
-rds = RDSClient()
+TABLE_NAME = "product_bottom"
+CSV_FILENAME = "musinsa_bottom_ids.csv"
 
-# 테이블 컬럼 정보 가져오기 (동적 쿼리 생성용)
-cols_result = rds.execute("SHOW COLUMNS FROM product_bottom")
-if not cols_result:
-    print("❌ 테이블 정보를 가져오지 못했습니다. DB 연결을 확인하세요.")
-    exit()
+# 봇 차단 페이지 제목 키워드
+BOT_TITLE_KEYWORDS = ["Access Denied", "Just a moment", "Security Check"]
 
-db_cols = [row['Field'] for row in cols_result]
-placeholders = ", ".join([f":{col}" for col in db_cols])
-# INSERT 구문 미리 생성
-insert_sql = f"INSERT IGNORE INTO product_bottom ({', '.join(db_cols)}) VALUES ({placeholders})"
+def load_table_columns(rds, table_name=TABLE_NAME):
+    """테이블 컬럼 목록을 가져옵니다. (BatchWriter가 이 컬럼으로 INSERT 구문을 생성)"""
+    cols_result = rds.execute(f"SHOW COLUMNS FROM {table_name}")
+    if not cols_result:
+        print("❌ 테이블 정보를 가져오지 못했습니다. DB 연결을 확인하세요.")
+        return None
+
+    return [row['Field'] for row in cols_result]
 
 # ==========================================
 # 2. CSV 파일 로드
 # ==========================================
-goods_ids = []
-csv_filename = "musinsa_bottom_ids.csv"
-
-try:
-    with open(csv_filename, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        next(reader) # 헤더 건너뛰기
-        for row in reader:
-            if row:
-                goods_ids.append(row[0])
-except FileNotFoundError:
-    print(f"❌ '{csv_filename}' 파일이 없습니다.")
-    exit()
+def load_goods_ids(csv_filename=CSV_FILENAME):
+    goods_ids = []
+    try:
+        with open(csv_filename, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader) # 헤더 건너뛰기
+            for row in reader:
+                if row:
+                    goods_ids.append(row[0])
+    except FileNotFoundError:
+        print(f"❌ '{csv_filename}' 파일이 없습니다.")
+        return None
+    return goods_ids
 
 # ==========================================
-# 3. 시작 위치 계산 (이어하기)
+# 3. 이어하기 (DB anti-join + 로컬 실패 로그)
 # ==========================================
-cnt_result = rds.execute("SELECT COUNT(*) as cnt FROM product_top")
-saved_count = cnt_result[0]['cnt'] if cnt_result else 0
+def load_saved_ids(rds, table_name=TABLE_NAME):
+    """대상 테이블에 이미 저장된 product_id 집합을 한 번의 쿼리로 가져옵니다."""
+    saved_ids = set()
+    for row in rds.execute_stream(f"SELECT product_id FROM {table_name}", chunk_size=50000):
+        saved_ids.add(str(row['product_id']))
+    return saved_ids
+
+class CrawlLog:
+    """
+    로컬 실패/스킵 로그 (append-only CSV: product_id,reason,timestamp)
+    - failed : 차단/네트워크 오류 등 다시 시도하면 성공할 수 있는 ID (--retry-failed 대상)
+    - skipped: 정보 매칭 실패/404 등 다시 받아도 같은 결과인 ID (기본적으로 이어하기에서 제외)
+    DB에 저장된 ID는 어차피 이어하기에서 빠지므로, 로그에 남아 있어도 상관없습니다.
+    """
+
+    def __init__(self, table_name=TABLE_NAME, log_dir="."):
+        self.failed_path = os.path.join(log_dir, f"{table_name}_failed.csv")
+        self.skipped_path = os.path.join(log_dir, f"{table_name}_skipped.csv")
+
+    @staticmethod
+    def _append(path, gid, reason):
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([gid, reason, int(time.time())])
+
+    @staticmethod
+    def _load(path):
+        if not os.path.exists(path):
+            return set()
+        with open(path, newline="", encoding="utf-8") as f:
+            return {row[0] for row in csv.reader(f) if row}
 
-start_index = 0 # 이미 저장된 개수만큼 건너뛰고 시작
-total_count = cnt_result # 목표 수집 개수 (필요시 수정)
+    def mark_failed(self, gid, reason):
+        self._append(self.failed_path, gid, reason)
 
-# 범위 보정
-if total_count > len(goods_ids):
-    total_count = len(goods_ids)
+    def mark_skipped(self, gid, reason):
+        self._append(self.skipped_path, gid, reason)
 
-print(f"📊 전체 ID: {len(goods_ids)}개 / 이미 저장됨: {saved_count}개")
-print(f"🚀 금일 작업 구간: {start_index}번부터 {total_count}번까지 (총 {total_count - start_index}개)")
+    def load_failed(self):
+        return self._load(self.failed_path)
+
+    def load_skipped(self):
+        return self._load(self.skipped_path)
+
+def select_pending_ids(goods_ids, saved_ids, crawl_log, retry_failed=False, include_skipped=False):
+    """
+    CSV ID 중 아직 DB에 없는 ID만 고릅니다. (CSV 순서 유지, 중복 제거)
+    retry_failed=True면 실패 로그에 있는 ID만 대상으로 합니다.
+    """
+    skipped = set() if include_skipped else crawl_log.load_skipped()
+    failed = crawl_log.load_failed() if retry_failed else None
+
+    pending, seen = [], set()
+    for gid in goods_ids:
+        if gid in seen or gid in saved_ids or gid in skipped:
+            continue
+        if failed is not None and gid not in failed:
+            continue
+        seen.add(gid)
+        pending.append(gid)
+    return pending
 
 # ==========================================
 # 4. 헬퍼 함수 정의
@@ -83,222 +137,456 @@ def smart_sleep():
     """
     prob = random.random() # 0.0 ~ 1.0 난수
 
-    if prob < 0.90:  
+    if prob < 0.90:
         # [90%] 고속 주행: 0.6초 ~ 1.3초
         delay = random.uniform(0.2, 0.6)
         mode = "⚡빠름"
-    elif prob < 0.99: 
+    elif prob < 0.99:
         # [9%] 잠깐 숨고르기: 2초 ~ 3초
         delay = random.uniform(1.0, 1.6)
         mode = "🧘숨고르기"
-    else: 
+    else:
         # [1%] 아주 가끔 멍때리기: 4초 ~ 6초 (패턴 끊기용)
         delay = random.uniform(4.0, 5.0)
         mode = "☕잠깐휴식"
-    
+
     print(f"   💤 [{mode}] {delay:.2f}초...", end="", flush=True)
     time.sleep(delay)
 
-# ==========================================
-# 5. 메인 크롤링 루프
-# ==========================================
-session = create_session()
-
-for idx in range(start_index, total_count):
-    gid = goods_ids[idx]
+NEXT_DATA_MARKER = b'id="__NEXT_DATA__"'
 
-    # [대기] 스마트 슬립 적용
-    smart_sleep()
-    print() # 줄바꿈
+def find_title_tag(data):
+    """<title> 또는 <title ...> 시작 위치 (<titlebar> 같은 다른 태그는 건너뜀, 없으면 -1)"""
+    start = data.find(b"<title")
+    while start != -1 and data[start + 6:start + 7] not in (b">", b" ", b"\t", b"\r", b"\n"):
+        start = data.find(b"<title", start + 6)
+    return start
 
-    # [세션 관리] 40~60회마다 세션 물갈이 (추적 회피)
-    if idx > start_index and idx % random.randint(40, 60) == 0:
-        print("\n🔄 [System] 브라우저 세션 새로고침...")
-        time.sleep(random.uniform(3, 5))
-        session = create_session()
+def extract_page_data(html):
+    """
+    [빠른 경로] 원본 바이트에서 <title>과 __NEXT_DATA__ JSON 구간을 직접 잘라냅니다.
+    DOM 트리를 만들지 않고 bytes.find만 사용하므로 BeautifulSoup보다 훨씬 빠릅니다.
 
-    print(f"[{idx+1}/{len(goods_ids)}] ID:{gid} 요청 중...", end=" ")
+    Returns:
+        tuple: (page_title, JSON 바이트 또는 None)
+    """
+    data = html if isinstance(html, bytes) else html.encode("utf-8")
+
+    page_title = ""
+    start = find_title_tag(data)
+    if start != -1:
+        start = data.find(b">", start) + 1
+        end = data.find(b"</title>", start)
+        if start > 0 and end != -1:
+            page_title = html_lib.unescape(data[start:end].decode("utf-8", "replace")).strip()
+
+    marker = data.find(NEXT_DATA_MARKER)
+    if marker == -1:
+        return page_title, None
+
+    start = data.find(b">", marker) + 1
+    end = data.find(b"</script>", start)
+    if start == 0 or end == -1:
+        return page_title, None
+    return page_title, data[start:end]
+
+def parse_page_soup(html):
+    """[느린 경로] BeautifulSoup으로 전체 HTML을 파싱해 제목과 __NEXT_DATA__ JSON을 추출합니다."""
+    soup = BeautifulSoup(html, "html.parser")
+    page_title = soup.title.get_text(strip=True) if soup.title else ""
+
+    next_data_tag = soup.find("script", {"id": "__NEXT_DATA__"})
+    if not next_data_tag:
+        return page_title, None, "JSON 태그 없음"
 
     try:
-        url = f"https://www.musinsa.com/products/{gid}"
-        
-        # -------------------------------------------------------
-        # STEP 1: 메인 페이지 요청 (Next.js 데이터 확보)
-        # -------------------------------------------------------
-        response = session.get(url, timeout=10)
-        
-        # HTTP 에러 핸들링
-        if response.status_code != 200:
-            print(f"⚠️ HTTP {response.status_code}", end=" ")
-            if response.status_code in [429, 403]:
-                print("\n🚨 [Warning] 차단 의심! 3분간 대기합니다.")
-                time.sleep(180)
-                session = create_session()
-            continue
+        return page_title, json.loads(next_data_tag.string), None
+    except json.JSONDecodeError:
+        return page_title, None, "JSON 디코딩 실패"
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        # 봇 차단 페이지 감지
-        page_title = soup.title.get_text(strip=True) if soup.title else ""
-        if any(k in page_title for k in ["Access Denied", "Just a moment", "Security Check"]):
-            print(f"\n🚨 [CRITICAL] 봇 차단 화면 감지됨! 2분 대기 후 스킵합니다.")
-            time.sleep(120)
-            continue
+def parse_page(html):
+    """
+    상세 페이지 HTML(str 또는 bytes)에서 제목과 __NEXT_DATA__ JSON을 추출합니다.
+    바이트 슬라이싱으로 먼저 시도하고, 실패하면 BeautifulSoup으로 다시 파싱합니다.
 
-        # __NEXT_DATA__ 추출
-        next_data_tag = soup.find("script", {"id": "__NEXT_DATA__"})
-        if not next_data_tag:
-            print(f"⚠️ JSON 태그 없음", end=" ")
-            continue
-            
+    Returns:
+        tuple: (page_title, raw_json 또는 None, 에러 메시지 또는 None)
+    """
+    page_title, payload = extract_page_data(html)
+    if payload is not None:
         try:
-            raw_json = json.loads(next_data_tag.string)
+            return page_title, json.loads(payload), None
         except json.JSONDecodeError:
-            print(f"⚠️ JSON 디코딩 실패", end=" ")
-            continue
+            pass # 잘라낸 구간이 어긋난 경우 (마크업 구조 변경 등)
 
-        # -------------------------------------------------------
-        # STEP 2: 상품 상세 데이터 위치 탐색
-        # -------------------------------------------------------
-        product_info = None
-        page_props = raw_json.get("props", {}).get("pageProps", {})
-
-        # 탐색 경로 1: props -> meta -> data (가장 최신 구조)
-        if "meta" in page_props and "data" in page_props["meta"]:
-            candidate = page_props["meta"]["data"]
-            if str(candidate.get("goodsNo", "")) == str(gid):
-                product_info = candidate
-
-        # 탐색 경로 2: dehydratedState (구 구조)
-        if not product_info:
-            queries = page_props.get("dehydratedState", {}).get("queries", [])
-            for query in queries:
-                data_node = query.get("state", {}).get("data", {})
-                if isinstance(data_node, dict):
-                    # 여러 키 패턴 확인
-                    if str(data_node.get("goodsNo", "")) == str(gid) or str(data_node.get("productNo", "")) == str(gid):
-                        product_info = data_node; break
-                    elif "product" in data_node and (str(data_node["product"].get("goodsNo", "")) == str(gid)):
-                        product_info = data_node["product"]; break
-                    elif "goods" in data_node and (str(data_node["goods"].get("goodsNo", "")) == str(gid)):
-                        product_info = data_node["goods"]; break
-
-        if not product_info:
-            print(f"⚠️ 정보 매칭 실패", end=" ")
-            continue
+    return parse_page_soup(html)
 
-        # -------------------------------------------------------
-        # STEP 3: 데이터 매핑
-        # -------------------------------------------------------
-        # 1) 상품명
-        product_name = (product_info.get("goodsNm") or product_info.get("goodsName") or product_info.get("productName") or "")
-        
-        # 2) 브랜드
-        brand_info = product_info.get("brandInfo", {})
-        if isinstance(brand_info, dict) and "brandName" in brand_info:
-            brand = brand_info["brandName"]
-        else:
-            brand = product_info.get("brandName", "") or product_info.get("brand", "")
-        
-        # 3) 가격
-        price_info = product_info.get("goodsPrice") or product_info.get("price") or {}
-        normal_price = price_info.get("normalPrice") or price_info.get("originPrice") or 0
-        sale_price = price_info.get("salePrice") or price_info.get("price") or 0
-        discount = price_info.get("discountRate", 0)
-
-        # 4) 카테고리
-        upper_category, lower_category = "", ""
-        cat_obj = product_info.get("category")
-        if isinstance(cat_obj, dict):
-            upper_category = cat_obj.get("categoryDepth1Title", "")
-            lower_category = cat_obj.get("categoryDepth2Title", "")
-        if not upper_category:
-            cats = product_info.get("categories", [])
-            if cats:
-                upper_category = cats[0].get("depth1Title", "")
-                lower_category = cats[0].get("depth2Title", "")
-
-        # 5) 성별
-        sex_data = product_info.get("sex")
-        gender = 0
-        if isinstance(sex_data, list):
-            if "남성" in sex_data and "여성" in sex_data: gender = 0
-            elif "남성" in sex_data: gender = 1
-            elif "여성" in sex_data: gender = 2
+def is_bot_page(page_title):
+    """봇 차단 페이지 감지"""
+    return any(k in page_title for k in BOT_TITLE_KEYWORDS)
+
+def find_product_info(raw_json, gid):
+    """
+    STEP 2: 상품 상세 데이터 위치 탐색
+    """
+    product_info = None
+    page_props = raw_json.get("props", {}).get("pageProps", {})
+
+    # 탐색 경로 1: props -> meta -> data (가장 최신 구조)
+    if "meta" in page_props and "data" in page_props["meta"]:
+        candidate = page_props["meta"]["data"]
+        if str(candidate.get("goodsNo", "")) == str(gid):
+            product_info = candidate
+
+    # 탐색 경로 2: dehydratedState (구 구조)
+    if not product_info:
+        queries = page_props.get("dehydratedState", {}).get("queries", [])
+        for query in queries:
+            data_node = query.get("state", {}).get("data", {})
+            if isinstance(data_node, dict):
+                # 여러 키 패턴 확인
+                if str(data_node.get("goodsNo", "")) == str(gid) or str(data_node.get("productNo", "")) == str(gid):
+                    product_info = data_node; break
+                elif "product" in data_node and (str(data_node["product"].get("goodsNo", "")) == str(gid)):
+                    product_info = data_node["product"]; break
+                elif "goods" in data_node and (str(data_node["goods"].get("goodsNo", "")) == str(gid)):
+                    product_info = data_node["goods"]; break
+
+    return product_info
+
+def extract_tags(tag_json):
+    """스타일 태그 API 응답에서 태그 리스트 추출"""
+    if tag_json and "data" in tag_json and "tags" in tag_json["data"]:
+        return tag_json["data"]["tags"]
+    return []
+
+def build_params(gid, product_info, tags_list):
+    """
+    STEP 3 + STEP 5: 상품 정보를 DB 파라미터로 매핑합니다.
+    """
+    # 1) 상품명
+    product_name = (product_info.get("goodsNm") or product_info.get("goodsName") or product_info.get("productName") or "")
+
+    # 2) 브랜드
+    brand_info = product_info.get("brandInfo", {})
+    if isinstance(brand_info, dict) and "brandName" in brand_info:
+        brand = brand_info["brandName"]
+    else:
+        brand = product_info.get("brandName", "") or product_info.get("brand", "")
+
+    # 3) 가격
+    price_info = product_info.get("goodsPrice") or product_info.get("price") or {}
+    normal_price = price_info.get("normalPrice") or price_info.get("originPrice") or 0
+    sale_price = price_info.get("salePrice") or price_info.get("price") or 0
+    discount = price_info.get("discountRate", 0)
+
+    # 4) 카테고리
+    upper_category, lower_category = "", ""
+    cat_obj = product_info.get("category")
+    if isinstance(cat_obj, dict):
+        upper_category = cat_obj.get("categoryDepth1Title", "")
+        lower_category = cat_obj.get("categoryDepth2Title", "")
+    if not upper_category:
+        cats = product_info.get("categories", [])
+        if cats:
+            upper_category = cats[0].get("depth1Title", "")
+            lower_category = cats[0].get("depth2Title", "")
+
+    # 5) 성별
+    sex_data = product_info.get("sex")
+    gender = 0
+    if isinstance(sex_data, list):
+        if "남성" in sex_data and "여성" in sex_data: gender = 0
+        elif "남성" in sex_data: gender = 1
+        elif "여성" in sex_data: gender = 2
+    else:
+        if sex_data in ["M", "MALE", "남성"]: gender = 1
+        elif sex_data in ["F", "FEMALE", "여성"]: gender = 2
+
+    # 6) 통계 (리뷰, 평점, 좋아요)
+    stat_info = (product_info.get("goodsReview") or product_info.get("goodsCount") or product_info.get("stat") or {})
+    review_cnt = stat_info.get("totalCount") or stat_info.get("reviewCount") or 0
+    rating = float(stat_info.get("satisfactionScore") or stat_info.get("reviewAverage") or 0.0)
+    like_cnt = (product_info.get("goodsCount", {}).get("likeCount") or product_info.get("stat", {}).get("likeCount") or 0)
+    cumulative = (product_info.get("cumulativeSales") or str(stat_info.get("purchaseCount", "")) or "")
+
+    final_tags_str = ','.join(tags_list)
+
+    size_json = "[]"
+    fit_season_dict = {"핏": [], "계절감": []}
+    fit_json = json.dumps(fit_season_dict, ensure_ascii=False)
+
+    # 파라미터 매핑
+    return {
+        "product_id": gid,
+        "product_name": product_name,
+        "brand": brand,
+        "original_price": normal_price,
+        "sale_price": sale_price,
+        "upper_category": upper_category,
+        "lower_category": lower_category,
+        "gender": gender,
+        "rating": rating,
+        "wish_count": like_cnt,
+        "review_count": review_cnt,
+        "size_info": size_json,
+        "discount_rate": discount,
+        "fit_season": fit_json,
+        "cumulative_sales": cumulative,
+        "style": final_tags_str
+    }
+
+# ==========================================
+# 5. DB 배치 저장
+# ==========================================
+_STOP = object()
+
+class BatchWriter:
+    """
+    파싱된 행을 모아 RDSClient.bulk_insert(다중 행 INSERT 한 문장)로 한 번에 저장하는 백그라운드 writer.
+    - mode: 'ignore'(INSERT IGNORE, 이미 있는 상품은 건너뜀) / 'upsert'(ON DUPLICATE KEY UPDATE update_columns)
+    - flush_rows개가 모이거나 flush_interval초가 지나면 저장 (먼저 도달하는 조건)
+    - 큐 크기를 max_pending으로 제한: DB가 느려지면 put()이 대기하므로 메모리가 무한히 늘지 않음
+    - close()는 남은 행을 모두 저장한 뒤 반환 (Ctrl-C/에러 시에도 finally에서 호출)
+    수집 루프는 put()만 하므로, 행마다 커넥션 획득 + 왕복 + 커밋을 기다리지 않습니다.
+    """
+
+    def __init__(self, rds, table_name, columns, crawl_log=None, flush_rows=200, flush_interval=10.0,
+                 max_pending=1000, mode='ignore', update_columns=None):
+        self.rds = rds
+        self.table_name = table_name
+        self.columns = columns
+        self.mode = mode
+        self.update_columns = update_columns
+        self.crawl_log = crawl_log
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.saved = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="batch-writer", daemon=True)
+        self.thread.start()
+
+    def put(self, params):
+        """행 하나를 저장 대기열에 추가 (큐가 가득 차면 빌 때까지 대기)"""
+        self.queue.put(params)
+
+    def close(self):
+        """남은 행을 모두 저장하고 writer 스레드를 종료합니다."""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def _run(self):
+        buffer = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                params = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                params = None
+
+            if params is _STOP:
+                break
+            if params is not None:
+                buffer.append(params)
+
+            if len(buffer) >= self.flush_rows or time.monotonic() >= deadline:
+                self._flush(buffer)
+                buffer = []
+                deadline = time.monotonic() + self.flush_interval
+
+        self._flush(buffer)
+
+    def _flush(self, buffer):
+        if not buffer:
+            return
+        try:
+            result = self.rds.bulk_insert(
+                self.table_name, buffer, self.columns, mode=self.mode, update_columns=self.update_columns
+            )
+        except Exception as e:
+            print(f"\n❌ 배치 저장 에러: {e}")
+            result = None
+
+        if result is None:
+            self.failed += len(buffer)
+            # 저장하지 못한 행은 실패 로그에 남겨 --retry-failed로 다시 수집
+            if self.crawl_log:
+                for params in buffer:
+                    self.crawl_log.mark_failed(params["product_id"], "DB 저장 실패")
         else:
-            if sex_data in ["M", "MALE", "남성"]: gender = 1
-            elif sex_data in ["F", "FEMALE", "여성"]: gender = 2
-
-        # 6) 통계 (리뷰, 평점, 좋아요)
-        stat_info = (product_info.get("goodsReview") or product_info.get("goodsCount") or product_info.get("stat") or {})
-        review_cnt = stat_info.get("totalCount") or stat_info.get("reviewCount") or 0
-        rating = float(stat_info.get("satisfactionScore") or stat_info.get("reviewAverage") or 0.0)
-        like_cnt = (product_info.get("goodsCount", {}).get("likeCount") or product_info.get("stat", {}).get("likeCount") or 0)
-        cumulative = (product_info.get("cumulativeSales") or str(stat_info.get("purchaseCount", "")) or "")
-
-        # -------------------------------------------------------
-        # STEP 4: 스타일 태그 (API 요청 방식)
-        # -------------------------------------------------------
-        tags_list = []
+            self.saved += len(buffer)
+
+# ==========================================
+# 6. 메인 크롤링 루프 (동기 모드)
+# ==========================================
+def run_sync(rds, table_name, columns, goods_ids, crawl_log, flush_rows=200, flush_interval=10.0):
+    writer = BatchWriter(rds, table_name, columns, crawl_log, flush_rows, flush_interval)
+    try:
+        _crawl_sync(writer, goods_ids, crawl_log)
+    except KeyboardInterrupt:
+        print("\n⛔ 중단 요청: 대기 중인 행을 저장합니다...")
+    finally:
+        writer.close()
+        print(f"💾 저장 {writer.saved}건 / 저장 실패 {writer.failed}건")
+
+def _crawl_sync(writer, goods_ids, crawl_log):
+    session = create_session()
+
+    for idx, gid in enumerate(goods_ids):
+
+        # [대기] 스마트 슬립 적용
+        smart_sleep()
+        print() # 줄바꿈
+
+        # [세션 관리] 40~60회마다 세션 물갈이 (추적 회피)
+        if idx > 0 and idx % random.randint(40, 60) == 0:
+            print("\n🔄 [System] 브라우저 세션 새로고침...")
+            time.sleep(random.uniform(3, 5))
+            session = create_session()
+
+        print(f"[{idx+1}/{len(goods_ids)}] ID:{gid} 요청 중...", end=" ")
+
         try:
-            # API 요청 전 아주 짧은 딜레이 (기계적 연속성 방지)
-            time.sleep(random.uniform(0.1, 0.3))
-            
-            tag_api_url = f"https://goods-detail.musinsa.com/api2/goods/{gid}/tags"
-            tag_response = session.get(tag_api_url, timeout=5)
-            
-            if tag_response.status_code == 200:
-                tag_json = tag_response.json()
-                if "data" in tag_json and "tags" in tag_json["data"]:
-                    tags_list = tag_json["data"]["tags"]
+            url = f"https://www.musinsa.com/products/{gid}"
+
+            # -------------------------------------------------------
+            # STEP 1: 메인 페이지 요청 (Next.js 데이터 확보)
+            # -------------------------------------------------------
+            response = session.get(url, timeout=10)
+
+            # HTTP 에러 핸들링
+            if response.status_code != 200:
+                print(f"⚠️ HTTP {response.status_code}", end=" ")
+                if response.status_code in [429, 403]:
+                    crawl_log.mark_failed(gid, f"HTTP {response.status_code}")
+                    print("\n🚨 [Warning] 차단 의심! 3분간 대기합니다.")
+                    time.sleep(180)
+                    session = create_session()
+                else:
+                    crawl_log.mark_skipped(gid, f"HTTP {response.status_code}")
+                continue
+
+            page_title, raw_json, error = parse_page(response.content)
+
+            # 봇 차단 페이지 감지
+            if is_bot_page(page_title):
+                crawl_log.mark_failed(gid, "봇 차단 화면")
+                print(f"\n🚨 [CRITICAL] 봇 차단 화면 감지됨! 2분 대기 후 스킵합니다.")
+                time.sleep(120)
+                continue
+
+            # __NEXT_DATA__ 추출
+            if error:
+                crawl_log.mark_skipped(gid, error)
+                print(f"⚠️ {error}", end=" ")
+                continue
+
+            # -------------------------------------------------------
+            # STEP 2: 상품 상세 데이터 위치 탐색
+            # -------------------------------------------------------
+            product_info = find_product_info(raw_json, gid)
+            if not product_info:
+                crawl_log.mark_skipped(gid, "정보 매칭 실패")
+                print(f"⚠️ 정보 매칭 실패", end=" ")
+                continue
+
+            # -------------------------------------------------------
+            # STEP 4: 스타일 태그 (API 요청 방식)
+            # -------------------------------------------------------
+            tags_list = []
+            try:
+                # API 요청 전 아주 짧은 딜레이 (기계적 연속성 방지)
+                time.sleep(random.uniform(0.1, 0.3))
+
+                tag_api_url = f"https://goods-detail.musinsa.com/api2/goods/{gid}/tags"
+                tag_response = session.get(tag_api_url, timeout=5)
+
+                if tag_response.status_code == 200:
+                    tags_list = extract_tags(tag_response.json())
+                else:
+                    # 404 등은 태그가 없는 상품일 수 있으므로 조용히 처리
+                    pass
+
+            except Exception as e:
+                print(f"(태그Skip)", end=" ")
+
+            # 수집 상태 출력
+            if tags_list:
+                print(f"✅ 태그({len(tags_list)})", end=" ")
             else:
-                # 404 등은 태그가 없는 상품일 수 있으므로 조용히 처리
-                pass
+                print(f"⚠️ 태그없음", end=" ")
 
-        except Exception as e:
-            print(f"(태그Skip)", end=" ")
+            # -------------------------------------------------------
+            # STEP 3 + 5: 데이터 매핑 및 DB 저장
+            # -------------------------------------------------------
+            params = build_params(gid, product_info, tags_list)
 
-        final_tags_str = ','.join(tags_list)
+            # 저장 대기열에 추가 (BatchWriter가 모아서 저장)
+            writer.put(params)
+            print(f"-> 저장대기")
 
-        # 수집 상태 출력
-        if final_tags_str:
-            print(f"✅ 태그({len(tags_list)})", end=" ")
-        else:
-            print(f"⚠️ 태그없음", end=" ")
-
-        # -------------------------------------------------------
-        # STEP 5: DB 저장
-        # -------------------------------------------------------
-        size_json = "[]"
-        fit_season_dict = {"핏": [], "계절감": []} 
-        fit_json = json.dumps(fit_season_dict, ensure_ascii=False)
-
-        # 파라미터 매핑
-        params = {
-            "product_id": gid,
-            "product_name": product_name,
-            "brand": brand,
-            "original_price": normal_price,
-            "sale_price": sale_price,
-            "upper_category": upper_category,
-            "lower_category": lower_category,
-            "gender": gender,
-            "rating": rating,
-            "wish_count": like_cnt,
-            "review_count": review_cnt,
-            "size_info": size_json,
-            "discount_rate": discount,
-            "fit_season": fit_json,
-            "cumulative_sales": cumulative,
-            "style": final_tags_str 
-        }
-
-        # 쿼리 실행
-        rds.execute(insert_sql, params)
-        print(f"-> 저장완료")
-
-    except Exception as e:
-        print(f"\n❌ 에러 발생: {e}")
-        time.sleep(5) # 에러 시 잠시 대기
-
-print("\n🎉 모든 작업이 완료되었습니다!")
\ No newline at end of file
+        except Exception as e:
+            crawl_log.mark_failed(gid, type(e).__name__)
+            print(f"\n❌ 에러 발생: {e}")
+            time.sleep(5) # 에러 시 잠시 대기
+
+    print("\n🎉 모든 작업이 완료되었습니다!")
+
+def main():
+    parser = argparse.ArgumentParser(description="무신사 상품 상세 크롤러")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync",
+                        help="sync: 기존 순차 수집, async: 동시 요청 + 토큰 버킷 속도 제한 (async_collector.py)")
+    parser.add_argument("--concurrency", type=int, default=8, help="[async] 최대 동시 요청 수")
+    parser.add_argument("--rate", type=float, default=4.0, help="[async] 초당 최대 요청 수 (토큰 버킷)")
+    parser.add_argument("--batch-rows", type=int, default=200, help="DB에 한 번에 저장할 행 수")
+    parser.add_argument("--flush-interval", type=float, default=10.0, help="행 수와 상관없이 저장할 최대 대기 시간(초)")
+    parser.add_argument("--limit", type=int, default=None, help="이번 실행에서 수집할 최대 개수")
+    parser.add_argument("--retry-failed", action="store_true", help="실패 로그에 있는 ID만 다시 수집")
+    parser.add_argument("--include-skipped", action="store_true", help="스킵 로그(정보 매칭 실패 등)에 있는 ID도 다시 수집")
+    args = parser.parse_args()
+
+    # ==========================================
+    # 1. DB 초기화
+    # ==========================================
+    rds = RDSClient()
+    columns = load_table_columns(rds)
+    if not columns:
+        exit()
+
+    goods_ids = load_goods_ids()
+    if goods_ids is None:
+        exit()
+
+    # ==========================================
+    # 3. 이어하기: DB에 없는 ID만 수집 대상으로 선정
+    # ==========================================
+    crawl_log = CrawlLog()
+    saved_ids = load_saved_ids(rds)
+    pending_ids = select_pending_ids(
+        goods_ids, saved_ids, crawl_log,
+        retry_failed=args.retry_failed, include_skipped=args.include_skipped
+    )
+    if args.limit:
+        pending_ids = pending_ids[:args.limit] # 금일 목표 수집 개수
+
+    print(f"📊 전체 ID: {len(goods_ids)}개 / 이미 저장됨: {len(saved_ids)}개")
+    print(f"🚀 금일 작업 대상: {len(pending_ids)}개" + (" (실패 로그 재시도)" if args.retry_failed else ""))
+
+    if args.mode == "async":
+        import asyncio
+        from async_collector import crawl_async
+        try:
+            asyncio.run(crawl_async(
+                rds, TABLE_NAME, columns, pending_ids, crawl_log=crawl_log,
+                concurrency=args.concurrency, rate=args.rate,
+                flush_rows=args.batch_rows, flush_interval=args.flush_interval
+            ))
+        except KeyboardInterrupt:
+            print("\n⛔ 중단되었습니다. (대기 중이던 행은 저장 완료)")
+    else:
+        run_sync(rds, TABLE_NAME, columns, pending_ids, crawl_log, args.batch_rows, args.flush_interval)
+
+if __name__ == "__main__":
+    main()
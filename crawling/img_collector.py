@@ -1,9 +1,45 @@
 from curl_cffi import requests
+import os
+import csv
 import time
 import random
+import asyncio
+import argparse
 import pandas as pd
 from tqdm import tqdm  # 진행률 바 라이브러리 추가
 
+LISTING_URL = "https://api.musinsa.com/api2/dp/v1/plp/goods"
+LISTING_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://www.musinsa.com/",
+    "Accept": "application/json"
+}
+# 스트리밍 저장 시 컬럼 순서
+LISTING_FIELDS = ["goodsNo", "thumbnail", "goodsName", "category"]
+
+def build_listing_params(category_code, page):
+    """목록 API 요청 파라미터 (페이지당 60개)"""
+    return {
+        "gf": "M",
+        "sortCode": "POPULAR",
+        "category": category_code,
+        "size": 60,
+        "testGroup": "",
+        "caller": "CATEGORY",
+        "page": page,
+        "seen": 0,
+        "seenAds": ""
+    }
+
+def parse_listing_item(item, category_code=None):
+    """목록 API 상품 하나를 저장할 행으로 변환"""
+    return {
+        "goodsNo": item.get("goodsNo"),
+        "thumbnail": item.get("thumbnail"),
+        "goodsName": item.get("goodsName"),
+        "category": category_code
+    }
+
 def crawl_musinsa_goods(category_code="001", max_pages=1000):
     """
     무신사 API를 통해 상품 ID와 썸네일 URL을 수집합니다.
@@ -14,11 +50,7 @@ def crawl_musinsa_goods(category_code="001", max_pages=1000):
     
     collected_data = []
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Referer": "https://www.musinsa.com/",
-        "Accept": "application/json"
-    }
+    headers = LISTING_HEADERS
 
     print(f"🚀 크롤링 시작: 카테고리 {category_code}, 최대 {max_pages} 페이지")
 
@@ -29,19 +61,8 @@ def crawl_musinsa_goods(category_code="001", max_pages=1000):
         # 진행 상황 텍스트 업데이트
         pbar.set_description(f"수집 중... Page {page}")
 
-        params = {
-            "gf": "M",
-            "sortCode": "POPULAR",
-            "category": category_code,
-            "size": 60,
-            "testGroup": "",
-            "caller": "CATEGORY",
-            "page": page,
-            "seen": 0,
-            "seenAds": ""
-        }
-        
-        url = "https://api.musinsa.com/api2/dp/v1/plp/goods"
+        params = build_listing_params(category_code, page)
+        url = LISTING_URL
 
         try:
             response = requests.get(url, headers=headers, params=params, timeout=10)
@@ -56,11 +77,7 @@ def crawl_musinsa_goods(category_code="001", max_pages=1000):
 
                 current_items = 0
                 for item in goods_list:
-                    item_info = {
-                        "goodsNo": item.get("goodsNo"),
-                        "thumbnail": item.get("thumbnail"),
-                        "goodsName": item.get("goodsName")
-                    }
+                    item_info = parse_listing_item(item, category_code)
                     collected_data.append(item_info)
                     current_items += 1
                 
@@ -82,26 +99,342 @@ def crawl_musinsa_goods(category_code="001", max_pages=1000):
 
 
 
+def parse_listing_stats(item):
+    """
+    목록 API 상품에서 자주 바뀌는 값(가격/할인율/리뷰/좋아요)을 DB 컬럼명으로 추출합니다.
+    응답에 없는 키는 넣지 않으므로, 저장된 값이 0으로 덮어써지지 않습니다.
+    (목록 API의 reviewScore는 100점 척도라 rating은 상세 페이지 수집에서만 갱신)
+    """
+    candidates = {
+        "original_price": (item.get("normalPrice"),),
+        "sale_price": (item.get("price"), item.get("salePrice")),
+        "discount_rate": (item.get("saleRate"), item.get("discountRate")),
+        "review_count": (item.get("reviewCount"),),
+        "wish_count": (item.get("likeCount"), item.get("wishCount")),
+    }
+    stats = {}
+    for column, values in candidates.items():
+        value = next((v for v in values if v is not None), None)
+        if value is not None:
+            stats[column] = int(value)
+    return stats
+
+# ==========================================
+# 동시 수집 + 스트리밍 저장 모드
+# ==========================================
+class CsvSink:
+    """페이지마다 받은 행을 CSV에 바로 append (이어쓰기 시 헤더 생략)"""
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=LISTING_FIELDS, extrasaction="ignore")
+        if new_file:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """페이지마다 받은 행을 Parquet row group으로 기록 (pyarrow 필요)"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet 저장에는 pyarrow가 필요합니다. (pip install pyarrow)")
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("goodsNo", pa.int64()), ("thumbnail", pa.string()),
+            ("goodsName", pa.string()), ("category", pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class DbSink:
+    """행을 collector.BatchWriter로 넘겨 다중 행 INSERT IGNORE로 모아서 저장"""
+
+    def __init__(self, rds, table_name):
+        from collector import BatchWriter
+
+        self.writer = BatchWriter(rds, table_name, LISTING_FIELDS)
+
+    def write(self, rows):
+        for row in rows:
+            self.writer.put(row)
+
+    def close(self):
+        self.writer.close()
+
+
+class PageLog:
+    """
+    재시도 후에도 실패한 목록 페이지 로그 (append-only CSV: category,page,reason,timestamp)
+    --retry-failed-pages 실행 시 읽어서 비운 뒤, 그 페이지만 다시 수집합니다. (또 실패하면 다시 기록)
+    """
+
+    def __init__(self, name="musinsa_listing", log_dir="."):
+        self.path = os.path.join(log_dir, f"{name}_failed_pages.csv")
+
+    def mark_failed(self, category_code, page, reason):
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow([category_code, page, reason, int(time.time())])
+
+    def load_failed(self):
+        """카테고리 코드 -> 실패한 페이지 리스트"""
+        failed = {}
+        if not os.path.exists(self.path):
+            return failed
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if row:
+                    failed.setdefault(row[0], set()).add(int(row[1]))
+        return {category_code: sorted(pages) for category_code, pages in failed.items()}
+
+    def pop_failed(self):
+        """실패 페이지를 읽고 로그를 비웁니다. (이번 실행에서 다시 실패한 페이지만 새로 남음)"""
+        failed = self.load_failed()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return failed
+
+
+def open_sink(out_path=None, rds=None, table_name=None):
+    """출력 경로 확장자(.csv / .parquet) 또는 DB 테이블로 저장 대상을 엽니다."""
+    if table_name:
+        return DbSink(rds, table_name)
+    if out_path.endswith(".parquet"):
+        return ParquetSink(out_path)
+    return CsvSink(out_path)
+
+
+async def fetch_listing_page(session, category_code, page, bucket, max_retries=3, backoff=1.0, delay=0.0):
+    """
+    목록 페이지 하나를 가져옵니다. 실패 시 지수 백오프로 재시도합니다.
+    delay초를 기다린 뒤 첫 요청을 보냅니다. (실패 페이지를 다시 대기열에 넣을 때 사용)
+
+    Returns:
+        list: 상품 목록 (빈 리스트면 마지막 페이지를 지남) 또는 None (재시도 후에도 실패)
+    """
+    if delay:
+        await asyncio.sleep(delay)
+    for attempt in range(max_retries + 1):
+        try:
+            await bucket.acquire()
+            response = await session.get(
+                LISTING_URL, params=build_listing_params(category_code, page), timeout=10
+            )
+            if response.status_code == 200:
+                return response.json().get('data', {}).get('list', [])
+            error = f"Status {response.status_code}"
+        except Exception as e:
+            error = str(e)
+
+        if attempt < max_retries:
+            await asyncio.sleep(backoff * (2 ** attempt) + random.uniform(0, 0.5))
+
+    tqdm.write(f"⚠️ [{category_code} / Page {page}] {max_retries}회 재시도 후 실패: {error}")
+    return None
+
+
+async def crawl_category_async(session, category_code, max_pages, sink, bucket, concurrency=8,
+                               max_retries=3, seen=None, row_parser=parse_listing_item,
+                               pages=None, page_retries=2, retry_backoff=5.0, page_log=None):
+    """
+    한 카테고리의 목록 페이지를 슬라이딩 윈도우(최대 concurrency개 동시 요청)로 수집합니다.
+    응답이 도착하는 대로 sink에 기록하므로 전체 결과를 메모리에 들고 있지 않습니다.
+    빈 페이지를 만나면 그 뒤 페이지는 더 요청하지 않습니다.
+    row_parser(item, category_code)로 목록 API 상품을 행으로 변환합니다. (goodsNo 키 필요)
+
+    재시도(max_retries) 후에도 실패한 페이지는 retry_backoff * 2^n초 뒤에 최대 page_retries번 다시
+    대기열에 넣고, 그래도 실패하면 page_log(PageLog)에 기록합니다. pages를 지정하면 그 페이지만 수집합니다.
+
+    Returns:
+        tuple: (저장한 행 수, 실패한 페이지 리스트)
+    """
+    seen = set() if seen is None else seen
+    todo = sorted(pages) if pages is not None else list(range(1, max_pages + 1))
+    last_page = todo[-1] if todo else 0 # 빈 페이지를 만나면 줄어듦
+    cursor = 0
+    in_flight = {} # task -> page
+    page_attempts = {} # page -> 다시 대기열에 넣은 횟수
+    failed_pages = []
+    saved = 0
+
+    pbar = tqdm(total=len(todo), unit="page", desc=f"카테고리 {category_code}")
+    while in_flight or (cursor < len(todo) and todo[cursor] <= last_page):
+        while cursor < len(todo) and todo[cursor] <= last_page and len(in_flight) < concurrency:
+            task = asyncio.create_task(
+                fetch_listing_page(session, category_code, todo[cursor], bucket, max_retries)
+            )
+            in_flight[task] = todo[cursor]
+            cursor += 1
+
+        done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            page = in_flight.pop(task, None)
+            if page is None: # 같은 회차에서 이미 취소 처리됨
+                continue
+            goods_list = task.result()
+
+            if goods_list is None and page <= last_page:
+                attempts = page_attempts.get(page, 0)
+                if attempts < page_retries:
+                    # 차단/일시 장애가 풀리도록 기다렸다가 같은 페이지를 다시 요청
+                    page_attempts[page] = attempts + 1
+                    delay = retry_backoff * (2 ** attempts)
+                    tqdm.write(f"🔁 [{category_code} / Page {page}] {delay:.0f}초 후 다시 요청 ({attempts + 1}/{page_retries})")
+                    retry = asyncio.create_task(
+                        fetch_listing_page(session, category_code, page, bucket, max_retries, delay=delay)
+                    )
+                    in_flight[retry] = page
+                    continue
+                failed_pages.append(page)
+                if page_log:
+                    page_log.mark_failed(category_code, page, f"{max_retries}회 재시도 x {page_retries}회 재요청 실패")
+            pbar.update(1)
+
+            if goods_list is None:
+                continue
+            if not goods_list:
+                if page - 1 < last_page:
+                    last_page = page - 1
+                    pbar.total = sum(1 for p in todo if p <= last_page)
+                    # 마지막 페이지 뒤로 이미 보낸 요청은 취소
+                    for other, other_page in list(in_flight.items()):
+                        if other_page > last_page:
+                            other.cancel()
+                            in_flight.pop(other)
+                continue
+            if page > last_page:
+                continue
+
+            # 인기순 정렬이라 수집 중 순위가 바뀌면 페이지 경계에서 중복이 생길 수 있음
+            rows = []
+            for item in goods_list:
+                row = row_parser(item, category_code)
+                if row["goodsNo"] not in seen:
+                    seen.add(row["goodsNo"])
+                    rows.append(row)
+            if rows:
+                sink.write(rows)
+                saved += len(rows)
+            pbar.set_postfix(total_collected=saved)
+
+    pbar.close()
+    return saved, sorted(failed_pages)
+
+
+async def crawl_listings_async(category_codes, sink, max_pages=1000, concurrency=8, rate=5.0, max_retries=3,
+                               row_parser=parse_listing_item, page_log=None, retry_pages=None):
+    """
+    여러 카테고리를 차례로 동시 수집합니다. (토큰 버킷/세션은 카테고리 간 공유)
+    retry_pages(카테고리 코드 -> 페이지 리스트, PageLog.pop_failed)를 지정하면 그 페이지만 다시 수집합니다.
+
+    Returns:
+        dict: 카테고리 코드 -> {'saved': 저장한 행 수, 'failed_pages': 실패한 페이지}
+    """
+    from async_collector import TokenBucket
+    from curl_cffi.requests import AsyncSession
+
+    bucket = TokenBucket(rate)
+    summary = {}
+    seen = set()
+
+    async with AsyncSession(impersonate="chrome", headers=LISTING_HEADERS) as session:
+        for category_code in category_codes:
+            pages = None
+            if retry_pages is not None:
+                pages = retry_pages.get(category_code)
+                if not pages:
+                    continue
+            start_time = time.time()
+            saved, failed_pages = await crawl_category_async(
+                session, category_code, max_pages, sink, bucket, concurrency, max_retries, seen, row_parser,
+                pages=pages, page_log=page_log
+            )
+            summary[category_code] = {'saved': saved, 'failed_pages': failed_pages}
+            print(f"✅ 카테고리 {category_code}: {saved}개 저장, 실패 페이지 {len(failed_pages)}개 "
+                  f"({time.time() - start_time:.0f}초)")
+
+    return summary
+
+
 # --- 실행부 ---
-if __name__ == "__main__":
-    # 테스트를 위해 페이지 수 설정 (예: 10페이지)
-    target_category = "001"
-    target_pages = 1000
-    
-    result_list = crawl_musinsa_goods(category_code=target_category, max_pages=target_pages)
+def main():
+    parser = argparse.ArgumentParser(description="무신사 목록 API 상품 ID/썸네일 수집")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync",
+                        help="sync: 기존 순차 수집, async: 동시 요청 + 스트리밍 저장")
+    parser.add_argument("--categories", nargs="+", default=["001"], help="수집할 카테고리 코드 (여러 개 가능)")
+    parser.add_argument("--max-pages", type=int, default=1000, help="카테고리당 최대 페이지 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="[async] 동시 요청 페이지 수")
+    parser.add_argument("--rate", type=float, default=5.0, help="[async] 초당 최대 요청 수")
+    parser.add_argument("--out", default="musinsa_listing.csv", help="[async] 저장 경로 (.csv / .parquet)")
+    parser.add_argument("--db-table", default=None, help="[async] 파일 대신 DB 테이블에 저장")
+    parser.add_argument("--retry-failed-pages", action="store_true",
+                        help="[async] 실패 페이지 로그에 있는 페이지만 다시 수집 (--categories 중에서)")
+    args = parser.parse_args()
 
-    print("\n" + "="*40)
-    print(f"✅ 수집 완료 요약")
-    print(f"- 대상 카테고리: {target_category}")
-    print(f"- 총 수집 상품 수: {len(result_list)}개")
-    print("="*40 + "\n")
+    if args.mode == "async":
+        rds = None
+        if args.db_table:
+            from db_client import RDSClient
+            rds = RDSClient()
 
-    # 결과 샘플 확인
-    if result_list:
-        print("🔍 수집 데이터 샘플 (상위 3개):")
-        for data in result_list[:3]:
-            print(data)
+        page_log = PageLog(args.db_table or os.path.splitext(os.path.basename(args.out))[0])
+        retry_pages = page_log.pop_failed() if args.retry_failed_pages else None
+        if retry_pages is not None:
+            print(f"🔁 실패 페이지 재수집: {sum(len(retry_pages.get(c, [])) for c in args.categories)}개")
 
+        out_path = args.out
+        if retry_pages is not None and out_path.endswith(".parquet"):
+            # Parquet는 이어 쓸 수 없으므로 재수집분은 별도 파일로 (CSV는 이어 쓰기)
+            out_path = out_path[:-len(".parquet")] + f"_retry_{int(time.time())}.parquet"
+        sink = open_sink(out_path, rds, args.db_table)
+        try:
+            summary = asyncio.run(crawl_listings_async(
+                args.categories, sink, args.max_pages, args.concurrency, args.rate,
+                page_log=page_log, retry_pages=retry_pages
+            ))
+        finally:
+            sink.close()
 
+        print("\n" + "="*40)
+        print(f"✅ 수집 완료 요약 ({args.db_table or args.out})")
+        for category_code, result in summary.items():
+            print(f"- {category_code}: {result['saved']}개, 실패 페이지 {result['failed_pages'][:10]}")
+        if any(result['failed_pages'] for result in summary.values()):
+            print(f"💡 실패 페이지는 {page_log.path}에 기록됨 (--retry-failed-pages로 다시 수집)")
+        print("="*40 + "\n")
+        return
 
-            
\ No newline at end of file
+    for target_category in args.categories:
+        result_list = crawl_musinsa_goods(category_code=target_category, max_pages=args.max_pages)
+
+        print("\n" + "="*40)
+        print(f"✅ 수집 완료 요약")
+        print(f"- 대상 카테고리: {target_category}")
+        print(f"- 총 수집 상품 수: {len(result_list)}개")
+        print("="*40 + "\n")
+
+        # 결과 샘플 확인
+        if result_list:
+            print("🔍 수집 데이터 샘플 (상위 3개):")
+            for data in result_list[:3]:
+                print(data)
+
+if __name__ == "__main__":
+    main()
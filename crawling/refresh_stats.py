@@ -0,0 +1,135 @@
+"""
+가격/통계 증분 갱신 (목록 API 기반)
+
+가격, 할인율, 리뷰/좋아요 수는 매일 바뀌지만, collector.py로 다시 수집하면 상품마다
+상세 페이지 + 태그 API 두 번의 요청과 HTML 파싱이 필요합니다.
+이 스크립트는 목록 API(요청당 60개)에서 값을 받아 DB에 저장된 값과 비교하고,
+바뀐 행만 다중 행 upsert(ON DUPLICATE KEY UPDATE)로 갱신합니다. 목록에는 있지만 DB에 없는 신규 상품만 상세 페이지를 수집합니다.
+
+사용 예:
+    python refresh_stats.py --categories 003 --table product_bottom
+    python refresh_stats.py --categories 001 --table product_top --detail-mode async
+    python refresh_stats.py --categories 003 --dry-run
+"""
+import time
+import asyncio
+import argparse
+
+from db_client import RDSClient
+from collector import TABLE_NAME, BatchWriter, CrawlLog, load_table_columns, run_sync
+from img_collector import parse_listing_item, parse_listing_stats, crawl_listings_async
+
+# 목록 API로 갱신하는 컬럼 (parse_listing_stats의 키)
+REFRESH_COLUMNS = ["original_price", "sale_price", "discount_rate", "review_count", "wish_count"]
+
+
+def load_stored_stats(rds, table_name):
+    """product_id -> {컬럼: 값} (저장된 갱신 대상 컬럼 값)"""
+    stored = {}
+    query = f"SELECT product_id, {', '.join(REFRESH_COLUMNS)} FROM {table_name}"
+    for row in rds.execute_stream(query, chunk_size=50000):
+        stored[int(row['product_id'])] = {
+            col: int(row[col]) if row[col] is not None else None for col in REFRESH_COLUMNS
+        }
+    return stored
+
+
+class DeltaSink:
+    """
+    crawl_listings_async의 sink: 목록 API 행을 저장된 값과 비교해
+    바뀐 행은 갱신 대기열(BatchWriter)로, DB에 없는 상품은 신규 ID 목록으로 보냅니다.
+    갱신은 product_id 기준 upsert로 REFRESH_COLUMNS만 덮어씁니다. (DB에 있는 행만 대기열에 넣으므로 UPDATE와 같음)
+    """
+
+    def __init__(self, rds, table_name, stored, dry_run=False):
+        self.stored = stored
+        self.dry_run = dry_run
+        self.new_ids = []
+        self.seen = 0
+        self.changed = 0
+
+        self.writer = None if dry_run else BatchWriter(
+            rds, table_name, ["product_id"] + REFRESH_COLUMNS, flush_rows=1000,
+            mode='upsert', update_columns=REFRESH_COLUMNS
+        )
+
+    def write(self, rows):
+        for row in rows:
+            gid = int(row["goodsNo"])
+            self.seen += 1
+
+            current = self.stored.get(gid)
+            if current is None:
+                self.new_ids.append(str(gid))
+                continue
+
+            # 목록 응답에 없는 컬럼은 저장된 값 유지
+            updated = {col: row.get(col, current[col]) for col in REFRESH_COLUMNS}
+            if updated == current:
+                continue
+
+            self.changed += 1
+            if self.writer:
+                self.writer.put({"product_id": gid, **updated})
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+def parse_listing_row(item, category_code):
+    return {**parse_listing_item(item, category_code), **parse_listing_stats(item)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="목록 API로 가격/통계를 증분 갱신하고 신규 상품만 상세 수집")
+    parser.add_argument("--categories", nargs="+", required=True, help="목록을 조회할 카테고리 코드")
+    parser.add_argument("--table", default=TABLE_NAME, help="갱신할 상품 테이블")
+    parser.add_argument("--max-pages", type=int, default=1000, help="카테고리당 최대 페이지 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 페이지 수")
+    parser.add_argument("--rate", type=float, default=5.0, help="초당 최대 요청 수")
+    parser.add_argument("--detail-mode", choices=["sync", "async", "none"], default="sync",
+                        help="신규 상품 상세 페이지 수집 방식 (none: 수집하지 않음)")
+    parser.add_argument("--dry-run", action="store_true", help="변경 건수만 출력하고 DB는 수정하지 않음")
+    args = parser.parse_args()
+
+    rds = RDSClient()
+    start_time = time.time()
+
+    stored = load_stored_stats(rds, args.table)
+    print(f"📊 저장된 상품: {len(stored)}개 ({args.table})")
+
+    # 1. 목록 API로 가격/통계 수집 + 비교 + 바뀐 행만 갱신
+    sink = DeltaSink(rds, args.table, stored, args.dry_run)
+    try:
+        summary = asyncio.run(crawl_listings_async(
+            args.categories, sink, args.max_pages, args.concurrency, args.rate,
+            row_parser=parse_listing_row
+        ))
+    finally:
+        sink.close()
+
+    failed_pages = sum(len(result['failed_pages']) for result in summary.values())
+    result_text = " (dry-run)" if args.dry_run else f" (저장 {sink.writer.saved}, 실패 {sink.writer.failed})"
+    print(f"🔄 목록 {sink.seen}개 확인 / 변경 {sink.changed}개{result_text} / 신규 {len(sink.new_ids)}개 "
+          f"/ 실패 페이지 {failed_pages}개 ({time.time() - start_time:.0f}초)")
+
+    # 2. 신규 상품만 상세 페이지 수집
+    if args.dry_run or args.detail_mode == "none" or not sink.new_ids:
+        return
+
+    columns = load_table_columns(rds, args.table)
+    if not columns:
+        return
+
+    crawl_log = CrawlLog(args.table)
+    print(f"🚀 신규 상품 상세 수집: {len(sink.new_ids)}개")
+    if args.detail_mode == "async":
+        from async_collector import crawl_async
+        asyncio.run(crawl_async(rds, args.table, columns, sink.new_ids, crawl_log=crawl_log))
+    else:
+        run_sync(rds, args.table, columns, sink.new_ids, crawl_log)
+
+
+if __name__ == "__main__":
+    main()
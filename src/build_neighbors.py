@@ -0,0 +1,267 @@
+"""
+상품별 유사 상품(Top-K 이웃) 오프라인 사전 계산 배치
+
+upper_category마다 모든 상품의 fused 벡터 행렬을 만들고, 블록 단위 행렬 곱
+(M[block] @ M.T)을 프로세스 풀에 나눠 계산하여 각 상품의 Top-K 이웃을
+Redis Sorted Set(product:{id}:neighbors)에 저장합니다.
+카탈로그는 크롤러가 돌 때만 바뀌므로, Flask는 요청마다 유사도를 다시 계산하지 않고 O(K)로 읽기만 합니다.
+
+fused 행렬은 임시 .npy 파일로 저장하고 워커들이 mmap으로 열어 페이지 캐시를 공유합니다.
+
+사용 예:
+    python -m src.build_neighbors --k 50 --workers 4                # 전체 재계산
+    python -m src.build_neighbors --incremental                     # 이웃 목록이 없는 상품만
+    python -m src.build_neighbors --incremental --ids 123 456       # 지정한 상품만 (벡터가 바뀐 경우)
+    python -m src.build_neighbors --incremental --removed 789       # 삭제된 상품을 이웃 목록에서 제거
+    python -m src.build_neighbors --store data/embedding_store      # Redis 대신 임베딩 저장소에서 벡터 로드
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# 상위 폴더(src)를 모듈 경로에 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.db_client import RDSClient
+from src.redis_client import RedisClient
+from src.recommender import VECTOR_FIELDS, WEIGHT_PROFILES, build_fused_vectors, iter_vector_chunks
+
+# 워커 프로세스별로 열어 둔 fused 행렬 (경로 -> memmap)
+_worker_matrices = {}
+
+
+def _open_matrix(path):
+    if path not in _worker_matrices:
+        _worker_matrices[path] = np.load(path, mmap_mode='r')
+    return _worker_matrices[path]
+
+
+def top_k_block(matrix_path, rows, k):
+    """
+    워커에서 실행: 쿼리 행 rows에 대해 전체 행렬과의 유사도를 구하고 행별 Top-K를 반환합니다.
+
+    Returns:
+        tuple: (rows, 이웃 행 번호 (b, k), 점수 (b, k)) 점수 내림차순
+    """
+    matrix = _open_matrix(matrix_path)
+    scores = np.asarray(matrix[rows]) @ np.asarray(matrix).T
+
+    # 자기 자신은 제외
+    scores[np.arange(len(rows)), rows] = -np.inf
+
+    k = min(k, scores.shape[1] - 1)
+    if k <= 0:
+        empty = np.zeros((len(rows), 0))
+        return rows, empty.astype(np.int64), empty.astype(np.float32)
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return rows, np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def load_category_matrix(vector_source, product_ids, fields, weights, normalized, chunk_size):
+    """카테고리 상품들의 fused 행렬 (벡터가 있는 상품만)과 그 ID 배열을 만듭니다."""
+    ids_parts, fused_parts = [], []
+    for chunk_ids, vectors in iter_vector_chunks(vector_source, product_ids, chunk_size):
+        if len(chunk_ids):
+            ids_parts.append(chunk_ids)
+            fused_parts.append(build_fused_vectors(vectors, fields, weights, normalized))
+
+    if not ids_parts:
+        return np.zeros(0, dtype=np.int64), None
+    return np.concatenate(ids_parts), np.vstack(fused_parts)
+
+
+def build_category(executor, matrix_path, ids, query_rows, k, block_size):
+    """query_rows 각각의 Top-K 이웃을 블록 단위로 나눠 워커에 맡기고 결과를 모읍니다."""
+    neighbors = {}
+    futures = [
+        executor.submit(top_k_block, matrix_path, query_rows[start:start + block_size], k)
+        for start in range(0, len(query_rows), block_size)
+    ]
+    for future in futures:
+        rows, top_rows, top_scores = future.result()
+        for row, nbr_rows, nbr_scores in zip(rows, top_rows, top_scores):
+            neighbors[int(ids[row])] = (ids[nbr_rows], nbr_scores)
+    return neighbors
+
+
+def reverse_block(matrix_path, start, end, changed_rows, k):
+    """
+    워커에서 실행: 행 start~end 각각에 대해 변경된 상품들(changed_rows) 중 점수 상위 k개를 계산합니다.
+
+    Returns:
+        tuple: (start, changed_rows 안의 위치 (b, kk), 점수 (b, kk)) 자기 자신은 -inf
+    """
+    matrix = _open_matrix(matrix_path)
+    scores = np.asarray(matrix[start:end]) @ np.asarray(matrix[changed_rows]).T
+
+    # 자기 자신과의 점수는 제외
+    self_hits = np.nonzero(np.arange(start, end)[:, None] == np.asarray(changed_rows)[None, :])
+    scores[self_hits] = -np.inf
+
+    kk = min(k, len(changed_rows))
+    top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+    return start, top, np.take_along_axis(scores, top, axis=1)
+
+
+def reverse_update(executor, matrix_path, ids, row_ids, changed_rows, k, block_size):
+    """
+    변경된 상품들이 row_ids 상품들의 이웃 목록에 새로 들어가야 하는지 워커에 나눠 계산합니다.
+    각 상품마다 변경된 상품들 중 점수 상위 k개를 돌려주며, Redis에서 기존 목록과 병합 후 k개로 잘라냅니다.
+    (기존 목록에 변경된 상품이 없는 상품만 대상: 병합 결과가 전체 재계산과 같음)
+    """
+    rows = np.flatnonzero(np.isin(ids, row_ids))
+    futures = [
+        executor.submit(reverse_block, matrix_path, int(start), int(end), changed_rows, k)
+        for start, end in _contiguous_blocks(rows, block_size)
+    ]
+
+    updates = {}
+    for future in futures:
+        start, top, top_scores = future.result()
+        for offset in range(len(top)):
+            valid = np.isfinite(top_scores[offset])
+            updates[int(ids[start + offset])] = (ids[changed_rows][top[offset][valid]], top_scores[offset][valid])
+    return updates
+
+
+def _contiguous_blocks(rows, block_size):
+    """정렬된 행 번호들을 최대 block_size 길이의 연속 구간 (start, end)들로 나눕니다."""
+    if len(rows) == 0:
+        return
+    start = prev = rows[0]
+    for row in rows[1:]:
+        if row != prev + 1 or row - start >= block_size:
+            yield start, prev + 1
+            start = row
+        prev = row
+    yield start, prev + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카테고리별 Top-K 이웃 사전 계산 후 Redis Sorted Set에 저장")
+    parser.add_argument('--k', type=int, default=50, help="상품당 저장할 이웃 수")
+    parser.add_argument('--profile', default=os.getenv('WEIGHT_PROFILE', 'default'), help="가중치 프로필")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="프로세스 풀 크기")
+    parser.add_argument('--block-size', type=int, default=512, help="워커 한 번에 처리할 쿼리 행 수")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="벡터를 한 번에 읽을 상품 수")
+    parser.add_argument('--store', default=None, help="EmbeddingStore 디렉터리 (없으면 Redis에서 벡터 로드)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="이웃 목록이 없는 상품(+ --ids로 지정한 상품)만 다시 계산")
+    parser.add_argument('--ids', type=int, nargs='*', default=[], help="벡터가 변경된 상품 ID")
+    parser.add_argument('--removed', type=int, nargs='*', default=[],
+                        help="삭제된 상품 ID (증분 모드는 지난 배치 이후 발행된 삭제도 함께 반영)")
+    args = parser.parse_args()
+
+    db = RDSClient()
+    redis_conn = RedisClient()
+    if not redis_conn.client:
+        sys.exit(1)
+
+    if args.store:
+        from src.embedding_store import EmbeddingStore
+        vector_source = EmbeddingStore(args.store)
+        fields, normalized = vector_source.fields, True
+    else:
+        vector_source = redis_conn
+        fields, normalized = VECTOR_FIELDS, False
+    weights = WEIGHT_PROFILES[args.profile]
+
+    catalog_query = """
+        SELECT p.product_id, c.upper_category
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+        WHERE c.upper_category IN ('상의', '하의', '신발', '아우터')
+    """
+    by_category = {}
+    for row in db.execute_stream(catalog_query, chunk_size=10000):
+        by_category.setdefault(row['upper_category'], []).append(row['product_id'])
+
+    # 배치 시작 시점의 카탈로그 버전 (다음 증분 배치는 이 버전 이후의 삭제부터 반영)
+    catalog_version = redis_conn.get_catalog_version()
+    removed_ids = set(args.removed)
+    if args.incremental:
+        meta = redis_conn.get_neighbors_meta() or {}
+        if meta and (meta.get('profile') != args.profile or meta.get('k') != args.k):
+            print(f"⚠️ 기존 이웃 목록의 프로필/k({meta.get('profile')}/{meta.get('k')})가 "
+                  f"요청({args.profile}/{args.k})과 달라 전체 재계산합니다.")
+            args.incremental = False
+        elif 'catalog_version' in meta:
+            changes = redis_conn.get_catalog_changes(meta['catalog_version'])
+            if changes is None:
+                print("⚠️ 변경 로그가 잘려 지난 배치 이후 삭제된 상품을 알 수 없습니다. (--removed로 지정하거나 전체 재계산)")
+            else:
+                removed_ids.update(changes[2])
+
+    # 다시 추가된 상품은 삭제로 보지 않음
+    removed_ids -= {pid for product_ids in by_category.values() for pid in product_ids}
+    removed_ids = sorted(removed_ids)
+    if removed_ids:
+        redis_conn.delete_product_neighbors(removed_ids)
+        print(f"🗑️ 삭제된 상품 {len(removed_ids)}개의 이웃 목록 제거")
+
+    start_time = time.time()
+    total_saved = 0
+    changed_ids = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir, ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for category, product_ids in by_category.items():
+            ids, matrix = load_category_matrix(
+                vector_source, product_ids, fields, weights, normalized, args.chunk_size
+            )
+            if matrix is None:
+                print(f"⚠️ {category}: 벡터가 있는 상품이 없습니다.")
+                continue
+
+            matrix_path = os.path.join(tmp_dir, f"{len(os.listdir(tmp_dir))}.npy")
+            np.save(matrix_path, matrix)
+
+            if args.incremental:
+                existing = redis_conn.get_neighbor_ids(ids.tolist())
+                changed = set(args.ids)
+                changed_rows = np.array([
+                    row for row, pid in enumerate(ids.tolist()) if pid not in existing or pid in changed
+                ], dtype=np.int64)
+
+                # 기존 목록에 변경/삭제된 상품이 들어 있는 상품은 항목이 빠지면 나머지로 다시 채워야 하므로 전체 재계산
+                changed_set = set(ids[changed_rows].tolist())
+                others = [pid for pid in ids.tolist() if pid not in changed_set]
+                stale = redis_conn.get_neighbor_lists_containing(others, ids[changed_rows].tolist() + removed_ids)
+                query_rows = np.union1d(changed_rows, np.flatnonzero(np.isin(ids, list(stale))))
+            else:
+                query_rows = np.arange(len(ids))
+
+            if len(query_rows) == 0:
+                print(f"✅ {category}: 갱신할 상품 없음")
+                continue
+
+            # 1. 대상 상품들의 이웃 목록 새로 계산
+            neighbors = build_category(executor, matrix_path, ids, query_rows, args.k, args.block_size)
+            total_saved += redis_conn.set_many_product_neighbors(neighbors)
+
+            # 2. 증분 모드: 나머지 상품의 목록에 변경된 상품을 병합 (기존 목록 + 변경 상품 중 상위 k개)
+            if args.incremental and len(changed_rows):
+                rest = [pid for pid in ids.tolist() if pid not in neighbors]
+                updates = reverse_update(executor, matrix_path, ids, rest, changed_rows, args.k, args.block_size)
+                redis_conn.set_many_product_neighbors(updates, replace=False, max_size=args.k)
+                changed_ids.extend(ids[changed_rows].tolist())
+
+            print(f"✅ {category}: {len(query_rows)}/{len(ids)}개 상품 이웃 저장 ({time.time() - start_time:.1f}초)")
+
+    redis_conn.set_neighbors_meta(args.profile, args.k, catalog_version)
+    # 증분 모드: 새로 반영된 상품을 발행하여 서빙 중인 인메모리 인덱스(live_index.py)도 갱신
+    if changed_ids:
+        version = redis_conn.publish_catalog_changes(added_ids=changed_ids)
+        print(f"📢 카탈로그 버전 {version} 발행 ({len(changed_ids)}개 상품)")
+    print(f"🎉 이웃 사전 계산 완료: {total_saved}개 상품 ({time.time() - start_time:.1f}초)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,179 @@
 import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
 from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from dotenv import load_dotenv
 
 # 환경 변수 로드
 load_dotenv()
 
+# 재시도하면 성공할 수 있는 MySQL 에러 코드
+# 1205: Lock wait timeout, 1213: Deadlock, 2006: server has gone away, 2013: Lost connection
+TRANSIENT_ERROR_CODES = {1205, 1213, 2006, 2013}
+
+# 쿼리에서 테이블명을 뽑아 캐시 무효화 태그로 사용
+TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?', re.IGNORECASE)
+
+def _json_default(value):
+    """조회 결과의 Decimal/날짜 값을 JSON으로 직렬화"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"JSON으로 직렬화할 수 없는 값입니다: {type(value).__name__}")
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, ensure_ascii=False).encode('utf-8')
+
+def _loads(payload):
+    return json.loads(payload)
+
+class QueryCache:
+    """
+    RDSClient용 조회 결과 캐시.
+    정규화된 SQL + 바인딩 파라미터를 키로 하여 프로세스 내 LRU(+TTL)에 저장하고,
+    redis_client를 넘기면 여러 워커가 공유하는 Redis 계층도 함께 사용합니다.
+
+    무효화는 테이블 태그 단위입니다. 테이블마다 버전 번호를 두고 키에 포함시키므로,
+    products 등에 쓰기가 일어나 버전이 올라가면 해당 테이블을 읽은 캐시는 모두 더 이상 조회되지 않습니다.
+    (Redis 계층을 쓰면 버전도 Redis에 두어 다른 워커의 쓰기도 반영됩니다.)
+
+    결과는 JSON으로 직렬화합니다. (공유 Redis 값을 역직렬화할 때 코드가 실행되지 않도록)
+    Decimal은 int/float, 날짜는 ISO 문자열로 바뀝니다.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300, redis_client=None, prefix='qcache'):
+        """
+        Args:
+            max_entries (int): 프로세스 내 캐시 최대 항목 수 (넘으면 가장 오래 안 쓴 항목부터 제거)
+            ttl (int): 기본 유효 시간(초)
+            redis_client: decode_responses=False인 redis.Redis 인스턴스 (예: RedisClient().raw_client)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis_client
+        self.prefix = prefix
+
+        self.local = OrderedDict()  # key -> (만료 시각, JSON 직렬화된 결과)
+        self.local_versions = {}    # 테이블 -> 버전 (Redis 계층이 없을 때)
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def extract_tables(query):
+        return sorted({name.lower() for name in TABLE_PATTERN.findall(query)})
+
+    def _versions(self, tables):
+        if self.redis is not None:
+            try:
+                values = self.redis.mget([f"{self.prefix}:ver:{t}" for t in tables]) if tables else []
+                return [int(v) if v else 0 for v in values]
+            except Exception as e:
+                print(f"⚠️ 캐시 버전 조회 오류: {e}")
+        return [self.local_versions.get(t, 0) for t in tables]
+
+    def make_key(self, query, params):
+        normalized = ' '.join(query.split())
+        tables = self.extract_tables(normalized)
+        versions = self._versions(tables)
+        raw = json.dumps([normalized, params or {}, versions], sort_keys=True, default=str, ensure_ascii=False)
+        return f"{self.prefix}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (hit 여부, 결과). 결과는 매번 새로 역직렬화한 복사본입니다.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.local.get(key)
+            if entry and entry[0] > now:
+                self.local.move_to_end(key)
+                self.hits += 1
+                return True, _loads(entry[1])
+            if entry:
+                del self.local[key]
+
+        if self.redis is not None:
+            try:
+                payload = self.redis.get(key)
+            except Exception as e:
+                print(f"⚠️ Redis 캐시 조회 오류: {e}")
+                payload = None
+            if payload is not None:
+                self._set_local(key, payload, self.ttl)
+                with self.lock:
+                    self.redis_hits += 1
+                return True, _loads(payload)
+
+        with self.lock:
+            self.misses += 1
+        return False, None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.ttl
+        payload = _dumps(value)
+        self._set_local(key, payload, ttl)
+
+        if self.redis is not None:
+            try:
+                self.redis.set(key, payload, ex=ttl)
+            except Exception as e:
+                print(f"⚠️ Redis 캐시 저장 오류: {e}")
+
+    def _set_local(self, key, payload, ttl):
+        with self.lock:
+            self.local[key] = (time.time() + ttl, payload)
+            self.local.move_to_end(key)
+            while len(self.local) > self.max_entries:
+                self.local.popitem(last=False)
+
+    def invalidate(self, tables):
+        """테이블 태그의 버전을 올려 해당 테이블을 읽은 캐시 항목을 모두 무효화합니다."""
+        tables = [t.lower() for t in tables]
+        if not tables:
+            return
+
+        with self.lock:
+            for table in tables:
+                self.local_versions[table] = self.local_versions.get(table, 0) + 1
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for table in tables:
+                    pipe.incr(f"{self.prefix}:ver:{table}")
+                pipe.execute()
+            except Exception as e:
+                print(f"⚠️ 캐시 무효화 오류: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.redis_hits + self.misses
+            return {
+                'hits': self.hits,
+                'redis_hits': self.redis_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.redis_hits) / total if total else 0.0,
+                'size': len(self.local),
+            }
+
 class RDSClient:
-    def __init__(self):
+    def __init__(self, cache=None):
         # 1. DB URL 생성 (mysql+mysqlconnector 드라이버 사용)
         db_user = os.getenv('DB_USER')
         db_password = os.getenv('DB_PASSWORD')
@@ -32,14 +198,63 @@ class RDSClient:
             print(f"❌ Engine 생성 중 오류 발생: {e}")
             self.engine = None
 
-    def execute(self, query, params=None):
+        # 조회 결과 캐시 (QueryCache, 선택 사항)
+        self.cache = cache
+
+        # 캐시 없이(또는 로컬 캐시만으로) 만든 클라이언트(크롤러/배치)도 쓰기 시 공유 Redis의 테이블 버전을 올려
+        # 앱 워커들의 캐시가 TTL까지 남지 않도록 함 (QUERY_CACHE_SHARED=0이면 사용 안 함)
+        self.shared_invalidation = (cache is None or cache.redis is None) and \
+            os.getenv('QUERY_CACHE_SHARED', '1') == '1'
+        self._invalidator = None
+
+    def _shared_invalidator(self):
+        """무효화 전용 QueryCache (앱과 같은 Redis / 키 prefix, 첫 쓰기 시 생성)"""
+        if self._invalidator is None:
+            try:
+                import redis
+            except ImportError:
+                print("⚠️ redis 패키지가 없어 공유 캐시를 무효화하지 못합니다.")
+                self.shared_invalidation = False
+                return None
+            self._invalidator = QueryCache(max_entries=0, redis_client=redis.Redis(
+                host=os.getenv('REDIS_HOST', 'localhost'),
+                port=int(os.getenv('REDIS_PORT', 6379)),
+                db=int(os.getenv('REDIS_DB', 0))
+            ))
+        return self._invalidator
+
+    def _invalidate_tables(self, tables):
+        """테이블들의 캐시를 무효화 (자기 캐시 + 공유 Redis의 테이블 버전). 모든 쓰기 경로가 이 함수를 거칩니다."""
+        if self.cache:
+            self.cache.invalidate(tables)
+        if self.shared_invalidation:
+            invalidator = self._shared_invalidator()
+            if invalidator:
+                invalidator.invalidate(tables)
+
+    def _invalidate(self, query):
+        """쓰기 쿼리가 건드린 테이블의 캐시를 무효화"""
+        self._invalidate_tables(QueryCache.extract_tables(query))
+
+    def execute(self, query, params=None, use_cache=False, ttl=None):
         """
         단일 쿼리 실행 및 단일 커밋 (기존 함수)
+
+        Args:
+            use_cache (bool): True면 SELECT 결과를 self.cache에 저장/조회 (캐시가 설정된 경우만)
+            ttl (int): 캐시 유효 시간(초), 기본값은 캐시 설정값
         """
         if not self.engine:
             print("DB 엔진이 초기화되지 않았습니다.")
             return None
 
+        cache_key = None
+        if use_cache and self.cache:
+            cache_key = self.cache.make_key(query, params)
+            hit, cached = self.cache.get(cache_key)
+            if hit:
+                return cached
+
         result_data = None
 
         try:
@@ -49,25 +264,107 @@ class RDSClient:
 
                 if result.returns_rows:
                     result_data = [dict(row) for row in result.mappings()]
+                    if cache_key:
+                        self.cache.set(cache_key, result_data, ttl)
                 else:
                     connection.commit()
                     result_data = result.rowcount
+                    self._invalidate(query)
 
         except SQLAlchemyError as e:
             print(f"⚠️ 쿼리 실행 에러: {e}")
         
         return result_data
     
+    def execute_stream(self, query, params=None, chunk_size=1000, output='rows'):
+        """
+        서버 사이드 커서(stream_results)로 결과를 chunk_size개씩 받아오는 제너레이터.
+        execute와 달리 전체 결과를 메모리에 올리지 않으므로 products 전체 같은 큰 조회에 사용합니다.
+
+        Args:
+            query (str): SELECT 쿼리
+            params (dict): 바인딩 파라미터
+            chunk_size (int): 서버에서 한 번에 가져올 행 수 (yield_per)
+            output (str): 내보낼 형태
+                - 'rows'   : 행(dict) 하나씩
+                - 'chunks' : 행(dict) 리스트 단위
+                - 'pandas' : pandas.DataFrame 단위
+                - 'numpy'  : {컬럼명: np.ndarray} 단위
+
+        사용 예:
+            for df in db.execute_stream("SELECT * FROM products", output='pandas', chunk_size=5000):
+                ...
+        """
+        if not self.engine:
+            print("DB 엔진이 초기화되지 않았습니다.")
+            return
+
+        try:
+            with self.engine.connect() as connection:
+                # stream_results: 서버 사이드 커서(pymysql SSCursor) 사용, yield_per: 버퍼 크기
+                connection = connection.execution_options(stream_results=True, yield_per=chunk_size)
+                result = connection.execute(text(query), params or {})
+
+                for partition in result.mappings().partitions(chunk_size):
+                    rows = [dict(row) for row in partition]
+
+                    if output == 'rows':
+                        yield from rows
+                    elif output == 'chunks':
+                        yield rows
+                    elif output == 'pandas':
+                        import pandas as pd
+                        yield pd.DataFrame(rows, columns=list(result.keys()))
+                    elif output == 'numpy':
+                        import numpy as np
+                        yield {col: np.array([row[col] for row in rows]) for col in result.keys()}
+                    else:
+                        raise ValueError(f"지원하지 않는 output 형식: {output}")
+
+        except SQLAlchemyError as e:
+            print(f"⚠️ 스트리밍 쿼리 실행 에러: {e}")
+
+    @staticmethod
+    def _is_transient(error):
+        """재시도 가능한 일시적 오류(데드락, 락 대기 초과, 연결 끊김)인지 판별"""
+        orig = getattr(error, 'orig', None)
+        code = orig.args[0] if orig is not None and getattr(orig, 'args', None) else None
+        return code in TRANSIENT_ERROR_CODES or getattr(error, 'connection_invalidated', False)
+
+    def _execute_with_retry(self, stmt, params, max_retries=3, backoff=0.5):
+        """
+        한 묶음을 실행하고 커밋합니다. 일시적 오류면 지수 백오프(backoff * 2^n초)로 재시도합니다.
+
+        Returns:
+            int: 영향을 받은 행의 개수
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                with self.engine.connect() as connection:
+                    result = connection.execute(stmt, params)
+                    connection.commit()
+                    return result.rowcount
+            except OperationalError as e:
+                if attempt >= max_retries or not self._is_transient(e):
+                    raise
+                delay = backoff * (2 ** attempt)
+                print(f"🔁 일시적 DB 오류, {delay:.1f}초 후 재시도 ({attempt + 1}/{max_retries}): {e.orig}")
+                time.sleep(delay)
+
     # ⭐️ 추가된 배치 삽입 함수
-    def execute_batch(self, query, params_list):
+    def execute_batch(self, query, params_list, chunk_size=1000, max_retries=3, backoff=0.5):
         """
         대량의 데이터를 효율적으로 삽입하기 위한 배치 삽입 함수.
-        하나의 트랜잭션과 하나의 execute 호출로 여러 행을 처리합니다.
+        params_list를 chunk_size개씩 나눠 executemany로 실행하고, 묶음마다 커밋합니다.
+        (중간에 실패해도 앞선 묶음은 반영되며, 패킷 크기 제한(max_allowed_packet)도 피할 수 있습니다.)
 
         Args:
             query (str): 삽입 쿼리 (예: INSERT INTO table (a, b) VALUES (:a, :b))
             params_list (list): 바인딩할 파라미터 딕셔너리들의 리스트.
                                 (예: [{'a': 1, 'b': 10}, {'a': 2, 'b': 20}, ...])
+            chunk_size (int): 한 번에 실행/커밋할 행 수
+            max_retries (int): 일시적 오류 시 묶음당 최대 재시도 횟수
+            backoff (float): 첫 재시도 대기 시간(초), 재시도마다 2배
         
         Returns:
             int: 영향을 받은 총 행의 개수 (성공 시) 또는 None (실패 시)
@@ -80,27 +377,86 @@ class RDSClient:
             print("삽입할 데이터(params_list)가 비어 있습니다.")
             return 0
 
+        stmt = text(query)
+        try:
+            return self._run_chunks(
+                [(stmt, params_list[i:i + chunk_size]) for i in range(0, len(params_list), chunk_size)],
+                len(params_list), max_retries, backoff
+            )
+        finally:
+            # 일부 묶음만 커밋됐을 수도 있으므로 성공/실패와 상관없이 무효화
+            self._invalidate(query)
+
+    def bulk_insert(self, table, rows, columns=None, mode='insert', update_columns=None,
+                    chunk_size=1000, max_retries=3, backoff=0.5):
+        """
+        여러 행을 하나의 INSERT ... VALUES (...), (...), ... 문으로 렌더링하여 chunk_size개씩 삽입합니다.
+        executemany보다 왕복/파싱 횟수가 적어 수만 건 단위 적재에 적합합니다.
+
+        Args:
+            table (str): 테이블명
+            rows (list): 삽입할 행 딕셔너리 리스트
+            columns (list): 삽입할 컬럼 (기본값: 첫 행의 키)
+            mode (str): 'insert' | 'ignore' (INSERT IGNORE) | 'upsert' (ON DUPLICATE KEY UPDATE)
+            update_columns (list): upsert 시 갱신할 컬럼 (기본값: columns 전체)
+
+        Returns:
+            int: 영향을 받은 총 행의 개수 (upsert는 MySQL 규칙상 갱신된 행을 2로 셈) 또는 None (실패 시)
+        """
+        if not self.engine:
+            print("DB 엔진이 초기화되지 않았습니다.")
+            return None
+
+        if not rows:
+            print("삽입할 데이터(rows)가 비어 있습니다.")
+            return 0
+
+        columns = list(columns or rows[0].keys())
+        verb = "INSERT IGNORE INTO" if mode == 'ignore' else "INSERT INTO"
+        suffix = ""
+        if mode == 'upsert':
+            update_columns = update_columns or columns
+            suffix = " ON DUPLICATE KEY UPDATE " + ", ".join(f"{col} = VALUES({col})" for col in update_columns)
+
+        chunks = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            params = {}
+            values = []
+            for r, row in enumerate(chunk):
+                names = []
+                for c, col in enumerate(columns):
+                    params[f"p{r}_{c}"] = row.get(col)
+                    names.append(f":p{r}_{c}")
+                values.append(f"({', '.join(names)})")
+
+            query = f"{verb} {table} ({', '.join(columns)}) VALUES {', '.join(values)}{suffix}"
+            chunks.append((text(query), params))
+
+        try:
+            return self._run_chunks(chunks, len(rows), max_retries, backoff)
+        finally:
+            # 일부 묶음만 커밋됐을 수도 있으므로 성공/실패와 상관없이 무효화
+            self._invalidate_tables([table])
+
+    def _run_chunks(self, chunks, total_count, max_retries, backoff):
+        """(stmt, params) 묶음들을 차례로 실행/커밋하고 처리 속도를 출력합니다."""
         total_rows = 0
+        start_time = time.time()
         
         try:
-            # 1. 연결 획득 및 트랜잭션 시작
-            with self.engine.connect() as connection:
-                stmt = text(query)
-                
-                # 2. execute 호출 시 파라미터 리스트를 전달하여 배치 실행
-                result = connection.execute(stmt, params_list)
-                
-                # 3. 한 번의 커밋으로 모든 변경사항 확정
-                connection.commit()
-                
-                total_rows = result.rowcount
-                print(f"✅ 배치 삽입 성공! 총 {total_rows}개 행 삽입.")
+            for i, (stmt, params) in enumerate(chunks):
+                total_rows += self._execute_with_retry(stmt, params, max_retries, backoff)
                 
         except SQLAlchemyError as e:
-            print(f"❌ 배치 쿼리 실행 에러: {e}")
-            # 배치 삽입 실패 시 자동으로 롤백됩니다.
+            print(f"❌ 배치 쿼리 실행 에러 ({i + 1}/{len(chunks)}번째 묶음): {e}")
+            # 실패한 묶음만 롤백되고, 앞선 묶음은 이미 커밋되어 있습니다.
+            print(f"   이전 묶음까지 {total_rows}개 행은 반영되었습니다.")
             return None
-            
+
+        elapsed = max(time.time() - start_time, 1e-6)
+        print(f"✅ 배치 삽입 성공! 총 {total_rows}개 행 삽입. "
+              f"({total_count}건 / {elapsed:.2f}초, {total_count / elapsed:,.0f} rows/s)")
         return total_rows
 
 # (클래스 정의 끝)
\ No newline at end of file
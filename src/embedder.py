@@ -0,0 +1,527 @@
+"""
+상품 이미지/텍스트 임베딩 배치 파이프라인 (CPU)
+
+[이미지]
+1. products.img_url 썸네일을 스레드 풀로 동시에 내려받아 디스크 캐시에 저장 (이미 받은 파일은 재사용)
+2. torch DataLoader(num_workers)로 디코딩/리사이즈를 여러 프로세스에서 병렬 처리
+3. torchvision 백본을 torch.inference_mode()에서 배치 단위로 실행
+4. float32 결과를 part-XXXXX.npz (ids, embeddings)로 나눠 바로바로 저장
+
+이미 임베딩이 있는 상품(출력 폴더의 part 파일 + --existing으로 지정한 .npz)은 건너뛰므로,
+크롤링 후 다시 실행하면 새 상품만 계산합니다. --merge로 part 파일을 하나의 .npz로 합치면
+embedding_store.py (image_emb=경로.npz)에 그대로 넣을 수 있습니다.
+
+[텍스트]
+brand_info_emb / lower_cat_emb / brand_cat_emb는 같은 브랜드/카테고리 상품이라면 입력 문자열이 같습니다.
+서로 다른 문자열마다 한 번만 임베딩하고, (모델명 + 문자열) 해시를 키로 디스크에 캐시한 뒤
+상품별로 다시 펼쳐서 {field}.npz (ids, embeddings)로 저장합니다.
+크롤링 후 다시 실행하면 새로 생기거나 바뀐 문자열만 계산합니다.
+
+사용 예:
+    python -m src.embedder image --out data/image_emb --threads 8 --num-workers 4
+    python -m src.embedder image --out data/image_emb --existing top_embedded.npz --merge data/image_emb.npz
+    python -m src.embedder text --out data/text_emb --cache-dir data/text_cache
+
+끝나면 새로 임베딩되었거나 벡터가 바뀐 상품과 DB에서 삭제된 상품을 카탈로그 변경 로그(Redis)에
+발행합니다. (--no-publish로 끌 수 있음, src/live_index.py 참고)
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+import torch
+import torchvision
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+
+# 상위 폴더(src)를 모듈 경로에 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.db_client import RDSClient
+from src.live_index import diff_catalog, publish_changes
+
+DEFAULT_IMAGE_MODEL = 'convnext_tiny' # 출력 768차원 (Redis 벡터 차원과 동일)
+DEFAULT_TEXT_MODEL = 'jhgan/ko-sroberta-multitask' # 한국어 문장 임베딩, 768차원
+BRAND_DESCRIPTIONS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'brand_descriptions.json'))
+DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://www.musinsa.com/"
+}
+
+
+# ==========================================
+# 1. 이미지 다운로드 (디스크 캐시)
+# ==========================================
+def image_cache_path(cache_dir, url):
+    """URL -> 캐시 파일 경로 (URL 해시로 파일명 결정)"""
+    return os.path.join(cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.img')
+
+
+def download_image(session, url, path, timeout=10):
+    """이미지 하나를 내려받아 path에 저장합니다. 이미 있으면 건너뜁니다."""
+    if os.path.exists(path):
+        return True
+    if url.startswith('//'):
+        url = 'https:' + url
+
+    try:
+        response = session.get(url, headers=DOWNLOAD_HEADERS, timeout=timeout)
+        if response.status_code != 200 or not response.content:
+            return False
+    except requests.RequestException:
+        return False
+
+    # 임시 파일에 쓴 뒤 교체 (중단되더라도 깨진 파일이 캐시에 남지 않도록)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp" # 같은 URL을 여러 스레드가 받는 경우 대비
+    with open(tmp_path, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def download_images(product_ids, img_urls, cache_dir, workers=16):
+    """
+    썸네일을 동시에 내려받습니다.
+
+    Returns:
+        tuple: (ids, paths) 다운로드(또는 캐시)에 성공한 상품만
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = [image_cache_path(cache_dir, url) for url in img_urls]
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            ok = list(executor.map(lambda args: download_image(session, *args), zip(img_urls, paths)))
+
+    ids = [pid for pid, success in zip(product_ids, ok) if success]
+    paths = [path for path, success in zip(paths, ok) if success]
+    print(f"✅ 이미지 준비 완료: {len(ids)}/{len(product_ids)}개 (실패 {len(product_ids) - len(ids)}개)")
+    return ids, paths
+
+
+# ==========================================
+# 2. 디코딩 / 전처리 (DataLoader 워커)
+# ==========================================
+class ImageDataset(Dataset):
+    """캐시된 이미지 파일을 열어 백본 전처리(transform)를 적용합니다. 깨진 이미지는 valid=False"""
+
+    def __init__(self, paths, transform, image_size=224):
+        self.paths = paths
+        self.transform = transform
+        self.image_size = image_size
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        try:
+            with Image.open(self.paths[index]) as img:
+                return index, self.transform(img.convert('RGB')), True
+        except Exception:
+            return index, torch.zeros(3, self.image_size, self.image_size), False
+
+
+def _init_loader_worker(_):
+    # 워커 프로세스마다 intra-op 스레드를 늘리면 메인 프로세스의 추론 스레드와 경합함
+    torch.set_num_threads(1)
+
+
+# ==========================================
+# 3. 백본
+# ==========================================
+def build_image_backbone(model_name=DEFAULT_IMAGE_MODEL):
+    """
+    분류 헤드를 제거한 torchvision 백본과 전처리를 반환합니다.
+
+    Returns:
+        tuple: (model, transform)
+    """
+    weights = torchvision.models.get_model_weights(model_name).DEFAULT
+    model = torchvision.models.get_model(model_name, weights=weights)
+
+    # 마지막 분류 레이어를 Identity로 교체하여 특징 벡터를 출력
+    if hasattr(model, 'fc'):                 # resnet 계열
+        model.fc = torch.nn.Identity()
+    elif hasattr(model, 'heads'):            # vit 계열
+        model.heads = torch.nn.Identity()
+    elif hasattr(model, 'classifier'):       # convnext / efficientnet 계열
+        model.classifier[-1] = torch.nn.Identity()
+    else:
+        raise ValueError(f"분류 헤드를 찾을 수 없는 모델입니다: {model_name}")
+
+    return model.eval(), weights.transforms()
+
+
+# ==========================================
+# 4. 출력 (part 파일 단위로 저장)
+# ==========================================
+def load_embedded_ids(out_dir, existing_paths=()):
+    """출력 폴더의 part 파일과 기존 .npz에 이미 들어 있는 상품 ID 집합"""
+    embedded = set()
+    for path in list(existing_paths) + sorted(glob.glob(os.path.join(out_dir, 'part-*.npz'))):
+        with np.load(path) as data:
+            embedded.update(int(pid) for pid in data['ids'])
+    return embedded
+
+
+def write_part(out_dir, ids, embeddings):
+    """다음 번호의 part 파일로 저장합니다. (임시 파일에 쓴 뒤 교체)"""
+    part_no = len(glob.glob(os.path.join(out_dir, 'part-*.npz')))
+    path = os.path.join(out_dir, f"part-{part_no:05d}.npz")
+    tmp_path = os.path.join(out_dir, f"tmp-{part_no:05d}.npz")
+    np.savez(tmp_path, ids=np.asarray(ids, dtype=np.int64), embeddings=np.asarray(embeddings, dtype=np.float32))
+    os.replace(tmp_path, path)
+    return path
+
+
+def merge_parts(out_dir, out_path, existing_paths=(), drop_ids=()):
+    """
+    기존 .npz + part 파일들을 하나의 (ids, embeddings) .npz로 합칩니다. (같은 ID는 뒤의 값 사용)
+    drop_ids(DB에서 삭제된 상품)는 결과에서 뺍니다.
+    """
+    ids_parts, emb_parts = [], []
+    for path in list(existing_paths) + sorted(glob.glob(os.path.join(out_dir, 'part-*.npz'))):
+        with np.load(path) as data:
+            ids_parts.append(np.asarray(data['ids'], dtype=np.int64))
+            emb_parts.append(np.asarray(data['embeddings'], dtype=np.float32))
+
+    if not ids_parts:
+        print("⚠️ 병합할 임베딩 파일이 없습니다.")
+        return
+
+    ids = np.concatenate(ids_parts)
+    embeddings = np.vstack(emb_parts)
+    # 뒤에서부터 첫 등장 위치 = 마지막 값
+    _, last = np.unique(ids[::-1], return_index=True)
+    keep = len(ids) - 1 - last
+    keep = keep[~np.isin(ids[keep], np.asarray(list(drop_ids), dtype=np.int64))]
+    np.savez(out_path, ids=ids[keep], embeddings=embeddings[keep])
+    print(f"✅ 병합 완료: {out_path} ({len(keep)}개 상품)")
+
+
+# ==========================================
+# 5. 파이프라인
+# ==========================================
+def embed_images(product_ids, img_urls, out_dir, model_name=DEFAULT_IMAGE_MODEL, batch_size=64,
+                 num_workers=4, threads=None, download_workers=16, cache_dir=None, flush_every=20):
+    """
+    상품 이미지 임베딩을 계산해 out_dir에 part 파일로 저장합니다.
+
+    Args:
+        product_ids (list): 임베딩할 상품 ID (이미 임베딩된 상품은 호출 전에 제외)
+        img_urls (list): product_ids와 같은 순서의 썸네일 URL
+        batch_size (int): 추론 배치 크기
+        num_workers (int): DataLoader 디코딩/리사이즈 프로세스 수
+        threads (int): 추론에 쓸 torch intra-op 스레드 수 (None이면 torch 기본값)
+        flush_every (int): 몇 배치마다 part 파일로 저장할지
+
+    Returns:
+        list: 저장한 상품 ID (이미지 다운로드/디코딩에 실패한 상품은 빠짐)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cache_dir = cache_dir or os.path.join(out_dir, 'image_cache')
+    if threads:
+        torch.set_num_threads(threads)
+
+    ids, paths = download_images(product_ids, img_urls, cache_dir, download_workers)
+    if not ids:
+        return []
+
+    model, transform = build_image_backbone(model_name)
+    loader = DataLoader(
+        ImageDataset(paths, transform), batch_size=batch_size, num_workers=num_workers,
+        worker_init_fn=_init_loader_worker, persistent_workers=False
+    )
+
+    buffer_ids, buffer_embs = [], []
+    saved_ids = []
+    start_time = time.time()
+
+    def flush():
+        if buffer_ids:
+            write_part(out_dir, buffer_ids, np.vstack(buffer_embs))
+            saved_ids.extend(buffer_ids)
+            buffer_ids.clear()
+            buffer_embs.clear()
+
+    with torch.inference_mode():
+        for batch_no, (indices, images, valid) in enumerate(loader, 1):
+            embeddings = model(images).float().numpy()
+            valid = valid.numpy()
+
+            buffer_ids.extend(ids[i] for i in indices.numpy()[valid].tolist())
+            buffer_embs.append(embeddings[valid])
+
+            if batch_no % flush_every == 0:
+                flush()
+                elapsed = time.time() - start_time
+                print(f"   {len(saved_ids)}/{len(ids)}개 ({len(saved_ids) / elapsed:.1f}개/초)", flush=True)
+        flush()
+
+    elapsed = max(time.time() - start_time, 1e-6)
+    print(f"🎉 이미지 임베딩 완료: {len(saved_ids)}개 ({elapsed:.0f}초, {len(saved_ids) / elapsed:.1f}개/초)")
+    return saved_ids
+
+
+# ==========================================
+# 6. 텍스트 임베딩 (문자열 해시 캐시)
+# ==========================================
+def text_cache_key(model_name, text):
+    """(모델명, 문자열) -> 캐시 키. 모델이 바뀌면 같은 문자열도 다시 계산됩니다."""
+    return hashlib.sha256(f"{model_name}\n{text}".encode('utf-8')).hexdigest()
+
+
+def load_text_encoder(model_name=DEFAULT_TEXT_MODEL, device='cpu'):
+    """sentence-transformers 모델의 encode 함수 (list[str] -> (n, dim) 배열)"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError("텍스트 임베딩에는 sentence-transformers가 필요합니다. (pip install sentence-transformers)")
+
+    model = SentenceTransformer(model_name, device=device)
+    return lambda texts: model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False)
+
+
+class TextEmbeddingCache:
+    """
+    문자열 임베딩 디스크 캐시.
+    {cache_dir}/part-XXXXX.npz (keys, embeddings)에 (모델명 + 문자열) 해시별 벡터를 쌓아 두고,
+    embed()는 처음 보는 문자열만 encode_fn으로 계산해 새 part 파일로 추가합니다.
+    """
+
+    def __init__(self, cache_dir, model_name=DEFAULT_TEXT_MODEL, encode_fn=None, batch_size=256):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.encode_fn = encode_fn
+        self.batch_size = batch_size
+        self.vectors = {}
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(cache_dir, 'part-*.npz'))):
+            with np.load(path) as data:
+                self.vectors.update(zip(data['keys'].tolist(), np.asarray(data['embeddings'], dtype=np.float32)))
+        print(f"✅ 텍스트 캐시 로드: {len(self.vectors)}개 문자열 ({cache_dir})")
+
+    def embed(self, texts):
+        """
+        문자열 리스트의 임베딩을 같은 순서로 반환합니다. 중복 문자열은 한 번만 계산합니다.
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32
+        """
+        # 고유 문자열 -> 위치 (고정 폭 유니코드 배열을 만들지 않도록 dict로 중복 제거)
+        positions = {}
+        inverse = np.fromiter(
+            (positions.setdefault(str(text), len(positions)) for text in texts), dtype=np.int64, count=len(texts)
+        )
+        unique_texts = list(positions)
+        keys = [text_cache_key(self.model_name, text) for text in unique_texts]
+
+        missing = [i for i, key in enumerate(keys) if key not in self.vectors]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        for start in range(0, len(missing), self.batch_size):
+            if self.encode_fn is None:
+                self.encode_fn = load_text_encoder(self.model_name)
+            batch = missing[start:start + self.batch_size]
+            embeddings = np.asarray(self.encode_fn([unique_texts[i] for i in batch]), dtype=np.float32)
+            batch_keys = [keys[i] for i in batch]
+            self._append(batch_keys, embeddings)
+            self.vectors.update(zip(batch_keys, embeddings))
+
+        unique_matrix = np.vstack([self.vectors[key] for key in keys]) if keys else np.zeros((0, 0), np.float32)
+        return unique_matrix[inverse]
+
+    def _append(self, keys, embeddings):
+        part_no = len(glob.glob(os.path.join(self.cache_dir, 'part-*.npz')))
+        tmp_path = os.path.join(self.cache_dir, f"tmp-{part_no:05d}.npz")
+        np.savez(tmp_path, keys=np.asarray(keys), embeddings=embeddings)
+        os.replace(tmp_path, os.path.join(self.cache_dir, f"part-{part_no:05d}.npz"))
+
+
+def brand_key(name):
+    """브랜드명 비교용 키 (공백 제거 + 대소문자 무시)"""
+    return re.sub(r'\s+', '', name or '').casefold()
+
+
+def load_brand_descriptions(path=BRAND_DESCRIPTIONS_PATH):
+    """
+    brand_descriptions.json (설명 문자열 리스트)을 브랜드명 키(brand_key) -> 설명 딕셔너리로 변환합니다.
+    설명은 '디미트리블랙(DIMITRI BLACK)은 ...' / 'MLB(엠엘비)는 ...'처럼 브랜드명(다른 표기)으로 시작하므로
+    괄호 앞/안의 이름을 모두 키로 등록합니다. (JSON에 brand_id가 없어 이름으로만 매칭)
+    """
+    with open(path, encoding='utf-8') as f:
+        descriptions = json.load(f)
+
+    by_brand = {}
+    for description in descriptions:
+        match = re.match(r'^\s*([^()]+?)\s*\(([^()]+)\)', description)
+        if match:
+            for name in match.groups():
+                by_brand.setdefault(brand_key(name), description)
+    return by_brand
+
+
+def build_text_inputs(rows, brand_descriptions):
+    """
+    상품 행 -> 필드별 입력 문자열
+    설명이 없는 브랜드는 브랜드명만 사용하고, 그런 브랜드 목록을 출력합니다. (brands.korea_name과 JSON 표기 차이 확인용)
+
+    Returns:
+        dict: 필드명 -> 문자열 리스트 (rows 순서)
+    """
+    inputs = {'name_emb': [], 'brand_info_emb': [], 'lower_cat_emb': [], 'brand_cat_emb': []}
+    unmatched = {}
+    for row in rows:
+        brand = row['brand_name'] or ''
+        lower_category = row['lower_category'] or ''
+        description = brand_descriptions.get(brand_key(brand))
+        if description is None:
+            unmatched[brand] = unmatched.get(brand, 0) + 1
+        inputs['name_emb'].append(row['product_name'] or '')
+        inputs['brand_info_emb'].append(description or brand)
+        inputs['lower_cat_emb'].append(lower_category)
+        inputs['brand_cat_emb'].append(f"{brand} {lower_category}")
+
+    if unmatched:
+        top = sorted(unmatched.items(), key=lambda item: -item[1])[:20]
+        print(f"⚠️ 설명을 찾지 못한 브랜드 {len(unmatched)}개 (상품 {sum(unmatched.values())}개, 브랜드명으로 대체): "
+              + ", ".join(f"{brand or '(없음)'}({count})" for brand, count in top))
+    return inputs
+
+
+def embed_catalog_text(rows, out_dir, cache, brand_descriptions):
+    """
+    필드별로 서로 다른 문자열만 임베딩하고 상품별로 펼쳐 {out_dir}/{field}.npz로 저장합니다.
+    이전 실행의 .npz가 있으면 덮어쓰기 전에 비교합니다. (없는 필드는 비교하지 않음)
+
+    Returns:
+        tuple: (새로 생겼거나 벡터가 바뀐 ID 리스트, 없어진 ID 리스트)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ids = np.asarray([row['product_id'] for row in rows], dtype=np.int64)
+    changed, removed = set(), set()
+
+    for field, texts in build_text_inputs(rows, brand_descriptions).items():
+        start_time = time.time()
+        misses = cache.misses
+        embeddings = cache.embed(texts)
+
+        path = os.path.join(out_dir, f"{field}.npz")
+        if os.path.exists(path):
+            with np.load(path) as previous:
+                field_changed, field_removed = diff_catalog(previous['ids'], previous['embeddings'], ids, embeddings)
+        else:
+            # 처음 만드는 파일은 비교 대상이 없음 (저장소 빌드 전이라 서빙 중인 인덱스에도 없음)
+            field_changed, field_removed = [], []
+        changed.update(field_changed)
+        removed.update(field_removed)
+
+        np.savez(path, ids=ids, embeddings=embeddings)
+        print(f"✅ {field}: 상품 {len(ids)}개 / 고유 문자열 {len(set(texts))}개 / "
+              f"새로 계산 {cache.misses - misses}개 / 변경 {len(field_changed)}개 ({time.time() - start_time:.1f}초)")
+
+    return sorted(changed), sorted(removed)
+
+
+def run_image(args):
+    embedded = load_embedded_ids(args.out, args.existing)
+
+    db = RDSClient()
+    catalog_ids = set()
+    product_ids, img_urls = [], []
+    for row in db.execute_stream("SELECT product_id, img_url FROM products", chunk_size=10000):
+        product_id = int(row['product_id'])
+        catalog_ids.add(product_id)
+        if row['img_url'] is not None and product_id not in embedded:
+            product_ids.append(product_id)
+            img_urls.append(row['img_url'])
+    # 임베딩은 있지만 DB에서 삭제된 상품
+    removed_ids = sorted(embedded - catalog_ids)
+    print(f"📊 임베딩 대상: {len(product_ids)}개 (이미 계산됨 {len(embedded)}개, 삭제됨 {len(removed_ids)}개)")
+
+    saved_ids = []
+    if product_ids:
+        saved_ids = embed_images(
+            product_ids, img_urls, args.out, args.model, args.batch_size, args.num_workers,
+            args.threads, args.download_workers, args.cache_dir
+        )
+
+    if args.merge:
+        merge_parts(args.out, args.merge, args.existing, drop_ids=removed_ids)
+
+    if not args.no_publish:
+        publish_changes(saved_ids, removed_ids)
+
+
+def run_text(args):
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    db = RDSClient()
+    catalog_query = """
+        SELECT p.product_id, p.product_name, b.korea_name AS brand_name, c.lower_category
+        FROM products p
+        JOIN brands b ON p.brand_id = b.brand_id
+        JOIN categories c ON p.category_id = c.category_id
+    """
+    rows = list(db.execute_stream(catalog_query, chunk_size=10000))
+    print(f"📊 텍스트 임베딩 대상: {len(rows)}개 상품")
+
+    cache = TextEmbeddingCache(args.cache_dir, args.model)
+    changed_ids, removed_ids = embed_catalog_text(
+        rows, args.out, cache, load_brand_descriptions(args.brand_descriptions)
+    )
+    print(f"🎉 텍스트 임베딩 완료: 캐시 적중 {cache.hits}개 / 새로 계산 {cache.misses}개")
+
+    if not args.no_publish:
+        publish_changes(changed_ids, removed_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="상품 이미지/텍스트 임베딩 (CPU 배치)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    image = subparsers.add_parser('image', help="썸네일 이미지 임베딩")
+    image.add_argument('--out', required=True, help="part 파일 출력 폴더")
+    image.add_argument('--existing', nargs='*', default=[], help="이미 계산된 .npz (여기 있는 ID는 건너뜀)")
+    image.add_argument('--model', default=DEFAULT_IMAGE_MODEL, help="torchvision 모델명")
+    image.add_argument('--batch-size', type=int, default=64)
+    image.add_argument('--num-workers', type=int, default=4, help="DataLoader 워커 수")
+    image.add_argument('--threads', type=int, default=None, help="추론 스레드 수 (torch.set_num_threads)")
+    image.add_argument('--download-workers', type=int, default=16, help="동시 다운로드 수")
+    image.add_argument('--cache-dir', default=None, help="이미지 캐시 폴더 (기본값: {out}/image_cache)")
+    image.add_argument('--merge', default=None, help="완료 후 기존 .npz + part 파일을 합칠 경로")
+    image.add_argument('--no-publish', action='store_true', help="카탈로그 변경 로그에 발행하지 않음")
+    image.set_defaults(func=run_image)
+
+    text_parser = subparsers.add_parser('text', help="상품명/브랜드/카테고리 텍스트 임베딩")
+    text_parser.add_argument('--out', required=True, help="필드별 .npz 출력 폴더")
+    text_parser.add_argument('--cache-dir', default='data/text_cache', help="문자열 임베딩 캐시 폴더")
+    text_parser.add_argument('--model', default=DEFAULT_TEXT_MODEL, help="sentence-transformers 모델명")
+    text_parser.add_argument('--threads', type=int, default=None, help="추론 스레드 수 (torch.set_num_threads)")
+    text_parser.add_argument('--brand-descriptions', default=BRAND_DESCRIPTIONS_PATH, help="브랜드 설명 JSON")
+    text_parser.add_argument('--no-publish', action='store_true', help="카탈로그 변경 로그에 발행하지 않음")
+    text_parser.set_defaults(func=run_text)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+디스크 기반 임베딩 저장소 (memory-mapped)
+
+노트북에서 만든 .npz (ids, embeddings) 파일들을 필드별로 미리 정규화된 float32 .npy 파일과
+정렬된 ID 인덱스(ids.npy)로 변환해 두고, np.load(mmap_mode='r')로 열어 사용합니다.
+여러 Gunicorn 워커가 같은 파일을 열면 OS 페이지 캐시를 공유하므로 메모리는 한 벌만 쓰고,
+시작 시 파싱/정규화 작업이 없어 바로 서비스할 수 있습니다.
+
+디렉터리 구조:
+    {store_dir}/meta.json        필드 목록, 차원, 상품 수
+    {store_dir}/ids.npy          (n,) int64, 오름차순 정렬
+    {store_dir}/{field}.npy      (n, dim) float32, 행 단위 L2 정규화 완료
+    {store_dir}/fused_{profile}.npy  (n, sum(dim)) float32, 가중치 프로필별 fused 벡터 (선택)
+    {store_dir}/fused_{profile}.{f16|int8}.npy  양자화된 fused 벡터 (선택, int8은 .scale.npy에 행별 scale)
+
+빌드 예:
+    python -m src.embedding_store --out data/embedding_store image_emb=top_embedded.npz
+    python -m src.embedding_store --out data/embedding_store --fused default notebook image_emb=top_embedded.npz
+    python -m src.embedding_store --out data/embedding_store --fused default --quantize int8 image_emb=top_embedded.npz
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+# 상위 폴더(src)를 모듈 경로에 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.live_index import diff_catalog, publish_changes
+from src.recommender import (
+    normalize_rows, build_fused_vectors, quantize_rows, QuantizedScorer, WEIGHT_PROFILES, QUANTIZED_PRECISIONS
+)
+
+META_FILE = 'meta.json'
+IDS_FILE = 'ids.npy'
+
+
+class EmbeddingStore:
+    """
+    memory-mapped 임베딩 저장소.
+    RedisClient와 같은 get_product_vectors / get_many_product_vectors 인터페이스를 제공하므로
+    app.py에서 Redis 대신 그대로 벡터 소스로 사용할 수 있습니다.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+
+        with open(os.path.join(store_dir, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.fields = self.meta['fields']
+        self.dim = self.meta['dim']
+
+        # mmap_mode='r': 파일을 읽기 전용 np.memmap으로 열기 (실제 로드는 접근 시 페이지 단위로)
+        self.ids = np.load(os.path.join(store_dir, IDS_FILE), mmap_mode='r')
+        self.matrices = {
+            field: np.load(os.path.join(store_dir, f"{field}.npy"), mmap_mode='r')
+            for field in self.fields
+        }
+        # 가중치 프로필별 fused 벡터 (프로필명 -> memmap)
+        self.fused_weights = self.meta.get('fused_profiles', {})
+        self.fused = {
+            profile: np.load(os.path.join(store_dir, f"fused_{profile}.npy"), mmap_mode='r')
+            for profile in self.fused_weights
+        }
+        # 양자화된 fused 벡터 ((프로필명, 정밀도) -> (memmap, scale memmap 또는 None))
+        self.quantized = {}
+        for profile, precisions in self.meta.get('quantized_profiles', {}).items():
+            for precision in precisions:
+                self.quantized[(profile, precision)] = self._load_quantized(profile, precision)
+        print(f"✅ 임베딩 저장소 로드 완료: {len(self.ids)}개 상품, 필드 {self.fields}")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, product_ids):
+        """
+        상품 ID -> 행 번호 변환 (정렬된 ID 인덱스에 대한 이진 탐색)
+
+        Returns:
+            tuple: (rows, found)
+                rows (np.ndarray): (n,) 행 번호 (found가 False인 위치의 값은 의미 없음)
+                found (np.ndarray): (n,) bool, 저장소에 있는 ID면 True
+        """
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.zeros(len(product_ids), dtype=np.int64), np.zeros(len(product_ids), dtype=bool)
+
+        rows = np.searchsorted(self.ids, product_ids)
+        rows = np.minimum(rows, len(self.ids) - 1)
+        found = self.ids[rows] == product_ids
+        return rows, found
+
+    def get_product_vectors(self, product_id):
+        """단일 상품의 필드별 벡터 (정규화 완료). 없으면 None"""
+        rows, found = self.lookup([product_id])
+        if not found[0]:
+            return None
+        return {field: np.asarray(self.matrices[field][rows[0]]) for field in self.fields}
+
+    def get_many_product_vectors(self, product_ids):
+        """
+        RedisClient.get_many_product_vectors와 같은 형태로 반환합니다.
+
+        Returns:
+            tuple: (vectors, missing)
+                vectors (dict): 필드명 -> (n, dim) float32 배열 (product_ids 순서, 없는 ID는 영벡터)
+                missing (np.ndarray): (n,) bool
+        """
+        rows, found = self.lookup(product_ids)
+        hit_rows = rows[found]
+
+        vectors = {}
+        for field in self.fields:
+            matrix = np.zeros((len(rows), self.dim), dtype=np.float32)
+            # memmap fancy indexing: 필요한 행만 페이지 캐시에서 복사
+            matrix[found] = self.matrices[field][hit_rows]
+            vectors[field] = matrix
+
+        return vectors, ~found
+
+    def get_many_fused_vectors(self, product_ids, profile):
+        """
+        프로필의 fused 벡터를 product_ids 순서로 반환합니다.
+
+        Returns:
+            tuple: (matrix, missing)
+                matrix (np.ndarray): (n, D) float32 (없는 ID는 영벡터)
+                missing (np.ndarray): (n,) bool
+        """
+        rows, found = self.lookup(product_ids)
+        fused = self.fused[profile]
+
+        matrix = np.zeros((len(rows), fused.shape[1]), dtype=np.float32)
+        matrix[found] = fused[rows[found]]
+        return matrix, ~found
+
+    def add_fused_profile(self, profile, weights=None, block_size=8192):
+        """
+        저장된 필드 벡터로 가중치 프로필의 fused 벡터 파일을 만들고 meta.json에 등록합니다.
+        여러 프로필을 나란히 저장할 수 있습니다.
+
+        Args:
+            profile (str): 프로필명 (WEIGHT_PROFILES의 키 또는 임의 이름)
+            weights (dict): 필드명 -> 가중치 (None이면 WEIGHT_PROFILES[profile])
+        """
+        weights = dict(weights or WEIGHT_PROFILES[profile])
+        n = len(self.ids)
+        total_dim = self.dim * len(self.fields)
+
+        path = os.path.join(self.store_dir, f"fused_{profile}.npy")
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(n, total_dim))
+        # 블록 단위로 만들어 전체 fused 행렬을 메모리에 올리지 않음
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            out[start:end] = build_fused_vectors(
+                {f: self.matrices[f][start:end] for f in self.fields},
+                self.fields, weights, normalized=True
+            )
+        out.flush()
+        del out
+
+        self.fused_weights[profile] = weights
+        self.meta['fused_profiles'] = self.fused_weights
+        self._write_meta(self.store_dir, self.meta)
+        self.fused[profile] = np.load(path, mmap_mode='r')
+        print(f"✅ fused 프로필 생성 완료: {profile} ({n}개 상품, {total_dim}차원)")
+
+    def _quantized_paths(self, profile, precision):
+        base = os.path.join(self.store_dir, f"fused_{profile}.{precision}")
+        return f"{base}.npy", f"{base}.scale.npy"
+
+    def _load_quantized(self, profile, precision):
+        path, scale_path = self._quantized_paths(profile, precision)
+        scale = np.load(scale_path, mmap_mode='r') if precision == 'int8' else None
+        return np.load(path, mmap_mode='r'), scale
+
+    def add_quantized_profile(self, profile, precision='int8', block_size=8192):
+        """
+        fused 프로필을 양자화한 파일을 만들고 meta.json에 등록합니다. (add_fused_profile 이후에 호출)
+        full precision fused 파일은 re-ranking용으로 그대로 둡니다.
+
+        Args:
+            precision (str): 'f16' (1/2 크기) 또는 'int8' (행별 scale, 약 1/4 크기)
+        """
+        if precision not in QUANTIZED_PRECISIONS:
+            raise ValueError(f"지원하지 않는 양자화 형식입니다: {precision}")
+        fused = self.fused[profile]
+        n, total_dim = fused.shape
+
+        path, scale_path = self._quantized_paths(profile, precision)
+        dtype = np.float16 if precision == 'f16' else np.int8
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n, total_dim))
+        scale = np.zeros(n, dtype=np.float32)
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            block, block_scale = quantize_rows(fused[start:end], precision)
+            out[start:end] = block
+            if block_scale is not None:
+                scale[start:end] = block_scale
+        out.flush()
+        del out
+        if precision == 'int8':
+            np.save(scale_path, scale)
+
+        quantized_profiles = self.meta.setdefault('quantized_profiles', {})
+        if precision not in quantized_profiles.setdefault(profile, []):
+            quantized_profiles[profile].append(precision)
+        self._write_meta(self.store_dir, self.meta)
+        self.quantized[(profile, precision)] = self._load_quantized(profile, precision)
+        print(f"✅ 양자화 프로필 생성 완료: {profile}.{precision} "
+              f"({fused.nbytes / 2**20:.0f}MB -> {n * total_dim * np.dtype(dtype).itemsize / 2**20:.0f}MB)")
+
+    def quantized_scorer(self, profile, precision='int8', product_ids=None, rerank=300):
+        """
+        양자화 프로필로 QuantizedScorer를 만듭니다.
+        1차 점수용 양자화 행만 메모리에 복사하고, re-ranking은 full precision fused memmap에서 후보 행만 읽습니다.
+
+        Args:
+            product_ids (array-like): 점수를 매길 상품 ID (None이면 전체, 저장소에 없는 ID는 제외)
+        """
+        quantized, scale = self.quantized[(profile, precision)]
+        if product_ids is None:
+            rows = np.arange(len(self.ids))
+        else:
+            rows, found = self.lookup(product_ids)
+            rows = rows[found]
+
+        return QuantizedScorer(rerank, self.fields, self.fused_weights[profile]).fit(
+            np.asarray(self.ids[rows]),
+            np.asarray(quantized[rows]),
+            np.asarray(scale[rows]) if scale is not None else None,
+            exact=self.fused[profile],
+            exact_rows=rows,
+        )
+
+    @staticmethod
+    def _write_meta(store_dir, meta):
+        # 임시 파일에 쓴 뒤 교체하여, 다른 워커가 쓰다 만 meta.json을 읽지 않도록 함
+        tmp_path = os.path.join(store_dir, META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(store_dir, META_FILE))
+
+    @staticmethod
+    def build(store_dir, ids, field_vectors):
+        """
+        ID 리스트와 필드별 벡터로 저장소를 새로 만듭니다.
+        기존 저장소가 있으면 필드 파일마다 새로 쓴 행과 비교하여 바뀐/삭제된 상품을 구합니다.
+        (파일은 임시 파일에 쓴 뒤 교체하므로 기존 파일을 열어 둔 워커의 memmap은 그대로 유효)
+
+        Args:
+            store_dir (str): 출력 디렉터리
+            ids (array-like): (n,) 상품 ID
+            field_vectors (dict): 필드명 -> (n, dim) 배열 (ids와 같은 행 순서)
+
+        Returns:
+            tuple: (새로 생겼거나 벡터가 바뀐 ID 리스트, 삭제된 ID 리스트). 기존 저장소가 없으면 None
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        ids_path = os.path.join(store_dir, IDS_FILE)
+        old_ids = np.load(ids_path, mmap_mode='r') if os.path.exists(ids_path) else None
+
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        if len(sorted_ids) > 1 and np.any(sorted_ids[1:] == sorted_ids[:-1]):
+            raise ValueError("중복된 상품 ID가 있습니다.")
+
+        fields = list(field_vectors.keys())
+        dim = None
+        changed, removed = set(), []
+
+        for field in fields:
+            matrix = np.asarray(field_vectors[field])
+            dim = matrix.shape[1]
+            path = os.path.join(store_dir, f"{field}.npy")
+            # open_memmap으로 파일에 바로 쓰기 (전체를 두 번 들고 있지 않도록)
+            out = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=np.float32, shape=(len(ids), dim))
+            out[:] = normalize_rows(matrix[order])
+            out.flush()
+
+            if old_ids is not None:
+                old = np.load(path, mmap_mode='r') if os.path.exists(path) else None
+                if old is not None and old.shape == (len(old_ids), dim):
+                    field_changed, removed = diff_catalog(old_ids, old, sorted_ids, out)
+                else:
+                    field_changed, removed = sorted_ids.tolist(), np.setdiff1d(old_ids, sorted_ids).tolist()
+                changed.update(field_changed)
+                del old
+            del out
+            os.replace(path + '.tmp', path)
+
+        np.save(ids_path + '.tmp.npy', sorted_ids)
+        os.replace(ids_path + '.tmp.npy', ids_path)
+
+        # meta.json을 마지막에 써서, 빌드 도중에 열리면 실패하도록 함
+        EmbeddingStore._write_meta(store_dir, {'fields': fields, 'dim': dim, 'count': int(len(ids))})
+
+        print(f"✅ 임베딩 저장소 생성 완료: {store_dir} ({len(ids)}개 상품, 필드 {fields})")
+        if old_ids is None:
+            return None
+        return sorted(changed), removed
+
+    @staticmethod
+    def build_from_npz(store_dir, npz_paths):
+        """
+        노트북에서 저장한 .npz 파일들(ids, embeddings)로 저장소를 만듭니다.
+        필드마다 ID 집합이 다를 수 있으므로 합집합을 기준으로 하고, 없는 행은 영벡터로 채웁니다.
+
+        Args:
+            npz_paths (dict): 필드명 -> .npz 경로 (예: {'image_emb': 'top_embedded.npz'})
+
+        Returns:
+            tuple: build()와 같음
+        """
+        loaded = {}
+        for field, path in npz_paths.items():
+            data = np.load(path)
+            loaded[field] = (np.asarray(data['ids'], dtype=np.int64), data['embeddings'])
+
+        all_ids = np.unique(np.concatenate([ids for ids, _ in loaded.values()]))
+
+        field_vectors = {}
+        for field, (ids, embeddings) in loaded.items():
+            matrix = np.zeros((len(all_ids), embeddings.shape[1]), dtype=np.float32)
+            matrix[np.searchsorted(all_ids, ids)] = embeddings
+            field_vectors[field] = matrix
+
+        return EmbeddingStore.build(store_dir, all_ids, field_vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=".npz 임베딩 파일로 memory-mapped 저장소 생성")
+    parser.add_argument('--out', required=True, help="저장소 출력 디렉터리")
+    parser.add_argument('--fused', nargs='*', default=[], help="함께 만들 fused 가중치 프로필 (예: default notebook)")
+    parser.add_argument('--quantize', nargs='*', default=[], choices=QUANTIZED_PRECISIONS,
+                        help="fused 프로필마다 함께 만들 양자화 형식 (f16, int8)")
+    parser.add_argument('--no-publish', action='store_true',
+                        help="바뀐/삭제된 상품을 카탈로그 변경 로그(Redis)에 발행하지 않음")
+    parser.add_argument('sources', nargs='+', help="필드명=경로.npz 형식 (예: image_emb=top_embedded.npz)")
+    args = parser.parse_args()
+
+    npz_paths = dict(source.split('=', 1) for source in args.sources)
+    changes = EmbeddingStore.build_from_npz(args.out, npz_paths)
+
+    if args.fused:
+        store = EmbeddingStore(args.out)
+        for profile in args.fused:
+            store.add_fused_profile(profile)
+            for precision in args.quantize:
+                store.add_quantized_profile(profile, precision)
+
+    # 새 파일이 모두 준비된 뒤 발행 (서빙 중인 인메모리 인덱스가 변경분을 다시 읽음)
+    if changes is None:
+        print("ℹ️ 새 저장소라 비교할 이전 버전이 없어 변경을 발행하지 않습니다.")
+    elif not args.no_publish:
+        publish_changes(*changes)
+
+
+if __name__ == '__main__':
+    main()
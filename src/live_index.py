@@ -0,0 +1,314 @@
+"""
+서빙 프로세스 안의 핫스왑 추천 인덱스
+
+앱 시작 시 백그라운드 스레드에서 카탈로그 전체의 fused 벡터를 읽어 CatalogSnapshot을 만들고,
+이후에는 Redis의 catalog:version을 주기적으로 폴링하여 새로 임베딩되었거나 삭제된 상품만 읽어
+새 스냅샷을 만든 뒤 참조를 한 번에 교체합니다. 요청은 항상 완성된 스냅샷 하나만 사용하므로
+반쯤 만들어진 인덱스를 보거나 재로드를 기다리는 일이 없습니다.
+
+임베딩 배치(src/embedder.py)와 저장소 빌드(src/embedding_store.py)는 끝날 때 바뀐/삭제된 상품을 자동으로 발행합니다.
+직접 발행 예 (그 외 삭제 작업 후):
+    python -m src.live_index publish --added 123 456 --removed 789
+    python -m src.live_index trim --keep 1000
+    python -m src.live_index status
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# 상위 폴더(src)를 모듈 경로에 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.recommender import CatalogSnapshot, build_fused_vectors, iter_vector_chunks
+
+CATALOG_CATEGORIES = ('상의', '하의', '신발', '아우터')
+# 한 번에 발행할 변경 수 (Lua 스크립트 인자 수 제한)
+PUBLISH_CHUNK_SIZE = 5000
+
+
+def diff_catalog(old_ids, old_matrix, new_ids, new_matrix, block_size=8192):
+    """
+    이전/새 (상품 ID, 벡터 행렬)을 비교해 변경 로그에 발행할 상품을 구합니다.
+    행렬은 memmap이어도 되며 block_size행씩 비교합니다.
+
+    Returns:
+        tuple: (새로 생겼거나 벡터가 바뀐 ID 리스트, 없어진 ID 리스트)
+    """
+    old_ids = np.asarray(old_ids, dtype=np.int64)
+    new_ids = np.asarray(new_ids, dtype=np.int64)
+    removed = np.setdiff1d(old_ids, new_ids).tolist()
+    if len(old_ids) == 0:
+        return new_ids.tolist(), removed
+
+    order = np.argsort(old_ids, kind='stable')
+    pos = np.minimum(np.searchsorted(old_ids[order], new_ids), len(old_ids) - 1)
+    old_rows = order[pos]
+    changed = old_ids[old_rows] != new_ids
+
+    rows = np.flatnonzero(~changed)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        changed[block] = np.any(
+            np.asarray(new_matrix[block]) != np.asarray(old_matrix[old_rows[block]]), axis=1
+        )
+    return new_ids[changed].tolist(), removed
+
+
+def publish_changes(added_ids, removed_ids=(), redis_conn=None):
+    """
+    추가/변경/삭제된 상품을 catalog:changes에 발행합니다. (PUBLISH_CHUNK_SIZE개씩 나눠 버전을 올림)
+    서빙 중인 LiveIndex와 build_neighbors --incremental이 이 로그를 읽습니다.
+
+    Returns:
+        int: 마지막으로 발행된 카탈로그 버전 (발행할 것이 없거나 실패하면 None)
+    """
+    added_ids, removed_ids = list(added_ids), list(removed_ids)
+    if not added_ids and not removed_ids:
+        return None
+
+    if redis_conn is None:
+        from src.redis_client import RedisClient
+        redis_conn = RedisClient()
+
+    version = None
+    members = [(pid, True) for pid in added_ids] + [(pid, False) for pid in removed_ids]
+    for start in range(0, len(members), PUBLISH_CHUNK_SIZE):
+        chunk = members[start:start + PUBLISH_CHUNK_SIZE]
+        version = redis_conn.publish_catalog_changes(
+            [pid for pid, added in chunk if added], [pid for pid, added in chunk if not added]
+        )
+        if version is None:
+            print("⚠️ 카탈로그 변경 발행 실패: 서빙 중인 인메모리 인덱스는 다음 전체 재로드 때 반영됩니다.")
+            return None
+    print(f"📢 카탈로그 버전 {version} 발행 (추가/변경 {len(added_ids)}개, 삭제 {len(removed_ids)}개)")
+    return version
+
+
+class CatalogSource:
+    """
+    스냅샷 재료를 읽어 오는 곳: 상품/카테고리는 RDS, 벡터는 벡터 소스(RedisClient / EmbeddingStore),
+    버전과 변경 로그는 Redis.
+    """
+
+    def __init__(self, db, redis_conn, vector_source, fields, weights, normalized=False,
+                 fused_profile=None, chunk_size=2000):
+        """
+        Args:
+            fused_profile (str): EmbeddingStore의 fused 프로필명 (지정하면 fused 행렬을 그대로 읽음)
+            chunk_size (int): 벡터를 한 번에 읽을 상품 수
+        """
+        self.db = db
+        self.redis_conn = redis_conn
+        self.vector_source = vector_source
+        self.fields = fields
+        self.weights = weights
+        self.normalized = normalized
+        self.fused_profile = fused_profile
+        self.chunk_size = chunk_size
+
+    def version(self):
+        return self.redis_conn.get_catalog_version()
+
+    def changes(self, since):
+        return self.redis_conn.get_catalog_changes(since)
+
+    def _categories(self, product_ids=None):
+        """product_id -> upper_category (product_ids가 None이면 카탈로그 전체)"""
+        base_query = f"""
+            SELECT p.product_id, c.upper_category
+            FROM products p
+            JOIN categories c ON p.category_id = c.category_id
+            WHERE c.upper_category IN ({', '.join(f"'{name}'" for name in CATALOG_CATEGORIES)})
+        """
+        if product_ids is None:
+            rows = self.db.execute_stream(base_query, chunk_size=10000)
+            return {row['product_id']: row['upper_category'] for row in rows}
+
+        categories = {}
+        for start in range(0, len(product_ids), self.chunk_size):
+            chunk = product_ids[start:start + self.chunk_size]
+            params = {f"id{i}": int(pid) for i, pid in enumerate(chunk)}
+            query = base_query + f" AND p.product_id IN ({', '.join(':' + name for name in params)})"
+            for row in self.db.execute(query, params) or []:
+                categories[row['product_id']] = row['upper_category']
+        return categories
+
+    def load(self, product_ids=None):
+        """
+        상품들의 (ID, upper_category, fused 행렬)을 읽습니다.
+        DB에 없거나(삭제) 벡터가 없는 상품은 결과에서 빠집니다.
+        """
+        categories = self._categories(product_ids)
+        ids_parts, fused_parts = [], []
+        chunks = iter_vector_chunks(
+            self.vector_source, list(categories), self.chunk_size, fused_profile=self.fused_profile
+        )
+        for chunk_ids, vectors in chunks:
+            if len(chunk_ids) == 0:
+                continue
+            if isinstance(vectors, dict):
+                vectors = build_fused_vectors(vectors, self.fields, self.weights, self.normalized)
+            ids_parts.append(chunk_ids)
+            fused_parts.append(vectors)
+
+        if not ids_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=str), np.zeros((0, 0), dtype=np.float32)
+
+        ids = np.concatenate(ids_parts).astype(np.int64)
+        return ids, np.array([categories[pid] for pid in ids.tolist()]), np.vstack(fused_parts)
+
+
+class LiveIndex:
+    """
+    백그라운드 스레드에서 CatalogSnapshot을 만들고 버전 변경 시 교체하는 인덱스.
+    요청 쪽에서는 index.snapshot을 한 번 읽어 끝까지 그 스냅샷으로 계산하면 됩니다.
+    (참조 교체는 원자적이므로 락이 필요 없음)
+    """
+
+    def __init__(self, source, poll_interval=30.0, retry_interval=10.0):
+        """
+        Args:
+            source (CatalogSource): 스냅샷 재료
+            poll_interval (float): catalog:version 폴링 주기(초)
+            retry_interval (float): 초기 로드 실패 시 재시도 간격(초)
+        """
+        self.source = source
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+
+        self.snapshot = None
+        self.last_error = None
+        self.loaded_at = None
+        self.swaps = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.snapshot is not None
+
+    def start(self):
+        """백그라운드 로드/폴링 스레드 시작 (이미 실행 중이면 무시)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-index', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """/ready, /healthz 응답용 상태"""
+        snapshot = self.snapshot
+        return {
+            'ready': snapshot is not None,
+            'version': snapshot.version if snapshot else None,
+            'products': len(snapshot) if snapshot else 0,
+            'categories': sorted(snapshot.slices) if snapshot else [],
+            'loaded_at': self.loaded_at,
+            'swaps': self.swaps,
+            'last_error': self.last_error,
+        }
+
+    def _swap(self, snapshot):
+        self.snapshot = snapshot
+        self.loaded_at = time.time()
+        self.swaps += 1
+        self.last_error = None
+
+    def reload(self):
+        """카탈로그 전체를 다시 읽어 교체합니다."""
+        start_time = time.time()
+        # 버전을 먼저 읽어 두면, 로드 중에 발행된 변경은 다음 폴링에서 다시 반영됨
+        version = self.source.version() or 0
+        ids, categories, matrix = self.source.load()
+        self._swap(CatalogSnapshot(version, ids, categories, matrix))
+        print(f"✅ 인메모리 인덱스 로드 완료: {len(ids)}개 상품, 버전 {version} ({time.time() - start_time:.1f}초)")
+
+    def refresh(self):
+        """
+        버전이 바뀌었으면 변경분만 반영한 새 스냅샷으로 교체합니다.
+        변경 로그가 잘려 나가 이어 붙일 수 없으면 전체를 다시 읽습니다.
+
+        Returns:
+            bool: 교체했으면 True
+        """
+        current = self.snapshot
+        version = self.source.version()
+        if version is None or version == current.version:
+            return False
+
+        changes = self.source.changes(current.version)
+        if changes is None:
+            self.reload()
+            return True
+
+        version, added_ids, removed_ids = changes
+        ids, categories, matrix = self.source.load(added_ids) if added_ids else (
+            np.zeros(0, dtype=np.int64), np.zeros(0, dtype=str), None
+        )
+        # 추가 목록에 있지만 DB/벡터가 없어진 상품도 삭제로 처리
+        gone = np.setdiff1d(np.asarray(added_ids, dtype=np.int64), ids)
+        removed = np.concatenate([np.asarray(removed_ids, dtype=np.int64), gone])
+
+        self._swap(current.apply(version, ids, categories, matrix, removed))
+        print(f"🔄 인메모리 인덱스 갱신: 버전 {current.version} -> {version} "
+              f"(추가/변경 {len(ids)}개, 삭제 {len(removed)}개, 총 {len(self.snapshot)}개)")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.snapshot is None:
+                    self.reload()
+                else:
+                    self.refresh()
+                wait = self.poll_interval
+            except Exception as e:
+                # 실패해도 기존 스냅샷으로 계속 서비스
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ 인메모리 인덱스 갱신 실패: {self.last_error}")
+                wait = self.retry_interval if self.snapshot is None else self.poll_interval
+            self._stop.wait(wait)
+
+
+def main():
+    from src.redis_client import RedisClient
+
+    parser = argparse.ArgumentParser(description="인메모리 인덱스용 카탈로그 변경 로그 관리")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    publish = subparsers.add_parser('publish', help="추가/변경/삭제된 상품을 발행하고 버전을 올림")
+    publish.add_argument('--added', type=int, nargs='*', default=[], help="새로 임베딩되었거나 벡터가 바뀐 상품 ID")
+    publish.add_argument('--removed', type=int, nargs='*', default=[], help="삭제된 상품 ID")
+
+    trim = subparsers.add_parser('trim', help="오래된 변경 로그 정리")
+    trim.add_argument('--keep', type=int, default=1000, help="남길 최근 버전 수")
+
+    subparsers.add_parser('status', help="현재 카탈로그 버전 출력")
+    args = parser.parse_args()
+
+    redis_conn = RedisClient()
+    if not redis_conn.client:
+        sys.exit(1)
+
+    if args.command == 'publish':
+        if not args.added and not args.removed:
+            print("⚠️ 발행할 상품이 없습니다.")
+            return
+        publish_changes(args.added, args.removed, redis_conn)
+    elif args.command == 'trim':
+        redis_conn.trim_catalog_changes(args.keep)
+        print(f"✅ 최근 {args.keep}개 버전만 남기고 정리")
+    else:
+        print(f"📊 카탈로그 버전: {redis_conn.get_catalog_version()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Redis 벡터 포맷 마이그레이션 도구
+
+product:{id}:vectors 해시에 JSON 텍스트로 저장된 벡터를 little-endian float32 raw bytes
+(또는 그 반대)로 배치 단위로 다시 씁니다. 이미 대상 포맷인 해시는 건너뜁니다.
+
+--share: 상품 해시마다 복사되어 있는 브랜드/카테고리 벡터(brand_info_emb, lower_cat_emb, brand_cat_emb)를
+shared:{field}:{ref} 키로 옮기고, 상품 해시에는 brand_id/category_id 참조만 남깁니다.
+
+사용 예:
+    python -m src.migrate_vectors --to f32le --batch-size 500
+    python -m src.migrate_vectors --to json --dry-run
+    python -m src.migrate_vectors --to i8s          # 행별 scale int8 양자화 (f32le 대비 약 1/4)
+    python -m src.migrate_vectors --share
+"""
+import argparse
+import os
+import sys
+import time
+
+# 상위 폴더(src)를 모듈 경로에 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.redis_client import (
+    RedisClient, VECTOR_FIELDS, FORMAT_FIELD, FORMAT_JSON, FORMAT_F32, VECTOR_FORMATS, SHARED_FIELDS, REF_FIELDS,
+    encode_vector, decode_vector, shared_ref, shared_key
+)
+
+
+def migrate_batch(raw_client, keys, target_fmt, dry_run=False):
+    """
+    키 묶음 하나를 대상 포맷으로 변환합니다.
+
+    Returns:
+        tuple: (변환된 키 개수, 건너뛴 키 개수)
+    """
+    fields = VECTOR_FIELDS + [FORMAT_FIELD]
+
+    # 1. 파이프라인으로 현재 값 일괄 조회
+    pipe = raw_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hmget(key, fields)
+    results = pipe.execute()
+
+    # 2. 변환 후 파이프라인으로 일괄 저장
+    pipe = raw_client.pipeline(transaction=False)
+    converted, skipped = 0, 0
+
+    for key, data in zip(keys, results):
+        fmt = data[-1].decode() if data[-1] else FORMAT_JSON
+        if fmt == target_fmt or not any(data[:-1]):
+            skipped += 1
+            continue
+
+        mapping = {
+            field: encode_vector(decode_vector(raw, fmt), target_fmt)
+            for field, raw in zip(VECTOR_FIELDS, data[:-1]) if raw
+        }
+        mapping[FORMAT_FIELD] = target_fmt
+        pipe.hset(key, mapping=mapping)
+        converted += 1
+
+    if not dry_run and converted:
+        pipe.execute()
+
+    return converted, skipped
+
+
+def share_batch(raw_client, keys, product_refs, dry_run=False):
+    """
+    키 묶음 하나의 공유 필드를 shared 키로 옮깁니다.
+    같은 브랜드/카테고리의 상품들은 같은 벡터를 갖고 있으므로 처음 본 값만 저장합니다. (SET NX)
+
+    Args:
+        product_refs (dict): 상품 ID -> {'brand_id': ..., 'category_id': ...}
+
+    Returns:
+        tuple: (변환된 키 개수, 건너뛴 키 개수)
+    """
+    shared_fields = list(SHARED_FIELDS)
+
+    pipe = raw_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hmget(key, shared_fields + [FORMAT_FIELD])
+    results = pipe.execute()
+
+    pipe = raw_client.pipeline(transaction=False)
+    converted, skipped = 0, 0
+
+    for key, data in zip(keys, results):
+        product_id = int(key.decode().split(':')[1])
+        refs = product_refs.get(product_id)
+        if refs is None or not any(data[:-1]):
+            skipped += 1
+            continue
+
+        fmt = data[-1].decode() if data[-1] else FORMAT_JSON
+        for field, raw in zip(shared_fields, data[:-1]):
+            if raw:
+                value = encode_vector(decode_vector(raw, fmt), FORMAT_F32)
+                pipe.set(shared_key(field, shared_ref(field, refs)), value, nx=True)
+        pipe.hdel(key, *[field for field, raw in zip(shared_fields, data[:-1]) if raw])
+        pipe.hset(key, mapping={column: str(refs[column]) for column in REF_FIELDS})
+        converted += 1
+
+    if not dry_run and converted:
+        pipe.execute()
+
+    return converted, skipped
+
+
+def load_product_refs():
+    """products 테이블의 상품 ID -> {'brand_id', 'category_id'}"""
+    from src.db_client import RDSClient
+
+    db = RDSClient()
+    query = "SELECT product_id, brand_id, category_id FROM products WHERE brand_id IS NOT NULL AND category_id IS NOT NULL"
+    return {
+        int(row['product_id']): {'brand_id': row['brand_id'], 'category_id': row['category_id']}
+        for row in db.execute_stream(query, chunk_size=10000)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 상품 벡터 포맷 마이그레이션")
+    parser.add_argument('--to', dest='target_fmt', choices=VECTOR_FORMATS, default=FORMAT_F32,
+                        help="변환할 대상 포맷 (기본값: f32le, f16le/i8s는 양자화 저장)")
+    parser.add_argument('--batch-size', type=int, default=500, help="한 번에 처리할 키 개수")
+    parser.add_argument('--match', default='product:*:vectors', help="SCAN 키 패턴")
+    parser.add_argument('--dry-run', action='store_true', help="실제로 쓰지 않고 변환 대상 개수만 집계")
+    parser.add_argument('--share', action='store_true',
+                        help="포맷 변환 대신 브랜드/카테고리 벡터를 shared 키로 옮기고 참조만 남김")
+    args = parser.parse_args()
+
+    redis_conn = RedisClient()
+    if not redis_conn.raw_client:
+        sys.exit(1)
+
+    if args.share:
+        product_refs = load_product_refs()
+        print(f"📊 브랜드/카테고리 참조 로드: {len(product_refs)}개 상품")
+        run_batch = lambda keys: share_batch(redis_conn.raw_client, keys, product_refs, args.dry_run)
+        target = 'shared'
+    else:
+        run_batch = lambda keys: migrate_batch(redis_conn.raw_client, keys, args.target_fmt, args.dry_run)
+        target = args.target_fmt
+
+    print(f"🚀 마이그레이션 시작: {args.match} -> {target} (batch={args.batch_size}, dry_run={args.dry_run})")
+    start_time = time.time()
+    total_converted, total_skipped = 0, 0
+    batch = []
+
+    # KEYS 대신 SCAN으로 순회하여 Redis를 블로킹하지 않음
+    for key in redis_conn.raw_client.scan_iter(match=args.match, count=args.batch_size):
+        batch.append(key)
+        if len(batch) >= args.batch_size:
+            converted, skipped = run_batch(batch)
+            total_converted += converted
+            total_skipped += skipped
+            batch = []
+            print(f"   ... 변환 {total_converted}개 / 건너뜀 {total_skipped}개", flush=True)
+
+    if batch:
+        converted, skipped = run_batch(batch)
+        total_converted += converted
+        total_skipped += skipped
+
+    elapsed = time.time() - start_time
+    print(f"✅ 마이그레이션 완료: 변환 {total_converted}개 / 건너뜀 {total_skipped}개 ({elapsed:.1f}초)")
+
+
+if __name__ == '__main__':
+    main()
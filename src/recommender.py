@@ -0,0 +1,961 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+
+# Redis 해시에 저장된 5가지 벡터 필드 (vector_codec.py에 정의)
+from src.vector_codec import VECTOR_FIELDS, SharedVectors, QUANTIZED_PRECISIONS, quantize_rows, dequantize_rows
+
+# 기존 get_weighted_similarity와 동일한 균등 가중치 (0.2씩)
+DEFAULT_WEIGHTS = {field: 0.2 for field in VECTOR_FIELDS}
+
+# 이름 붙은 가중치 프로필
+# - 'notebook': similerity.ipynb의 가중치를 Redis 필드에 대응시킨 것
+#   (cos_image 0.75, cos_product 0.15, cos_category 0.15, cos_brand_desc 0.1, cos_brand_cat 0.1,
+#    Redis에 없는 cos_style/cos_brand는 제외)
+WEIGHT_PROFILES = {
+    'default': DEFAULT_WEIGHTS,
+    'notebook': {
+        'image_emb': 0.75,
+        'name_emb': 0.15,
+        'lower_cat_emb': 0.15,
+        'brand_info_emb': 0.1,
+        'brand_cat_emb': 0.1,
+    },
+}
+
+
+def normalize_rows(matrix):
+    """
+    행 단위 L2 정규화. 노름이 0인 행(누락된 벡터)은 영벡터로 유지하여
+    기존 cosine_similarity가 0.0을 반환하던 동작과 맞춥니다.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def build_fused_vectors(field_vectors, fields=None, weights=None, normalized=False):
+    """
+    필드별 벡터를 정규화한 뒤 sqrt(가중치)를 곱해 이어 붙인 fused 벡터를 만듭니다.
+    두 fused 벡터의 내적 = sum_f w_f * cos_f 이므로, 가중 유사도 계산이 내적 한 번으로 끝납니다.
+
+    Args:
+        field_vectors (dict): 필드명 -> (n, dim) 또는 (dim,) 벡터
+        fields (list): 이어 붙일 필드 순서 (기본값: VECTOR_FIELDS)
+        weights (dict): 필드명 -> 가중치 (기본값: DEFAULT_WEIGHTS)
+        normalized (bool): 이미 행 단위로 정규화된 벡터면 True
+
+    Returns:
+        np.ndarray: (n, sum(dim)) 또는 (sum(dim),) float32
+    """
+    fields = list(fields or VECTOR_FIELDS)
+    weights = weights or DEFAULT_WEIGHTS
+
+    parts = []
+    for f in fields:
+        vec = np.asarray(field_vectors[f], dtype=np.float32)
+        if not normalized:
+            vec = normalize_rows(vec)
+        parts.append(vec * np.float32(np.sqrt(weights.get(f, 0.0))))
+    return np.concatenate(parts, axis=-1)
+
+
+def top_k_indices(scores, k):
+    """
+    점수 배열에서 상위 k개의 (인덱스, 점수)를 내림차순으로 반환합니다.
+    전체 정렬 대신 argpartition으로 상위 k개만 골라낸 뒤 그 안에서만 정렬합니다.
+    """
+    if len(scores) == 0 or k <= 0:
+        return np.array([], dtype=int), scores[:0]
+
+    k = min(k, len(scores))
+    top_idx = np.argpartition(-scores, k - 1)[:k]
+    top_idx = top_idx[np.argsort(-scores[top_idx])]
+    return top_idx, scores[top_idx]
+
+
+class MatrixScorer:
+    """
+    후보 상품들의 임베딩을 필드별로 미리 정규화된 행렬로 보관하고,
+    대표 아이템 하나에 대한 가중 코사인 유사도를 필드당 행렬-벡터 곱 한 번으로 계산합니다.
+
+    사용 예:
+        scorer = MatrixScorer()
+        scorer.fit(candidate_ids, {'image_emb': (n, 768) 배열, ...})
+        top_idx, top_scores = scorer.top_k(target_vectors, k=5)
+    """
+
+    def __init__(self, fields=None, weights=None):
+        self.fields = list(fields or VECTOR_FIELDS)
+        weights = weights or DEFAULT_WEIGHTS
+        # 필드 순서에 맞춘 가중치 벡터 (F,)
+        self.weights = np.array([weights.get(f, 0.0) for f in self.fields], dtype=np.float32)
+        self.ids = np.array([])
+        self.matrices = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def fit(self, ids, field_vectors, normalized=False):
+        """
+        Args:
+            ids (list): 후보 상품 ID 리스트 (행 순서와 동일)
+            field_vectors (dict): 필드명 -> (n, dim) 배열 또는 SharedVectors
+            normalized (bool): 이미 행 단위로 정규화된 벡터면 True (EmbeddingStore 등)
+        """
+        self.ids = np.asarray(ids)
+        self.matrices = {}
+        for f in self.fields:
+            vectors = field_vectors[f]
+            if isinstance(vectors, SharedVectors):
+                # 공유 벡터는 고유 벡터 표만 정규화 (상품 수만큼 펼치지 않음)
+                self.matrices[f] = vectors if normalized else SharedVectors(normalize_rows(vectors.table), vectors.index)
+            elif normalized:
+                self.matrices[f] = np.asarray(vectors, dtype=np.float32)
+            else:
+                self.matrices[f] = normalize_rows(vectors)
+        return self
+
+    def score(self, target_vectors, rows=None):
+        """
+        대표 아이템 벡터(필드명 -> (dim,))에 대한 가중 유사도를 반환합니다.
+
+        Args:
+            rows (np.ndarray): 점수를 계산할 행 인덱스 (None이면 전체 후보, (n,) 반환)
+        """
+        n = len(self.ids) if rows is None else len(rows)
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        # (F, n): 필드별 코사인 유사도를 한 번의 BLAS 호출로 계산
+        # (SharedVectors 필드는 브랜드/카테고리별로 한 번만 계산한 뒤 상품에 gather)
+        per_field = np.stack([
+            (self.matrices[f] if rows is None else self.matrices[f][rows]) @ normalize_rows(target_vectors[f])
+            for f in self.fields
+        ])
+        # 가중치 벡터로 한 번에 합산
+        return self.weights @ per_field
+
+    def top_k(self, target_vectors, k=5):
+        """
+        점수가 높은 상위 k개 후보의 (행 인덱스, 점수)를 내림차순으로 반환합니다.
+        """
+        return top_k_indices(self.score(target_vectors), k)
+
+
+class FusedScorer:
+    """
+    프로필별로 미리 만들어 둔 fused 벡터 행렬 (n, D)에 대해 후보당 내적 한 번으로 점수를 계산합니다.
+    결과는 같은 가중치의 MatrixScorer와 동일합니다.
+    """
+
+    def __init__(self, fields=None, weights=None):
+        self.fields = list(fields or VECTOR_FIELDS)
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.ids = np.array([])
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def fit(self, ids, fused_matrix):
+        """
+        Args:
+            ids (list): 후보 상품 ID 리스트 (행 순서와 동일)
+            fused_matrix (np.ndarray): build_fused_vectors로 만든 (n, D) 행렬
+        """
+        self.ids = np.asarray(ids)
+        self.matrix = np.asarray(fused_matrix, dtype=np.float32)
+        return self
+
+    def fuse_target(self, target_vectors):
+        """대표 아이템의 필드별 벡터 -> fused 쿼리 벡터 (D,)"""
+        return build_fused_vectors(target_vectors, self.fields, self.weights)
+
+    def score(self, target_vectors, rows=None):
+        if len(self.ids) == 0:
+            return np.zeros(0, dtype=np.float32)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return matrix @ self.fuse_target(target_vectors)
+
+    def top_k(self, target_vectors, k=5):
+        return top_k_indices(self.score(target_vectors), k)
+
+
+class StreamingTopK:
+    """
+    청크 단위로 들어오는 (ID, 점수)에서 상위 k개만 유지합니다.
+    청크마다 argpartition으로 후보를 k개로 줄인 뒤 크기 k의 최소 힙에 병합하므로,
+    카테고리 크기와 상관없이 메모리는 청크 하나 + k개로 일정합니다.
+    """
+
+    def __init__(self, k=5):
+        self.k = k
+        self.heap = []  # (score, product_id) 최소 힙
+
+    def push(self, ids, scores):
+        top_idx, top_scores = top_k_indices(scores, self.k)
+        for product_id, score in zip(np.asarray(ids)[top_idx].tolist(), top_scores.tolist()):
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, (score, product_id))
+            elif score > self.heap[0][0]:
+                heapq.heapreplace(self.heap, (score, product_id))
+
+    def result(self):
+        """(상품 ID 배열, 점수 배열)을 점수 내림차순으로 반환"""
+        ranked = sorted(self.heap, reverse=True)
+        return (np.array([pid for _, pid in ranked]),
+                np.array([score for score, _ in ranked], dtype=np.float32))
+
+
+def iter_vector_chunks(vector_source, product_ids=None, chunk_size=1000, fused_profile=None, id_chunks=None):
+    """
+    벡터 소스(RedisClient / EmbeddingStore)에서 product_ids를 chunk_size개씩 읽어
+    (벡터가 있는 ID 배열, 필드별 벡터 dict 또는 fused 행렬)을 차례로 내보냅니다.
+
+    Args:
+        fused_profile (str): EmbeddingStore의 fused 프로필명 (지정하면 fused 행렬을 읽음)
+        id_chunks (iterable): product_ids 대신 ID 리스트 단위로 들어오는 이터러블
+                              (RDSClient.execute_stream 등에서 스트리밍으로 받을 때)
+    """
+    if id_chunks is None:
+        id_chunks = (product_ids[start:start + chunk_size] for start in range(0, len(product_ids), chunk_size))
+
+    for chunk in id_chunks:
+        chunk_ids = np.asarray(chunk)
+        if len(chunk_ids) == 0:
+            continue
+
+        if fused_profile:
+            matrix, missing = vector_source.get_many_fused_vectors(chunk_ids, fused_profile)
+            yield chunk_ids[~missing], matrix[~missing]
+            continue
+
+        bulk = vector_source.get_many_product_vectors(list(chunk_ids))
+        if not bulk:
+            continue
+        vectors, missing = bulk
+        yield chunk_ids[~missing], {f: v[~missing] for f, v in vectors.items()}
+
+
+def stream_top_k(target_vectors, chunks, k=5, fields=None, weights=None, normalized=False):
+    """
+    후보 청크들을 차례로 점수 매기며 상위 k개만 유지합니다.
+
+    Args:
+        chunks (iterable): (ids, 필드별 벡터 dict) 또는 (ids, fused 행렬) 튜플의 이터러블
+                           (iter_vector_chunks 등)
+
+    Returns:
+        tuple: (상품 ID 배열, 점수 배열) 내림차순
+    """
+    top = StreamingTopK(k)
+    for ids, vectors in chunks:
+        if len(ids) == 0:
+            continue
+        if isinstance(vectors, dict):
+            scorer = MatrixScorer(fields, weights).fit(ids, vectors, normalized)
+        else:
+            scorer = FusedScorer(fields, weights).fit(ids, vectors)
+        top.push(scorer.ids, scorer.score(target_vectors))
+    return top.result()
+
+
+# 페르소나 대표 아이템(anchor) 여러 개의 점수를 합치는 방식
+# - 'max': anchor 중 가장 비슷한 것 기준 (anchor마다 다른 스타일을 모두 살림)
+# - 'mean': anchor별 점수의 평균
+# - 'centroid': 필드별 평균 벡터를 다시 정규화한 가상의 anchor 하나로 점수 계산
+ANCHOR_RULES = ('max', 'mean', 'centroid')
+
+
+def build_anchor_queries(anchor_vectors, fields=None, weights=None, rule='max'):
+    """
+    anchor들의 필드별 벡터 -> fused 쿼리 행렬.
+
+    Args:
+        anchor_vectors (dict): 필드명 -> (a, dim) 배열 (anchor a개)
+
+    Returns:
+        np.ndarray: (a, D) 쿼리 행렬 ('centroid'면 (1, D))
+    """
+    if rule not in ANCHOR_RULES:
+        raise ValueError(f"지원하지 않는 anchor 결합 방식입니다: {rule}")
+    fields = list(fields or VECTOR_FIELDS)
+
+    if rule == 'centroid':
+        anchor_vectors = {
+            f: normalize_rows(np.asarray(anchor_vectors[f], dtype=np.float32)).mean(axis=0, keepdims=True)
+            for f in fields
+        }
+    return build_fused_vectors(anchor_vectors, fields, weights)
+
+
+def combine_anchor_scores(matrix, queries, rule='max', block_size=64):
+    """
+    후보 fused 행렬 (n, D)와 쿼리 행렬 (a, D)의 점수를 행렬 곱 (n, D) @ (D, a)로 구한 뒤
+    anchor 축으로 합칩니다. anchor 수와 상관없이 후보 행렬은 한 번만 읽습니다.
+
+    Args:
+        block_size (int): 한 번에 곱할 후보 행 수. 폭이 좁은 (D, a) 행렬 곱은 후보 블록이
+                          캐시에 머무를 만큼 작게 나눌 때 anchor 하나짜리 내적과 비슷한 비용이 됩니다.
+
+    Returns:
+        np.ndarray: (n,) 결합 점수
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    if len(queries) == 1:
+        return matrix @ queries[0]
+
+    queries_t = np.ascontiguousarray(queries.T)
+    scores = np.empty((len(matrix), len(queries)), dtype=np.float32)
+    for start in range(0, len(matrix), block_size):
+        np.matmul(matrix[start:start + block_size], queries_t, out=scores[start:start + block_size])
+    if rule == 'mean':
+        return scores.mean(axis=1)
+    return scores.max(axis=1)
+
+
+def stream_anchor_top_k(queries, chunks, k=5, fields=None, weights=None, normalized=False,
+                        rule='max', exclude_ids=None):
+    """
+    stream_top_k의 다중 anchor 버전: 청크마다 fused 행렬을 만들고 combine_anchor_scores로 점수 계산.
+
+    Args:
+        queries (np.ndarray): build_anchor_queries 결과 (a, D)
+        chunks (iterable): (ids, 필드별 벡터 dict) 또는 (ids, fused 행렬) 튜플의 이터러블
+        exclude_ids (list): 결과에서 제외할 상품 ID (anchor 자신들)
+
+    Returns:
+        tuple: (상품 ID 배열, 점수 배열) 내림차순
+    """
+    top = StreamingTopK(k)
+    for ids, vectors in chunks:
+        if len(ids) == 0:
+            continue
+        if isinstance(vectors, dict):
+            vectors = build_fused_vectors(vectors, fields, weights, normalized)
+        if exclude_ids is not None:
+            keep = ~np.isin(ids, exclude_ids)
+            ids, vectors = ids[keep], vectors[keep]
+        top.push(ids, combine_anchor_scores(vectors, queries, rule))
+    return top.result()
+
+
+class CatalogAttributes:
+    """
+    상품 속성(upper_category, category_id, brand_id, gender, sale_price)을 상품 ID 기준으로 정렬된
+    컬럼별 NumPy 배열로 보관합니다. 추천 API의 필터는 MySQL을 다시 조회하지 않고
+    이 배열들에 대한 불리언 마스크로 계산되며, 마스크를 통과한 상품만 점수를 매깁니다.
+    """
+
+    COLUMNS = ['upper_category', 'category_id', 'brand_id', 'gender', 'sale_price']
+
+    def __init__(self, ids, **columns):
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.columns = {name: np.asarray(columns[name])[order] for name in self.COLUMNS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        RDSClient.execute_stream(output='numpy')가 내보내는 {컬럼명: 배열} 청크들로 생성합니다.
+        쿼리는 product_id와 COLUMNS를 모두 SELECT해야 합니다.
+        """
+        parts = {name: [] for name in ['product_id'] + cls.COLUMNS}
+        for chunk in chunks:
+            for name in parts:
+                parts[name].append(chunk[name])
+
+        if not parts['product_id']:
+            return cls(np.zeros(0), **{name: np.zeros(0) for name in cls.COLUMNS})
+
+        merged = {name: np.concatenate(values) for name, values in parts.items()}
+        # DECIMAL/NULL이 섞인 object 배열을 float으로 변환 (NULL은 NaN이 되어 가격 필터에서 제외됨)
+        merged['sale_price'] = np.array(
+            [np.nan if v is None else float(v) for v in merged['sale_price']], dtype=np.float64
+        )
+        return cls(merged.pop('product_id'), **merged)
+
+    def lookup(self, product_ids):
+        """상품 ID -> 행 번호 (이진 탐색). (rows, found) 반환"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.zeros(len(product_ids), dtype=np.int64), np.zeros(len(product_ids), dtype=bool)
+        rows = np.minimum(np.searchsorted(self.ids, product_ids), len(self.ids) - 1)
+        return rows, self.ids[rows] == product_ids
+
+    def filter_mask(self, upper_category=None, category_ids=None, brand_ids=None, genders=None,
+                    min_price=None, max_price=None):
+        """
+        조건을 모두 만족하는 상품의 불리언 마스크 (n,). None인 조건은 무시합니다.
+
+        Args:
+            upper_category (str): 상위 카테고리 (예: '상의')
+            category_ids (list): 허용할 category_id 목록
+            brand_ids (list): 허용할 brand_id 목록
+            genders (list): 허용할 gender 값 목록 (0: 공용, 1: 남성, 2: 여성)
+            min_price, max_price (float): sale_price 범위 (양 끝 포함)
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        if upper_category is not None:
+            mask &= self.columns['upper_category'] == upper_category
+        if category_ids:
+            mask &= np.isin(self.columns['category_id'], category_ids)
+        if brand_ids:
+            mask &= np.isin(self.columns['brand_id'], brand_ids)
+        if genders:
+            mask &= np.isin(self.columns['gender'], genders)
+        if min_price is not None:
+            mask &= self.columns['sale_price'] >= min_price
+        if max_price is not None:
+            mask &= self.columns['sale_price'] <= max_price
+        return mask
+
+
+def run_concurrently(tasks, timeout=None, executor=None, default=None):
+    """
+    여러 작업(카테고리별 추천 등)을 스레드 풀에서 동시에 실행하고 이름별 결과를 모읍니다.
+    DB 조회, Redis 왕복, NumPy 행렬 곱은 모두 GIL을 놓고 기다리므로 스레드로도 겹쳐 실행됩니다.
+
+    Args:
+        tasks (dict): 이름 -> 인자 없는 callable
+        timeout (float): 모든 작업을 기다릴 최대 시간(초). 넘긴 작업은 default로 채움
+            (이미 실행 중인 스레드는 중단할 수 없으므로 백그라운드에서 끝까지 실행된 뒤 버려짐)
+        executor (ThreadPoolExecutor): 재사용할 풀 (없으면 이번 호출용으로 만들고 정리)
+        default: 시간 초과 또는 예외가 난 작업의 결과값
+
+    Returns:
+        dict: 이름 -> 결과
+    """
+    if not tasks:
+        return {}
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=len(tasks))
+
+    try:
+        futures = {name: executor.submit(task) for name, task in tasks.items()}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                print(f"⏱️ [{name}] {timeout}초 안에 끝나지 않아 빈 결과로 대체합니다.")
+                results[name] = default
+            elif future.exception() is not None:
+                print(f"⚠️ [{name}] 실행 중 오류: {future.exception()}")
+                results[name] = default
+            else:
+                results[name] = future.result()
+        return results
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class IVFIndex:
+    """
+    Inverted-file 근사 최근접 이웃 인덱스.
+
+    각 상품의 필드별 정규화 벡터에 sqrt(가중치)를 곱해 이어 붙이면, 두 상품 벡터의 내적이
+    가중 코사인 유사도 합과 같아집니다. 이 공간에서 k-means로 coarse centroid를 학습해
+    상품을 리스트에 나눠 담고, 검색 시에는 대표 아이템과 가까운 nprobe개 리스트의 상품만
+    가져와 MatrixScorer로 정확한 5필드 가중 점수를 다시 계산(re-ranking)합니다.
+    """
+
+    def __init__(self, n_lists=None, nprobe=8, fields=None, weights=None,
+                 train_size=10000, block_size=4096, seed=42):
+        """
+        Args:
+            n_lists (int): centroid 개수 (None이면 sqrt(n))
+            nprobe (int): 검색 시 살펴볼 리스트 개수 (클수록 정확하지만 느려짐)
+            train_size (int): k-means 학습에 사용할 최대 샘플 수
+            block_size (int): 전체 상품을 리스트에 배정할 때 한 번에 처리할 행 수
+        """
+        self.scorer = MatrixScorer(fields, weights)
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.block_size = block_size
+        self.seed = seed
+
+        self.centroids = {}
+        self.centroid_sq = np.zeros(0, dtype=np.float32)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.scorer)
+
+    @property
+    def ids(self):
+        return self.scorer.ids
+
+    def _centroid_distances(self, field_blocks):
+        """
+        field_blocks(필드명 -> (m, dim) 정규화 벡터)와 모든 centroid 사이의
+        제곱 거리에서 상수항(||x||^2)을 뺀 값 (m, n_lists)을 계산합니다.
+        이어 붙인 벡터를 만들지 않고 필드별 행렬 곱의 합으로 구합니다.
+        """
+        sqrt_w = np.sqrt(self.scorer.weights)
+        dots = sum(
+            sqrt_w[i] * (field_blocks[f] @ self.centroids[f].T)
+            for i, f in enumerate(self.scorer.fields)
+        )
+        return self.centroid_sq - 2 * dots
+
+    def fit(self, ids, field_vectors, normalized=False):
+        # scikit-learn은 인덱스 빌드 시에만 필요
+        from sklearn.cluster import MiniBatchKMeans
+
+        self.scorer.fit(ids, field_vectors, normalized)
+        n = len(self.scorer)
+        if n == 0:
+            return self
+
+        fields = self.scorer.fields
+        matrices = self.scorer.matrices
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n))), n)
+
+        # 1. 샘플로 coarse centroid 학습 (sqrt(가중치)를 곱해 이어 붙인 공간)
+        rng = np.random.default_rng(self.seed)
+        sample = np.sort(rng.choice(n, size=min(n, self.train_size), replace=False))
+        train = build_fused_vectors(
+            {f: matrices[f][sample] for f in fields}, fields,
+            dict(zip(fields, self.scorer.weights)), normalized=True
+        )
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists, batch_size=1024, n_init=3, random_state=self.seed
+        ).fit(train)
+        del train
+
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        offsets = np.cumsum([0] + [matrices[f].shape[1] for f in fields])
+        self.centroids = {f: centroids[:, offsets[i]:offsets[i + 1]] for i, f in enumerate(fields)}
+        self.centroid_sq = (centroids ** 2).sum(axis=1)
+
+        # 2. 전체 상품을 가장 가까운 centroid의 리스트에 배정 (블록 단위)
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            block = {f: matrices[f][start:end] for f in fields}
+            assign[start:end] = np.argmin(self._centroid_distances(block), axis=1)
+
+        # 3. 리스트별 행 번호를 CSR 형태로 저장 (list_rows[offsets[l]:offsets[l+1]])
+        self.list_rows = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self
+
+    def candidate_rows(self, target_vectors, nprobe=None):
+        """대표 아이템과 가까운 nprobe개 리스트에 속한 행 번호들"""
+        n_lists = len(self.list_offsets) - 1
+        if n_lists == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        nprobe = min(nprobe or self.nprobe, n_lists)
+        query = {f: normalize_rows(target_vectors[f])[None, :] for f in self.scorer.fields}
+        dist = self._centroid_distances(query)[0]
+        probes = np.argpartition(dist, nprobe - 1)[:nprobe]
+
+        return np.concatenate([
+            self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probes
+        ])
+
+    def search(self, target_vectors, k=5, nprobe=None, exclude_ids=None):
+        """
+        근사 검색 후 정확한 가중 점수로 re-ranking한 상위 k개의 (행 인덱스, 점수)를 반환합니다.
+
+        Args:
+            exclude_ids (list): 결과에서 제외할 상품 ID (대표 아이템 자신 등)
+        """
+        rows = self.candidate_rows(target_vectors, nprobe)
+        if exclude_ids is not None and len(rows):
+            rows = rows[~np.isin(self.scorer.ids[rows], exclude_ids)]
+
+        scores = self.scorer.score(target_vectors, rows=rows)
+        top_idx, top_scores = top_k_indices(scores, k)
+        return rows[top_idx], top_scores
+
+
+class CategoryIVFIndex:
+    """
+    upper_category별로 분할된 IVFIndex 모음.
+    추천은 항상 같은 upper_category 안에서만 이루어지므로 카테고리마다 독립된 인덱스를 둡니다.
+    """
+
+    def __init__(self, **ivf_kwargs):
+        self.ivf_kwargs = ivf_kwargs
+        self.indexes = {}
+
+    def __contains__(self, category):
+        return category in self.indexes
+
+    def fit(self, ids, categories, field_vectors, normalized=False):
+        """
+        Args:
+            ids (array-like): (n,) 상품 ID
+            categories (array-like): (n,) 상품별 upper_category
+            field_vectors (dict): 필드명 -> (n, dim) 배열
+        """
+        ids = np.asarray(ids)
+        categories = np.asarray(categories)
+
+        for category in np.unique(categories):
+            mask = categories == category
+            self.indexes[category] = IVFIndex(**self.ivf_kwargs).fit(
+                ids[mask], {f: v[mask] for f, v in field_vectors.items()}, normalized
+            )
+            print(f"✅ IVF 인덱스 생성: {category} ({mask.sum()}개 상품, "
+                  f"{len(self.indexes[category].list_offsets) - 1}개 리스트)")
+        return self
+
+    def search(self, category, target_vectors, k=5, nprobe=None, exclude_ids=None):
+        """
+        Returns:
+            tuple: (상품 ID 배열, 점수 배열) 내림차순. 해당 카테고리 인덱스가 없으면 빈 배열
+        """
+        index = self.indexes.get(category)
+        if index is None:
+            return np.array([]), np.zeros(0, dtype=np.float32)
+
+        rows, scores = index.search(target_vectors, k, nprobe, exclude_ids)
+        return index.ids[rows], scores
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+class CatalogSnapshot:
+    """
+    카탈로그 전체의 fused 벡터 행렬을 upper_category별로 연속된 행에 모아 둔 읽기 전용 스냅샷.
+    배열은 쓰기 금지로 고정되며, 변경은 apply()로 새 스냅샷을 만들어 참조를 통째로 교체합니다.
+    (요청 처리 중에는 처음 받은 스냅샷 하나만 사용하므로 반쯤 갱신된 상태를 볼 일이 없음)
+    """
+
+    def __init__(self, version, ids, categories, matrix):
+        """
+        Args:
+            version (int): 카탈로그 버전 (Redis catalog:version)
+            ids (array-like): (n,) 상품 ID
+            categories (array-like): (n,) 상품별 upper_category
+            matrix (np.ndarray): (n, D) fused 벡터 (build_fused_vectors 결과)
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        categories = np.asarray(categories, dtype=str)
+        order = np.lexsort((ids, categories))
+
+        self.version = version
+        self.ids = _frozen(ids[order])
+        self.categories = _frozen(categories[order])
+        self.matrix = _frozen(np.ascontiguousarray(np.asarray(matrix, dtype=np.float32)[order]))
+
+        # 카테고리별 행 구간 (정렬되어 있으므로 슬라이스로 복사 없이 접근)
+        names, starts = np.unique(self.categories, return_index=True)
+        ends = np.append(starts[1:], len(self.ids))
+        self.slices = {name: (int(start), int(end)) for name, start, end in zip(names, starts, ends)}
+        # 상품 ID -> 행 조회용 (ID 오름차순 행 번호)
+        self.id_order = _frozen(np.argsort(self.ids, kind='stable'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, category):
+        return category in self.slices
+
+    def apply(self, version, added_ids, added_categories, added_matrix, removed_ids=()):
+        """
+        추가/변경된 상품과 삭제된 상품을 반영한 새 스냅샷을 반환합니다. (self는 변경하지 않음)
+        added_ids에 이미 있는 상품은 새 벡터로 교체됩니다.
+        """
+        drop = np.concatenate([np.asarray(added_ids, dtype=np.int64), np.asarray(removed_ids, dtype=np.int64)])
+        keep = ~np.isin(self.ids, drop)
+        if len(self.ids) == 0 and len(added_ids):
+            return CatalogSnapshot(version, added_ids, added_categories, added_matrix)
+        if len(added_ids) == 0:
+            added_matrix = np.zeros((0, self.matrix.shape[1]), dtype=np.float32)
+        return CatalogSnapshot(
+            version,
+            np.concatenate([self.ids[keep], np.asarray(added_ids, dtype=np.int64)]),
+            np.concatenate([self.categories[keep], np.asarray(added_categories, dtype=str)]),
+            np.vstack([self.matrix[keep], np.asarray(added_matrix, dtype=np.float32)]),
+        )
+
+    def lookup(self, product_ids):
+        """
+        상품 ID들의 행 번호.
+
+        Returns:
+            tuple: (행 번호 배열, 스냅샷에 있는지 여부 마스크)
+        """
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.zeros(len(product_ids), dtype=np.int64), np.zeros(len(product_ids), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.ids[self.id_order], product_ids), len(self.ids) - 1)
+        rows = self.id_order[pos]
+        return rows, self.ids[rows] == product_ids
+
+    def search_ids(self, product_ids, query, k=5, block_size=4096):
+        """
+        지정한 상품들(필터 통과 후보) 중 fused 쿼리 벡터 (D,)와의 내적 상위 k개.
+        스냅샷에 없는(벡터가 없는) 상품은 건너뛰며, 행을 block_size개씩 모아 점수를 매겨 복사량을 제한합니다.
+
+        Returns:
+            tuple: (상품 ID 배열, 점수 배열) 내림차순
+        """
+        rows, found = self.lookup(product_ids)
+        rows = np.sort(rows[found])
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), block_size):
+            scores[start:start + block_size] = self.matrix[rows[start:start + block_size]] @ query
+
+        top_idx, top_scores = top_k_indices(scores, k)
+        return self.ids[rows[top_idx]], top_scores
+
+    def search(self, category, query, k=5, exclude_ids=None, rule='max'):
+        """
+        카테고리 안에서 fused 쿼리 벡터 (D,)와의 내적 상위 k개.
+        query가 (a, D) 쿼리 행렬(build_anchor_queries)이면 행렬 곱 한 번으로 anchor 점수를 구해 rule로 합칩니다.
+
+        Returns:
+            tuple: (상품 ID 배열, 점수 배열) 내림차순. 카테고리가 없으면 빈 배열
+        """
+        if category not in self.slices:
+            return np.array([], dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        start, end = self.slices[category]
+        ids = self.ids[start:end]
+        if np.ndim(query) == 2:
+            scores = combine_anchor_scores(self.matrix[start:end], query, rule)
+        else:
+            scores = self.matrix[start:end] @ query
+        if exclude_ids is not None:
+            scores[np.isin(ids, exclude_ids)] = -np.inf
+
+        top_idx, top_scores = top_k_indices(scores, k)
+        valid = np.isfinite(top_scores)
+        return ids[top_idx[valid]], top_scores[valid]
+
+
+def recall_latency_report(index, n_queries=100, k=10, nprobes=(1, 2, 4, 8, 16, 32), seed=0):
+    """
+    IVFIndex의 nprobe별 recall@k와 평균 지연 시간을 brute force(MatrixScorer 전체 스캔)와 비교합니다.
+    인덱스에 들어 있는 상품 중 n_queries개를 무작위로 골라 대표 아이템으로 사용합니다.
+
+    Returns:
+        list: [{'method', 'nprobe', 'recall', 'latency_ms'}, ...]
+    """
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(index), size=min(n_queries, len(index)), replace=False)
+    queries = [
+        {f: np.asarray(index.scorer.matrices[f][row]) for f in index.scorer.fields}
+        for row in query_rows
+    ]
+
+    # 정답: 전체 스캔 결과
+    truth = []
+    start = time.perf_counter()
+    for query in queries:
+        truth.append(set(index.scorer.top_k(query, k)[0].tolist()))
+    brute_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = [{'method': 'brute', 'nprobe': None, 'recall': 1.0, 'latency_ms': brute_ms}]
+    for nprobe in nprobes:
+        hits = 0
+        start = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            rows, _ = index.search(query, k, nprobe=nprobe)
+            hits += len(expected & set(rows.tolist()))
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        report.append({
+            'method': 'ivf', 'nprobe': nprobe,
+            'recall': hits / sum(len(t) for t in truth), 'latency_ms': latency_ms
+        })
+
+    print(f"📊 IVF recall/latency (n={len(index)}, lists={len(index.list_offsets) - 1}, k={k})")
+    for row in report:
+        nprobe = '-' if row['nprobe'] is None else row['nprobe']
+        print(f"   {row['method']:>5} nprobe={nprobe:>3}  recall@{k}={row['recall']:.3f}  {row['latency_ms']:.2f} ms")
+    return report
+
+
+class QuantizedScorer:
+    """
+    int8 양자화 fused 행렬로 1차 점수를 매기고, 상위 rerank개만 full precision fused 행렬에서 다시 계산합니다.
+    메모리에는 int8 행렬(float32의 약 1/4)만 두고 full precision 행렬은 memmap(EmbeddingStore)에서
+    후보 행만 읽습니다.
+
+    1차 점수는 캐시에 들어가는 작은 블록(block_size행)씩 float32 버퍼로 옮겨 곱하므로,
+    메모리에서 읽는 양이 1/4로 줄고 처리량은 float32 전체 스캔과 비슷합니다.
+    numpy에는 빠른 float16/정수 행렬 곱이 없으므로 f16 행렬은 fit에서 float32로 한 번 복원합니다.
+    (f16은 디스크/Redis 용량만 줄이고 상주 메모리와 속도는 float32와 같음)
+    """
+
+    def __init__(self, rerank=300, fields=None, weights=None, block_size=32):
+        """
+        Args:
+            rerank (int): full precision으로 다시 계산할 1차 후보 수
+            block_size (int): 1차 점수 계산 시 float32 버퍼로 옮길 행 수 (버퍼가 CPU 캐시에 머무를 만큼 작게)
+        """
+        self.rerank = rerank
+        self.fields = list(fields or VECTOR_FIELDS)
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.block_size = block_size
+        self.ids = np.array([])
+        self.quantized = np.zeros((0, 0), dtype=np.int8)
+        self.scale = None
+        self.exact = None
+        self.exact_rows = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        """1차 점수용 상주 메모리 (바이트)"""
+        return self.quantized.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def fit(self, ids, quantized, scale=None, exact=None, exact_rows=None):
+        """
+        Args:
+            ids (array-like): (n,) 상품 ID
+            quantized (np.ndarray): (n, D) quantize_rows 결과 (int8, float16이면 float32로 복원)
+            scale (np.ndarray): int8일 때 (n,) 행별 scale
+            exact (np.ndarray): full precision fused 행렬 (memmap 가능, None이면 re-ranking 생략)
+            exact_rows (np.ndarray): 각 상품의 exact 행 번호 (None이면 0..n-1)
+        """
+        self.ids = np.asarray(ids)
+        if quantized.dtype == np.float16:
+            quantized = dequantize_rows(quantized)
+        self.quantized = np.ascontiguousarray(quantized)
+        self.scale = scale
+        self.exact = exact
+        self.exact_rows = np.arange(len(self.ids)) if exact_rows is None else np.asarray(exact_rows)
+        return self
+
+    def approx_scores(self, query):
+        """양자화 행렬로 계산한 (n,) 1차 점수"""
+        query = np.asarray(query, dtype=np.float32)
+        if self.quantized.dtype == np.float32:
+            return self.quantized @ query
+
+        n = len(self.ids)
+        scores = np.empty(n, dtype=np.float32)
+        buffer = np.empty((min(self.block_size, n), self.quantized.shape[1]), dtype=np.float32)
+        for start in range(0, n, self.block_size):
+            block = self.quantized[start:start + self.block_size]
+            rows = len(block)
+            np.copyto(buffer[:rows], block, casting='unsafe')
+            np.matmul(buffer[:rows], query, out=scores[start:start + rows])
+        if self.scale is not None:
+            scores *= self.scale
+        return scores
+
+    def top_k_fused(self, query, k=5, rerank=None):
+        """
+        fused 쿼리 벡터 (D,)에 대한 상위 k개의 (행 인덱스, 점수)를 내림차순으로 반환합니다.
+        rerank=0이면 1차 점수만 사용합니다.
+        """
+        if len(self.ids) == 0:
+            return np.array([], dtype=int), np.zeros(0, dtype=np.float32)
+
+        scores = self.approx_scores(query)
+        rerank = self.rerank if rerank is None else rerank
+        if self.exact is None or rerank <= 0:
+            return top_k_indices(scores, k)
+
+        candidates, _ = top_k_indices(scores, max(k, rerank))
+        # memmap은 행 번호 순으로 읽는 편이 빠름
+        candidates = np.sort(candidates)
+        exact_scores = np.asarray(self.exact[self.exact_rows[candidates]], dtype=np.float32) @ query
+        top_idx, top_scores = top_k_indices(exact_scores, k)
+        return candidates[top_idx], top_scores
+
+    def top_k(self, target_vectors, k=5, rerank=None):
+        """대표 아이템의 필드별 벡터에 대한 상위 k개의 (행 인덱스, 점수)"""
+        query = build_fused_vectors(target_vectors, self.fields, self.weights)
+        return self.top_k_fused(query, k, rerank)
+
+
+def quantization_report(ids, fused_matrix, n_queries=50, k=10, rerank=300, precisions=QUANTIZED_PRECISIONS, seed=0):
+    """
+    float32 전체 스캔 대비 양자화 1차 점수(+ full precision re-ranking)의
+    메모리, 처리량(queries/s), top-k 겹침 비율을 비교합니다.
+    fused 행렬에서 n_queries개 행을 무작위로 골라 쿼리로 사용합니다.
+
+    Returns:
+        list: [{'method', 'rerank', 'memory_mb', 'qps', 'overlap'}, ...]
+    """
+    exact = np.asarray(fused_matrix, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    queries = exact[rng.choice(len(exact), size=min(n_queries, len(exact)), replace=False)]
+
+    def timed(search):
+        results = []
+        start = time.perf_counter()
+        for query in queries:
+            results.append(set(search(query).tolist()))
+        return results, len(queries) / max(time.perf_counter() - start, 1e-9)
+
+    truth, exact_qps = timed(lambda query: top_k_indices(exact @ query, k)[0])
+    report = [{'method': 'f32', 'rerank': None, 'memory_mb': exact.nbytes / 2**20, 'qps': exact_qps, 'overlap': 1.0}]
+
+    for precision in precisions:
+        quantized, scale = quantize_rows(exact, precision)
+        scorer = QuantizedScorer(rerank).fit(ids, quantized, scale, exact)
+        memory_mb = scorer.nbytes / 2**20
+
+        for depth in (0, rerank):
+            results, qps = timed(lambda query: scorer.top_k_fused(query, k, rerank=depth)[0])
+            overlap = sum(len(r & t) for r, t in zip(results, truth)) / sum(len(t) for t in truth)
+            report.append({'method': precision, 'rerank': depth, 'memory_mb': memory_mb, 'qps': qps, 'overlap': overlap})
+
+    print(f"📊 양자화 리포트 (n={len(exact)}, D={exact.shape[1]}, k={k})")
+    for row in report:
+        rerank_text = '-' if row['rerank'] is None else row['rerank']
+        print(f"   {row['method']:>4} rerank={rerank_text:>4}  메모리 {row['memory_mb']:8.1f} MB  "
+              f"{row['qps']:8.1f} q/s  top-{k} 겹침 {row['overlap']:.3f}")
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import sys
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.embedding_store import EmbeddingStore
+
+    parser = argparse.ArgumentParser(description="임베딩 저장소로 IVF recall/latency 또는 양자화 리포트 생성")
+    parser.add_argument('--store', required=True, help="EmbeddingStore 디렉터리")
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--quantized', default=None, metavar='PROFILE',
+                        help="IVF 대신 fused 프로필의 양자화(f16/int8) 리포트 생성")
+    parser.add_argument('--rerank', type=int, default=300, help="[--quantized] re-ranking 후보 수")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.store)
+    if args.quantized:
+        quantization_report(
+            np.asarray(store.ids), store.fused[args.quantized], n_queries=args.queries, k=args.k, rerank=args.rerank
+        )
+    else:
+        ivf = IVFIndex(n_lists=args.n_lists, fields=store.fields).fit(
+            np.asarray(store.ids), store.matrices, normalized=True
+        )
+        recall_latency_report(ivf, n_queries=args.queries, k=args.k)
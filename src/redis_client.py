@@ -1,16 +1,43 @@
 import redis
-import json
 import numpy as np
 import os
+import time
 from dotenv import load_dotenv
 
+from src.vector_codec import (
+    VECTOR_FIELDS, VECTOR_DIM, FORMAT_FIELD, FORMAT_JSON, FORMAT_F32, FORMAT_F16, FORMAT_I8, VECTOR_FORMATS,
+    SHARED_FIELDS, REF_FIELDS, DENSE_FIELDS, SharedVectors, shared_ref, shared_key, encode_vector, decode_vector
+)
+
 load_dotenv()
 
+# 카탈로그 변경 로그 (서빙 중인 인메모리 인덱스가 폴링하여 증분 반영)
+# - catalog:version: 변경이 발행될 때마다 1씩 증가
+# - catalog:changes: Sorted Set (member='+{id}' 추가/벡터 변경, '-{id}' 삭제, score=발행 버전)
+# - catalog:changes:floor: 이 버전 이하의 로그는 잘려 나감 (그보다 오래된 인덱스는 전체 재로드)
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CHANGES_KEY = 'catalog:changes'
+CATALOG_FLOOR_KEY = 'catalog:changes:floor'
+
+# 버전 증가와 변경 로그 기록을 한 번에 (읽는 쪽이 로그가 덜 쓰인 버전을 보지 않도록)
+PUBLISH_CHANGES_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+for i = 1, #ARGV do
+    local member = ARGV[i]
+    local sign = string.sub(member, 1, 1) == '+' and '-' or '+'
+    redis.call('ZREM', KEYS[2], sign .. string.sub(member, 2))
+    redis.call('ZADD', KEYS[2], version, member)
+end
+return version
+"""
+
 class RedisClient:
-    def __init__(self):
+    def __init__(self, chunk_size=500):
         self.host = os.getenv('REDIS_HOST', 'localhost')
         self.port = int(os.getenv('REDIS_PORT', 6379))
         self.db = int(os.getenv('REDIS_DB', 0))
+        # 파이프라인 한 번에 묶어 보낼 HMGET 개수
+        self.chunk_size = chunk_size
         
         try:
             self.client = redis.Redis(
@@ -19,43 +46,410 @@ class RedisClient:
                 db=self.db, 
                 decode_responses=True # 문자열로 자동 디코딩
             )
+            # 벡터 조회용 클라이언트 (바이너리 포맷을 읽기 위해 디코딩하지 않음)
+            self.raw_client = redis.Redis(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                decode_responses=False
+            )
             self.client.ping()
             print("✅ Redis 연결 성공")
         except redis.ConnectionError:
             print("❌ Redis 연결 실패")
             self.client = None
+            self.raw_client = None
 
     def get_product_vectors(self, product_id):
         """
         Redis에서 특정 상품의 5가지 임베딩 벡터를 모두 가져옵니다.
         Key 구조 예시: product:{product_id}:vectors -> Hash Field에 각 벡터 저장
+        (브랜드/카테고리 벡터는 shared:{field}:{ref} 키에서 가져와 채웁니다.)
+        """
+        bulk = self.get_many_product_vectors([product_id])
+        if not bulk or bulk[1][0]:
+            return None
+
+        vectors, _ = bulk
+        return {field: np.asarray(vectors[field][0]) for field in VECTOR_FIELDS}
+
+    def get_many_product_vectors(self, product_ids, chunk_size=None):
+        """
+        여러 상품의 벡터를 파이프라인으로 chunk_size개씩 묶어 한 번에 조회합니다.
+        상품마다 HMGET 왕복을 하던 get_product_vectors 반복 호출을 대체합니다.
+
+        Args:
+            product_ids (list): 조회할 상품 ID 리스트
+            chunk_size (int): 파이프라인 한 번에 보낼 HMGET 개수 (기본값: self.chunk_size)
+
+        Returns:
+            tuple: (vectors, missing)
+                vectors (dict): 필드명 -> (n, 768) float32 배열 (product_ids 순서)
+                                브랜드/카테고리 필드(SHARED_FIELDS)는 SharedVectors (고유 벡터 표 + 상품별 행 번호)
+                missing (np.ndarray): (n,) bool 배열, 벡터가 하나도 없는 상품이면 True
+            Redis 연결이 없으면 None
         """
         if not self.client:
             return None
-        
-        key = f"product:{product_id}:vectors"
-        # 5가지 벡터 필드명 (임의 지정)
-        fields = ['image_emb', 'brand_info_emb', 'lower_cat_emb', 'brand_cat_emb', 'name_emb']
-        
+
+        n = len(product_ids)
+        chunk_size = chunk_size or self.chunk_size
+        query_fields = VECTOR_FIELDS + [FORMAT_FIELD] + REF_FIELDS
+        vectors = {field: np.zeros((n, VECTOR_DIM), dtype=np.float32) for field in DENSE_FIELDS}
+        missing = np.ones(n, dtype=bool)
+
+        # 공유 필드: 행 번호 -> 참조 문자열 / 행 번호 -> 상품 해시에 직접 저장된 벡터 (기존 포맷)
+        refs = {field: {} for field in SHARED_FIELDS}
+        inline = {field: {} for field in SHARED_FIELDS}
+
+        for start in range(0, n, chunk_size):
+            chunk = product_ids[start:start + chunk_size]
+
+            try:
+                # 트랜잭션 없이 명령만 모아서 한 번의 왕복으로 전송
+                pipe = self.raw_client.pipeline(transaction=False)
+                for product_id in chunk:
+                    pipe.hmget(f"product:{product_id}:vectors", query_fields)
+                results = pipe.execute()
+            except Exception as e:
+                print(f"⚠️ Redis 파이프라인 조회 오류 ({start}~{start + len(chunk)}번째): {e}")
+                continue
+
+            for offset, data in enumerate(results):
+                values = dict(zip(query_fields, data))
+                fmt = values[FORMAT_FIELD]
+                row_refs = {column: values[column].decode() for column in REF_FIELDS if values[column]}
+                if not row_refs and not any(values[field] for field in VECTOR_FIELDS):
+                    continue
+
+                row = start + offset
+                missing[row] = False
+                for field in DENSE_FIELDS:
+                    # 누락된 필드는 영벡터 유지
+                    if values[field]:
+                        vectors[field][row] = decode_vector(values[field], fmt)
+
+                for field in SHARED_FIELDS:
+                    if values[field]:
+                        inline[field][row] = decode_vector(values[field], fmt)
+                    else:
+                        ref = shared_ref(field, row_refs)
+                        if ref is not None:
+                            refs[field][row] = ref
+
+        shared = self.get_shared_vectors({field: set(field_refs.values()) for field, field_refs in refs.items()})
+        for field in SHARED_FIELDS:
+            vectors[field] = self._gather_shared(n, refs[field], inline[field], shared.get(field, {}))
+
+        return vectors, missing
+
+    @staticmethod
+    def _gather_shared(n, refs, inline, shared):
+        """
+        행별 참조/인라인 벡터를 SharedVectors로 묶습니다.
+        표의 0번 행은 영벡터(벡터 없음), 그 뒤로 고유 공유 벡터, 인라인 벡터 순서입니다.
+        """
+        ref_rows = {ref: 1 + i for i, ref in enumerate(shared)}
+        table = [np.zeros(VECTOR_DIM, dtype=np.float32)] + list(shared.values()) + list(inline.values())
+
+        index = np.zeros(n, dtype=np.int64)
+        for row, ref in refs.items():
+            index[row] = ref_rows.get(ref, 0)
+        for i, row in enumerate(inline):
+            index[row] = 1 + len(shared) + i
+
+        return SharedVectors(np.vstack(table), index)
+
+    def get_shared_vectors(self, refs_by_field, chunk_size=None):
+        """
+        공유 벡터를 파이프라인으로 조회합니다.
+
+        Args:
+            refs_by_field (dict): 필드명 -> 참조 문자열 집합
+
+        Returns:
+            dict: 필드명 -> {참조 문자열: (768,) float32} (저장되지 않은 참조는 빠짐)
+        """
+        items = [(field, ref) for field, field_refs in refs_by_field.items() for ref in field_refs]
+        shared = {field: {} for field in refs_by_field}
+        if not self.client or not items:
+            return shared
+
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            try:
+                values = self.raw_client.mget([shared_key(field, ref) for field, ref in chunk])
+            except Exception as e:
+                print(f"⚠️ Redis 공유 벡터 조회 오류 ({start}번째부터): {e}")
+                continue
+
+            for (field, ref), raw in zip(chunk, values):
+                if raw:
+                    shared[field][ref] = decode_vector(raw, FORMAT_F32)
+        return shared
+
+    def set_shared_vectors(self, field, vectors):
+        """
+        브랜드/카테고리 공유 벡터를 저장합니다.
+
+        Args:
+            field (str): SHARED_FIELDS 중 하나
+            vectors (dict): 참조 문자열 (shared_ref 결과) -> (768,) 벡터
+        """
+        if not self.client or not vectors:
+            return 0
+
+        self.raw_client.mset({shared_key(field, ref): encode_vector(vec, FORMAT_F32) for ref, vec in vectors.items()})
+        return len(vectors)
+
+    def set_product_vectors(self, product_id, vectors, fmt=FORMAT_F32, refs=None):
+        """
+        상품의 벡터들을 지정한 포맷으로 저장합니다. 포맷 마커도 같은 HSET에 함께 기록되므로
+        읽는 쪽에서 벡터와 마커가 어긋나는 일이 없습니다.
+
+        Args:
+            product_id: 상품 ID
+            vectors (dict): 필드명 -> (768,) 벡터
+            fmt (str): 'f32le' (기본값), 'f16le', 'i8s' 또는 'json'
+            refs (dict): {'brand_id': ..., 'category_id': ...}
+                         지정하면 브랜드/카테고리 벡터는 shared 키에 저장하고 상품 해시에는 참조만 둡니다.
+        """
+        if not self.client:
+            return False
+
+        mapping = {}
+        shared = {}
+        for field, vec in vectors.items():
+            ref = shared_ref(field, refs) if refs and field in SHARED_FIELDS else None
+            if ref is None:
+                mapping[field] = encode_vector(vec, fmt)
+            else:
+                shared[shared_key(field, ref)] = encode_vector(vec, FORMAT_F32)
+        mapping[FORMAT_FIELD] = fmt
+        if refs:
+            mapping.update({column: str(refs[column]) for column in REF_FIELDS if refs.get(column) is not None})
+
         try:
-            # HMGET으로 한 번에 조회
-            data = self.client.hmget(key, fields)
-            
-            # 데이터가 없으면 None 반환
-            if not any(data):
+            key = f"product:{product_id}:vectors"
+            pipe = self.raw_client.pipeline(transaction=False)
+            if shared:
+                pipe.mset(shared)
+                # 기존 포맷으로 상품 해시에 들어 있던 공유 필드 제거
+                pipe.hdel(key, *[field for field in SHARED_FIELDS if field in vectors and field not in mapping])
+            pipe.hset(key, mapping=mapping)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"⚠️ Redis 저장 오류 (ID: {product_id}): {e}")
+            return False
+
+    def get_product_neighbors(self, product_id, k=5):
+        """
+        오프라인 배치(build_neighbors.py)로 미리 계산된 유사 상품을 조회합니다.
+        Key 구조: product:{product_id}:neighbors -> Sorted Set (member=상품 ID, score=유사도)
+
+        Returns:
+            tuple: (상품 ID 배열, 점수 배열) 점수 내림차순. 항목이 없으면 None
+        """
+        if not self.client:
+            return None
+
+        try:
+            items = self.client.zrevrange(f"product:{product_id}:neighbors", 0, k - 1, withscores=True)
+        except Exception as e:
+            print(f"⚠️ Redis 이웃 조회 오류 (ID: {product_id}): {e}")
+            return None
+
+        if not items:
+            return None
+
+        return (np.array([int(member) for member, _ in items]),
+                np.array([score for _, score in items], dtype=np.float32))
+
+    def set_many_product_neighbors(self, neighbors, chunk_size=None, replace=True, max_size=None):
+        """
+        여러 상품의 이웃 목록을 파이프라인으로 저장합니다.
+
+        Args:
+            neighbors (dict): 상품 ID -> (이웃 ID 배열, 점수 배열)
+            replace (bool): True면 기존 목록을 지우고 새로 저장, False면 기존 목록에 병합
+            max_size (int): 병합 후 점수 상위 max_size개만 남기고 잘라냄
+
+        Returns:
+            int: 저장한 상품 수
+        """
+        if not self.client:
+            return 0
+
+        chunk_size = chunk_size or self.chunk_size
+        items = list(neighbors.items())
+        saved = 0
+
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            pipe = self.client.pipeline(transaction=False)
+
+            for product_id, (neighbor_ids, scores) in chunk:
+                key = f"product:{product_id}:neighbors"
+                if replace:
+                    pipe.delete(key)
+                if len(neighbor_ids):
+                    pipe.zadd(key, {str(int(nid)): float(score) for nid, score in zip(neighbor_ids, scores)})
+                if max_size:
+                    # 점수 오름차순 기준 앞쪽(낮은 점수)을 잘라 상위 max_size개만 유지
+                    pipe.zremrangebyrank(key, 0, -(max_size + 1))
+
+            try:
+                pipe.execute()
+                saved += len(chunk)
+            except Exception as e:
+                print(f"⚠️ Redis 이웃 저장 오류 ({start}~{start + len(chunk)}번째): {e}")
+
+        return saved
+
+    def delete_product_neighbors(self, product_ids):
+        """삭제된 상품들의 이웃 목록을 지웁니다."""
+        if not self.client or not product_ids:
+            return 0
+        keys = [f"product:{product_id}:neighbors" for product_id in product_ids]
+        try:
+            return sum(self.client.delete(*keys[i:i + self.chunk_size]) for i in range(0, len(keys), self.chunk_size))
+        except Exception as e:
+            print(f"⚠️ Redis 이웃 삭제 오류: {e}")
+            return 0
+
+    def get_neighbors_meta(self):
+        """
+        이웃 사전 계산 메타데이터 (neighbors:meta).
+
+        Returns:
+            dict: {'profile': str, 'k': int, 'built_at': int, 'catalog_version': int} 중 저장된 항목.
+                  배치가 돈 적이 없거나 조회에 실패하면 None
+        """
+        if not self.client:
+            return None
+        try:
+            meta = self.client.hgetall('neighbors:meta')
+        except Exception as e:
+            print(f"⚠️ Redis 이웃 메타데이터 조회 오류: {e}")
+            return None
+        if not meta:
+            return None
+        return {key: value if key == 'profile' else int(value) for key, value in meta.items()}
+
+    def set_neighbors_meta(self, profile, k, catalog_version=None):
+        """이웃 사전 계산에 사용한 프로필/k와 반영된 카탈로그 버전을 기록합니다."""
+        if not self.client:
+            return
+        meta = {'profile': profile, 'k': k, 'built_at': int(time.time())}
+        if catalog_version is not None:
+            meta['catalog_version'] = catalog_version
+        self.client.hset('neighbors:meta', mapping=meta)
+
+    def get_neighbor_lists_containing(self, product_ids, target_ids, chunk_size=None):
+        """product_ids 중 이웃 목록에 target_ids가 하나라도 들어 있는 상품 ID 집합 (증분 갱신 시 재계산 대상)"""
+        if not self.client or not target_ids:
+            return set()
+
+        chunk_size = chunk_size or self.chunk_size
+        members = [str(int(tid)) for tid in target_ids]
+        containing = set()
+
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start:start + chunk_size]
+            pipe = self.client.pipeline(transaction=False)
+            for product_id in chunk:
+                pipe.zmscore(f"product:{product_id}:neighbors", members)
+            for product_id, scores in zip(chunk, pipe.execute()):
+                if scores and any(score is not None for score in scores):
+                    containing.add(product_id)
+
+        return containing
+
+    def get_neighbor_ids(self, product_ids, chunk_size=None):
+        """이웃 목록이 이미 저장된 상품 ID 집합 (증분 갱신 대상 판별용)"""
+        if not self.client:
+            return set()
+
+        chunk_size = chunk_size or self.chunk_size
+        existing = set()
+
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start:start + chunk_size]
+            pipe = self.client.pipeline(transaction=False)
+            for product_id in chunk:
+                pipe.exists(f"product:{product_id}:neighbors")
+            for product_id, exists in zip(chunk, pipe.execute()):
+                if exists:
+                    existing.add(product_id)
+
+        return existing
+
+    def get_catalog_version(self):
+        """현재 카탈로그 버전 (발행된 적이 없으면 0, 조회 실패 시 None)"""
+        if not self.client:
+            return None
+        try:
+            return int(self.client.get(CATALOG_VERSION_KEY) or 0)
+        except Exception as e:
+            print(f"⚠️ Redis 카탈로그 버전 조회 오류: {e}")
+            return None
+
+    def publish_catalog_changes(self, added_ids=(), removed_ids=()):
+        """
+        새로 임베딩되었거나 벡터가 바뀐 상품(added_ids)과 삭제된 상품(removed_ids)을
+        변경 로그에 기록하고 카탈로그 버전을 올립니다.
+
+        Returns:
+            int: 새 카탈로그 버전 (실패 시 None)
+        """
+        if not self.client:
+            return None
+
+        members = [f"+{int(pid)}" for pid in added_ids] + [f"-{int(pid)}" for pid in removed_ids]
+        try:
+            return int(self.client.eval(PUBLISH_CHANGES_SCRIPT, 2, CATALOG_VERSION_KEY, CATALOG_CHANGES_KEY, *members))
+        except Exception as e:
+            print(f"⚠️ Redis 카탈로그 변경 발행 오류: {e}")
+            return None
+
+    def get_catalog_changes(self, since):
+        """
+        since 버전 이후의 변경 내역. 상품마다 마지막 변경만 남아 있습니다.
+
+        Returns:
+            tuple: (현재 버전, 추가/변경된 ID 리스트, 삭제된 ID 리스트)
+                   since가 잘려 나간 로그보다 오래되었거나 조회에 실패하면 None (전체 재로드 필요)
+        """
+        if not self.client:
+            return None
+
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.get(CATALOG_FLOOR_KEY)
+            pipe.get(CATALOG_VERSION_KEY)
+            floor, version = (int(value or 0) for value in pipe.execute())
+            if since < floor:
                 return None
-            
-            # JSON 문자열을 Numpy array로 변환
-            vectors = {}
-            for i, field in enumerate(fields):
-                if data[i]:
-                    vectors[field] = np.array(json.loads(data[i]))
-                else:
-                    # 벡터가 누락된 경우 영벡터 처리 (에러 방지)
-                    vectors[field] = np.zeros(768) 
-            
-            return vectors
-            
+            members = self.client.zrangebyscore(CATALOG_CHANGES_KEY, f"({since}", version)
         except Exception as e:
-            print(f"⚠️ Redis 조회 오류 (ID: {product_id}): {e}")
-            return None
\ No newline at end of file
+            print(f"⚠️ Redis 카탈로그 변경 조회 오류: {e}")
+            return None
+
+        added = [int(member[1:]) for member in members if member.startswith('+')]
+        removed = [int(member[1:]) for member in members if member.startswith('-')]
+        return version, added, removed
+
+    def trim_catalog_changes(self, keep_versions=1000):
+        """최근 keep_versions개 버전의 변경 로그만 남기고 잘라냅니다."""
+        if not self.client:
+            return
+        version = self.get_catalog_version()
+        if not version or version <= keep_versions:
+            return
+        floor = version - keep_versions
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zremrangebyscore(CATALOG_CHANGES_KEY, '-inf', floor)
+        pipe.set(CATALOG_FLOOR_KEY, floor)
+        pipe.execute()
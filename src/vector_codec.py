@@ -0,0 +1,139 @@
+"""
+벡터 필드 정의와 인코딩/공유 벡터 헬퍼
+
+redis_client(저장/조회)와 recommender(점수 계산)가 함께 쓰는 부분만 모아 둔 모듈입니다.
+numpy 외의 의존성이 없으므로 어느 쪽에서 import해도 Redis 연결이나 점수 계산 코드를 끌어오지 않습니다.
+"""
+import json
+
+import numpy as np
+
+# 5가지 벡터 필드명 (임의 지정)
+VECTOR_FIELDS = ['image_emb', 'brand_info_emb', 'lower_cat_emb', 'brand_cat_emb', 'name_emb']
+VECTOR_DIM = 768
+
+# 벡터 인코딩 포맷 마커 (해시의 'fmt' 필드)
+# - 필드가 없으면 기존 JSON 텍스트 포맷으로 간주합니다. (전환 기간 동안 두 포맷 모두 읽기 지원)
+# - 'f32le': little-endian float32 raw bytes (JSON 대비 약 1/3 크기, np.frombuffer로 복사 없이 디코딩)
+FORMAT_FIELD = 'fmt'
+FORMAT_JSON = 'json'
+FORMAT_F32 = 'f32le'
+# - 'f16le': little-endian float16 raw bytes (f32le의 1/2 크기)
+# - 'i8s': float32 scale(4바이트) + int8 벡터 (f32le의 약 1/4 크기, 값 = int8 * scale)
+FORMAT_F16 = 'f16le'
+FORMAT_I8 = 'i8s'
+VECTOR_FORMATS = [FORMAT_F32, FORMAT_F16, FORMAT_I8, FORMAT_JSON]
+
+# 브랜드/카테고리 단위로 같은 값을 갖는 필드 -> 참조 컬럼
+# 벡터는 shared:{field}:{ref} 키(f32le)에 한 번만 저장하고, 상품 해시에는 brand_id/category_id만 둡니다.
+# (상품 해시에 벡터가 직접 들어 있는 기존 포맷도 그대로 읽을 수 있습니다.)
+SHARED_FIELDS = {
+    'brand_info_emb': ('brand_id',),
+    'lower_cat_emb': ('category_id',),
+    'brand_cat_emb': ('brand_id', 'category_id'),
+}
+REF_FIELDS = ['brand_id', 'category_id']
+DENSE_FIELDS = [field for field in VECTOR_FIELDS if field not in SHARED_FIELDS]
+
+
+QUANTIZED_PRECISIONS = ('f16', 'int8')
+
+
+def quantize_rows(matrix, precision):
+    """
+    행 단위 양자화.
+    - 'f16': float16 (float32 대비 1/2)
+    - 'int8': 행마다 scale = max|x| / 127을 두고 round(x / scale) (float32 대비 약 1/4)
+
+    Returns:
+        tuple: (양자화 배열, scale) scale은 int8일 때 행별 float32, f16이면 None
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if precision == 'f16':
+        return matrix.astype(np.float16), None
+    if precision == 'int8':
+        scale = np.abs(matrix).max(axis=-1) / np.float32(127)
+        safe = np.where(scale > 0, scale, np.float32(1))
+        quantized = np.clip(np.rint(matrix / safe[..., None]), -127, 127).astype(np.int8)
+        return quantized, scale.astype(np.float32)
+    raise ValueError(f"지원하지 않는 양자화 형식입니다: {precision}")
+
+
+def dequantize_rows(quantized, scale=None):
+    """quantize_rows의 역변환 (float32)"""
+    matrix = np.asarray(quantized, dtype=np.float32)
+    return matrix if scale is None else matrix * np.asarray(scale, dtype=np.float32)[..., None]
+
+
+def shared_ref(field, refs):
+    """상품의 참조값(brand_id, category_id)으로 공유 벡터 참조 문자열을 만듭니다. 참조값이 없으면 None"""
+    values = [refs.get(column) for column in SHARED_FIELDS[field]]
+    if any(value is None for value in values):
+        return None
+    return ':'.join(str(value) for value in values)
+
+def shared_key(field, ref):
+    return f"shared:{field}:{ref}"
+
+def encode_vector(vector, fmt=FORMAT_F32):
+    """numpy 벡터를 Redis 저장용 값으로 인코딩합니다."""
+    if fmt == FORMAT_F32:
+        return np.asarray(vector, dtype='<f4').tobytes()
+    if fmt == FORMAT_F16:
+        return np.asarray(vector, dtype='<f2').tobytes()
+    if fmt == FORMAT_I8:
+        quantized, scale = quantize_rows(vector, 'int8')
+        return np.asarray(scale, dtype='<f4').tobytes() + quantized.tobytes()
+    return json.dumps(np.asarray(vector, dtype=np.float32).tolist())
+
+def decode_vector(raw, fmt=None):
+    """
+    Redis 값(bytes)을 float32 벡터로 디코딩합니다.
+    fmt가 'f32le'이면 np.frombuffer로 복사 없이 읽고, 'f16le'/'i8s'는 float32로 복원하며,
+    그 외에는 JSON으로 파싱합니다.
+    """
+    if isinstance(fmt, bytes):
+        fmt = fmt.decode()
+    if fmt == FORMAT_F32:
+        return np.frombuffer(raw, dtype='<f4')
+    if fmt == FORMAT_F16:
+        return np.frombuffer(raw, dtype='<f2').astype(np.float32)
+    if fmt == FORMAT_I8:
+        scale = np.frombuffer(raw[:4], dtype='<f4')[0]
+        return np.frombuffer(raw[4:], dtype=np.int8).astype(np.float32) * scale
+    return np.array(json.loads(raw), dtype=np.float32)
+
+
+class SharedVectors:
+    """
+    여러 상품이 같은 벡터를 공유하는 필드(브랜드/카테고리 임베딩)의 압축 표현.
+    고유 벡터 표 table (m, dim)과 상품별 행 번호 index (n,)만 들고 있고,
+    `shared @ query`는 table @ query로 고유 벡터마다 한 번만 계산한 뒤 index로 상품에 펼칩니다.
+    (n개 내적 -> m개 내적 + gather)
+
+    np.asarray()로 변환하면 (n, dim) 행렬로 펼쳐지므로, 행렬을 기대하는 기존 코드에도 그대로 넘길 수 있습니다.
+    """
+
+    def __init__(self, table, index):
+        self.table = np.asarray(table, dtype=np.float32)
+        self.index = np.asarray(index, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def shape(self):
+        return (len(self.index), self.table.shape[1])
+
+    def __getitem__(self, rows):
+        index = self.index[rows]
+        if np.ndim(index) == 0:
+            return self.table[index]
+        return SharedVectors(self.table, index)
+
+    def __matmul__(self, other):
+        return (self.table @ other)[self.index]
+
+    def __array__(self, dtype=None, copy=None):
+        matrix = self.table[self.index]
+        return matrix if dtype is None else matrix.astype(dtype, copy=False)